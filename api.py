@@ -0,0 +1,321 @@
+"""API HTTP JSON sans interface, adossée aux mêmes fonctions que l'application Streamlit.
+
+Chaque réponse est calculée une fois par intervalle de rafraîchissement puis servie
+à tous les clients depuis un cache partagé qui conserve le corps déjà sérialisé
+(JSON compact, et sa version gzip). Les requêtes concurrentes sur une même clé
+attendent un seul calcul (single-flight) ; pendant un rafraîchissement, la version
+expirée continue d'être servie. Les clients revalident avec If-None-Match et
+reçoivent un 304 sans corps tant que les données n'ont pas changé.
+
+Endpoints :
+    GET /v1/indices                 toutes les places (MARCHES)
+    GET /v1/indices/<market>        cours des indices d'une place
+    GET /v1/trending/<market>       classement des performances du jour
+    GET /v1/fear-greed              indice de peur et d'avidité et ses composantes
+    GET /v1/technical/<symbol>      historique et indicateurs techniques (?tail=N)
+    GET /healthz, GET /metrics
+
+Usage :
+    python api.py --port 8000
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import math
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import numpy as np
+
+from widgets import snapshot
+from widgets.metrics import inc, observe, render_prometheus
+from widgets.indices import MARCHES, index_snapshot
+from widgets.trending import MARKETS, fetch_market_data, rank_performances
+from widgets.fear import calculate_fear_greed_index
+from widgets.asset_data import ASSET_TTL, get_technical
+from widgets.symbol_index import is_known, is_comprehensive
+
+logger = logging.getLogger("finlite")
+
+API_PORT_ENV = "FINLIT_API_PORT"
+DEFAULT_PORT = 8000
+# Intervalles de rafraîchissement (secondes), alignés sur les caches des widgets
+TTL = {"indices": 300, "trending": 1800, "fear-greed": 3600, "technical": ASSET_TTL}
+ERROR_TTL = 15          # Une erreur amont est mise en cache brièvement pour ne pas la marteler
+GZIP_MIN_BYTES = 1024   # En dessous, la compression coûte plus qu'elle ne rapporte
+MAX_ENTRIES = 1024
+ERROR_ENTRIES = 256     # Erreurs amont gardées à part : elles n'évincent jamais une réponse valide
+DECIMALS = 4            # Décimales conservées à la sérialisation (les séries sont stockées en float32)
+SYMBOL = re.compile(r"\^?[A-Z0-9][A-Z0-9.=\-]{0,19}")  # AAPL, BRK-B, ^GSPC, EURUSD=X, MC.PA
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class Response:
+    """Réponse figée : corps sérialisé une fois, version gzip et ETag calculés à la construction."""
+
+    __slots__ = ("status", "body", "gzipped", "etag", "expires")
+
+    def __init__(self, status: int, payload, ttl: float):
+        self.status = status
+        self.body = json.dumps(payload, separators=(",", ":"), allow_nan=False).encode()
+        self.gzipped = gzip.compress(self.body, compresslevel=6) if len(self.body) >= GZIP_MIN_BYTES else None
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=12).hexdigest() + '"'
+        self.expires = time.monotonic() + ttl
+
+    def max_age(self) -> int:
+        return max(0, int(self.expires - time.monotonic()))
+
+class _Flight:
+    __slots__ = ("done", "response")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+class ResponseCache:
+    """Cache LRU de réponses avec un seul calcul en cours par clé.
+
+    Les réponses 200 et les erreurs amont (5xx) ont chacune leur LRU ; les erreurs
+    client (4xx) ne sont jamais conservées.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_errors: int = ERROR_ENTRIES):
+        self.max_entries = max_entries
+        self.max_errors = max_errors
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._errors = OrderedDict()
+        self._flights = {}
+
+    def get(self, key, ttl: float, compute) -> Response:
+        """Réponse fraîche du cache, sinon celle du calcul en cours (ou la version expirée
+        pendant qu'il s'exécute), sinon calcule."""
+        with self._lock:
+            entries = self._entries if key in self._entries else self._errors
+            entry = entries.get(key)
+            if entry is not None and entry.expires > time.monotonic():
+                entries.move_to_end(key)
+                inc("finlit_api_cache_hits_total", route=key[0])
+                return entry
+            flight = self._flights.get(key)
+            if flight is not None and entry is not None:
+                inc("finlit_api_cache_hits_total", route=key[0])
+                return entry
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            inc("finlit_api_cache_hits_total", route=key[0])
+            return flight.response
+
+        inc("finlit_api_cache_misses_total", route=key[0])
+        response = Response(502, {"error": "Computation aborted"}, 0)
+        try:
+            response = Response(200, compute(), ttl)
+        except ApiError as e:
+            response = Response(e.status, {"error": str(e)}, ERROR_TTL)
+        except Exception as e:
+            logger.warning("API computation %s failed: %s", key, e)
+            response = Response(502, {"error": f"Upstream data unavailable: {e}"}, ERROR_TTL)
+        finally:
+            # Toujours libérer la clé : sinon les requêtes suivantes attendraient indéfiniment
+            with self._lock:
+                if response.status < 400 or response.status >= 500:
+                    self._store(key, response)
+                del self._flights[key]
+            flight.response = response
+            flight.done.set()
+        return response
+
+    def _store(self, key, response: Response):
+        """Range la réponse dans la LRU de son statut (verrou tenu)."""
+        entries, other, limit = ((self._entries, self._errors, self.max_entries) if response.status < 400
+                                 else (self._errors, self._entries, self.max_errors))
+        other.pop(key, None)
+        entries[key] = response
+        entries.move_to_end(key)
+        while len(entries) > limit:
+            entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._errors.clear()
+
+def _number(value):
+    """Scalaire JSON : NaN et infinis deviennent null, les types NumPy des types natifs."""
+    if value is None:
+        return None
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float):
+        return round(value, DECIMALS) if math.isfinite(value) else None
+    return value
+
+def _column(values: np.ndarray) -> list:
+    if values.dtype.kind == "f":
+        values = np.round(values.astype(np.float64), DECIMALS)
+        return [v if v == v and abs(v) != math.inf else None for v in values.tolist()]
+    return values.tolist()
+
+# Calculs des endpoints
+
+def _market(name: str, markets: dict) -> str:
+    for market in markets:
+        if market.lower() == name.lower():
+            return market
+    raise ApiError(404, f"Unknown market '{name}'; expected one of {list(markets)}")
+
+def indices_payload(market: str = None) -> dict:
+    markets = [_market(market, MARCHES)] if market else list(MARCHES)
+    return {"markets": {m: [{k: _number(v) for k, v in quote.items()} for quote in index_snapshot(m)] for m in markets}}
+
+def trending_payload(market: str) -> dict:
+    market = _market(market, MARKETS)
+    market_data = fetch_market_data(market)
+    if not isinstance(market_data, dict) or not market_data:
+        raise ApiError(503, f"No data available for {market}")
+    ranking = rank_performances(market_data, MARKETS[market])
+    return {"market": market, "ranking": [{k: _number(v) for k, v in row.items()} for row in ranking]}
+
+def fear_greed_payload() -> dict:
+    data = calculate_fear_greed_index()
+    if data["error"]:
+        raise ApiError(503, data["error"])
+    return {k: _number(v) for k, v in data.items()}
+
+def technical_payload(symbol: str, tail: int = None) -> dict:
+    history = get_technical(symbol)
+    index = history.index if tail is None else history.index[-tail:]
+    rows = slice(len(history) - len(index), None)
+    return {
+        "symbol": symbol,
+        "index": [t.isoformat() for t in index],
+        "columns": {str(name): _column(values[rows]) for name, values in history.columns.items()},
+    }
+
+def route(path: str, query: dict) -> tuple:
+    """(clé de cache, ttl, calcul) pour un chemin, ou ApiError."""
+    parts = [unquote(p) for p in path.strip("/").split("/") if p]
+    if len(parts) < 2 or parts[0] != "v1":
+        raise ApiError(404, "Not found")
+    name, args = parts[1], parts[2:]
+    # Marchés et symboles validés avant le cache : une URL arbitraire ne crée ni entrée ni calcul
+    if name == "indices" and len(args) <= 1:
+        market = _market(args[0], MARCHES) if args else None
+        return ("indices", market or ""), TTL["indices"], lambda: indices_payload(market)
+    if name == "trending" and len(args) == 1:
+        market = _market(args[0], MARKETS)
+        return ("trending", market), TTL["trending"], lambda: trending_payload(market)
+    if name == "fear-greed" and not args:
+        return ("fear-greed",), TTL["fear-greed"], fear_greed_payload
+    if name == "technical" and len(args) == 1:
+        symbol = args[0].strip().upper()
+        if not SYMBOL.fullmatch(symbol):
+            raise ApiError(400, f"Invalid symbol '{args[0]}'")
+        if not is_known(symbol) and is_comprehensive():
+            raise ApiError(404, f"Unknown symbol '{symbol}'")
+        try:
+            tail = int(query["tail"][0]) if "tail" in query else None
+        except ValueError:
+            raise ApiError(400, "tail must be an integer")
+        if tail is not None and tail <= 0:
+            raise ApiError(400, "tail must be positive")
+        return ("technical", symbol, tail), TTL["technical"], lambda: technical_payload(symbol, tail)
+    raise ApiError(404, "Not found")
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Connexions persistantes : un client qui interroge souvent ne rouvre pas de socket
+    cache = ResponseCache()
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        label = "other"
+        try:
+            if url.path == "/healthz":
+                self._send_raw(200, b"ok", "text/plain")
+                return
+            if url.path == "/metrics":
+                self._send_raw(200, render_prometheus().encode(), "text/plain; version=0.0.4; charset=utf-8")
+                return
+            try:
+                key, ttl, compute = route(url.path, parse_qs(url.query))
+                label = key[0]
+                response = self.cache.get(key, ttl, compute)
+            except ApiError as e:
+                response = Response(e.status, {"error": str(e)}, 0)
+            self._send(response)
+        finally:
+            observe("finlit_api_seconds", time.perf_counter() - start, route=label)
+
+    def _send(self, response: Response):
+        headers = {"ETag": response.etag, "Vary": "Accept-Encoding",
+                   "Cache-Control": f"public, max-age={response.max_age()}" if response.status < 400 else "no-store"}
+        if response.status == 200 and _matches(self.headers.get("If-None-Match", ""), response.etag):
+            self._reply(304, headers)
+            return
+        body = response.body
+        if response.gzipped and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = response.gzipped
+            headers["Content-Encoding"] = "gzip"
+        headers["Content-Type"] = "application/json"
+        self._reply(response.status, headers, body)
+
+    def _send_raw(self, status: int, body: bytes, content_type: str):
+        self._reply(status, {"Content-Type": content_type, "Cache-Control": "no-store"}, body)
+
+    def _reply(self, status: int, headers: dict, body: bytes = b""):
+        inc("finlit_api_requests_total", status=str(status))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        pass  # Pas de log par requête ; les compteurs sont exposés sur /metrics
+
+def serve(host: str = "0.0.0.0", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    return server
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve FinLite data as a JSON API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get(API_PORT_ENV, DEFAULT_PORT)))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    snapshot.start()  # Caches restaurés du snapshot, puis complétés en arrière-plan
+    server = serve(args.host, args.port)
+    logger.info("API listening on %s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
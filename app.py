@@ -2,9 +2,15 @@ import streamlit as st
 from widgets.indices import show_indices
 from widgets.trending import show_trending
 from widgets.fear import display_fear_greed_widget
+from widgets.metrics import start_metrics_server
+from widgets import dashboard, snapshot
 
 # Configuration de la page
 st.set_page_config(page_title="FinLite Dashboard", layout="wide")
+start_metrics_server()
+snapshot.start()
+dashboard.start()
+home = dashboard.current()  # Instantané partagé : la page ne fait que le rendre
 
 # Titre principal avec style
 st.markdown("""
@@ -17,15 +23,15 @@ st.markdown("""
 col1, col2 = st.columns([2, 1])
 
 with col1:
-    show_indices()
+    show_indices(home)
 
 with col2:
 
-    display_fear_greed_widget()
+    display_fear_greed_widget(home)
 
 # Widget Trending en pleine largeur en dessous
 
-show_trending()
+show_trending(home)
 
 # Sidebar optimisée
 with st.sidebar:
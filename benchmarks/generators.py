@@ -0,0 +1,93 @@
+"""Générateurs déterministes de données de marché synthétiques pour les benchmarks."""
+import numpy as np
+import pandas as pd
+
+def synthetic_ohlcv(n_rows: int, seed: int = 0, start: str = "2000-01-03", freq: str = "min",
+                    price: float = 100.0, volatility: float = 0.01) -> pd.DataFrame:
+    """Marche aléatoire géométrique au format de yfinance (Open/High/Low/Close/Volume)."""
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, volatility, n_rows)))
+    open_ = np.empty_like(close)
+    open_[0] = price
+    open_[1:] = close[:-1]
+    spread = np.abs(rng.normal(0, volatility / 2, n_rows)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(100_000, 10_000_000, n_rows)
+    index = pd.date_range(start, periods=n_rows, freq=freq, tz="UTC")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+def synthetic_market_data(n_symbols: int, n_rows: int = 7, seed: int = 0, nan_ratio: float = 0.02):
+    """Données multi-symboles au format de trending.fetch_market_data, plus la liste d'actifs."""
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYM{i:05d}" for i in range(n_symbols)]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_rows, n_symbols)), axis=0))
+    close[rng.random(close.shape) < nan_ratio] = np.nan
+    volume = rng.integers(100_000, 10_000_000, (n_rows, n_symbols)).astype(float)
+    index = pd.date_range("2024-01-01", periods=n_rows, freq="D")
+    assets = [{"symbol": s, "name": f"Synthetic {s}", "sector": "Synthetic"} for s in symbols]
+    market_data = {
+        "Close": pd.DataFrame(close, index=index, columns=symbols),
+        "Volume": pd.DataFrame(volume, index=index, columns=symbols),
+    }
+    return market_data, assets
+
+def synthetic_download(n_symbols: int, n_rows: int = 252, seed: int = 0, nan_ratio: float = 0.02) -> pd.DataFrame:
+    """Réponse brute de yf.download (colonnes (champ, symbole)) avec trous, doublon et cours aberrants."""
+    market_data, _ = synthetic_market_data(n_symbols, n_rows, seed, nan_ratio)
+    close, volume = market_data["Close"].to_numpy(), market_data["Volume"].to_numpy()
+    rng = np.random.default_rng(seed + 1)
+    spread = np.abs(rng.normal(0, 0.01, close.shape)) * close
+    fields = {"Adj Close": close, "Close": close, "High": close + spread, "Low": close - spread,
+              "Open": close + rng.uniform(-1, 1, close.shape) * spread, "Volume": volume}
+    fields["Low"][rng.random(close.shape) < nan_ratio / 10] = 0.0
+    frame = pd.concat({name: pd.DataFrame(values, columns=market_data["Close"].columns) for name, values in fields.items()},
+                      axis=1)
+    frame.index = market_data["Close"].index
+    return pd.concat([frame, frame.iloc[[-1]]])  # Dernière barre reçue deux fois
+
+def synthetic_timestamps(n: int, seed: int = 0) -> list:
+    """Instants UTC répartis uniformément sur une journée."""
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 86_400, n)
+    base = pd.Timestamp("2024-01-02", tz="UTC")
+    return [ts.to_pydatetime() for ts in base + pd.to_timedelta(seconds, unit="s")]
+
+def synthetic_symbols(n: int, seed: int = 0) -> list:
+    """Fichier maître synthétique : symboles de 1 à 5 lettres et noms composés de mots courants."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    words = ["Global", "Holdings", "Capital", "Energy", "Bio", "Systems", "Pharma", "Bank", "Tech", "Group",
+             "Industries", "Resources", "Partners", "Digital", "Networks", "Therapeutics", "Financial", "Motors"]
+    exchanges = ["NASDAQ", "NYSE", "NYSE Arca", "NYSE American"]
+    rows, seen = [], set()
+    while len(rows) < n:
+        symbol = "".join(rng.choice(letters, rng.integers(1, 6)))
+        if symbol in seen:
+            continue
+        seen.add(symbol)
+        name = " ".join(rng.choice(words, rng.integers(2, 4))) + " " + symbol.title() + " Inc."
+        rows.append({"symbol": symbol, "name": name, "exchange": exchanges[len(rows) % 4], "sector": "Synthetic"})
+    return rows
+
+def synthetic_rules(n_rules: int, n_symbols: int, seed: int = 0) -> list:
+    """Règles d'alerte variées (seuils, croisements, champ contre champ) réparties sur `n_symbols` symboles."""
+    rng = np.random.default_rng(seed)
+    templates = ["RSI crosses_above {}", "RSI crosses_below {}", "Close crosses_above BB_Upper",
+                 "Close crosses_below BB_Lower", "MACD crosses_above MACD_Signal", "CCI above {}", "WILLR below {}",
+                 "change_pct moves {}"]
+    symbols = rng.integers(0, n_symbols, n_rules)
+    kinds = rng.integers(0, len(templates), n_rules)
+    levels = rng.integers(1, 100, n_rules)
+    return [f"SYM{s:05d} " + templates[k].format(level) for s, k, level in zip(symbols, kinds, levels)]
+
+def synthetic_fundamentals(n: int, seed: int = 0) -> tuple:
+    """Table de fondamentaux : ratios log-normaux (5 % manquants), 11 secteurs et 150 industries."""
+    from widgets.fundamentals import COLUMNS
+    rng = np.random.default_rng(seed)
+    values = np.exp(rng.normal(size=(n, len(COLUMNS))))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    symbols = [f"SYM{i:06d}" for i in range(n)]
+    industries = rng.integers(0, 150, n)
+    sectors = [f"Sector {i % 11}" for i in industries]
+    return symbols, [f"Company {i}" for i in range(n)], sectors, [f"Industry {i}" for i in industries], values
@@ -0,0 +1,302 @@
+"""Suite de benchmarks des fonctions chaudes avec détection de régressions.
+
+Usage :
+    python -m benchmarks.run                    # compare à benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline    # enregistre une nouvelle référence
+    python -m benchmarks.run --full -k technical
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.generators import (synthetic_ohlcv, synthetic_market_data, synthetic_timestamps, synthetic_symbols,
+                                   synthetic_rules, synthetic_fundamentals, synthetic_download)
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+FULL_SIZES = DEFAULT_SIZES + [10_000_000]
+TIME_THRESHOLD = 1.30    # +30 % sur le meilleur temps = régression
+MEMORY_THRESHOLD = 1.20  # +20 % sur le pic d'allocation = régression
+MIN_MEASURED_TIME = 0.005  # En dessous, le bruit domine : pas de verdict sur le temps
+
+def _bench_technical(size):
+    from widgets.indicators import calculate_technical
+    df = synthetic_ohlcv(size)
+    return lambda: calculate_technical(df)
+
+def _bench_component(name):
+    def setup(size):
+        from widgets import fear
+        df = synthetic_ohlcv(size)
+        func = getattr(fear, name)
+        return lambda: func(df)
+    return setup
+
+def _bench_fear_greed(size):
+    from widgets import fear
+    frames = {fear.INDEX_SYMBOL: synthetic_ohlcv(size, seed=1), fear.VIX_SYMBOL: synthetic_ohlcv(size, seed=2, price=20)}
+    compute = fear.calculate_fear_greed_index.__wrapped__
+
+    def run():
+        original = fear.get_market_data
+        fear.get_market_data = lambda symbol, period, interval: frames[symbol]
+        try:
+            return compute()
+        finally:
+            fear.get_market_data = original
+    return run
+
+def _bench_performance(size):
+    from widgets.trending import calculate_performance, latest_quotes
+    market_data, assets = synthetic_market_data(max(1, size // 100), n_rows=100)
+    market_data = {**market_data, "quotes": latest_quotes(market_data)}  # Comme fetch_market_data
+    symbols = [a["symbol"] for a in assets]
+    return lambda: [calculate_performance(market_data, s) for s in symbols]
+
+def _bench_ranking(size):
+    from widgets.trending import rank_performances
+    market_data, assets = synthetic_market_data(max(1, size // 100), n_rows=100)
+    return lambda: rank_performances(market_data, assets)
+
+def _bench_market_open(size):
+    from widgets.indices import MARCHES, is_market_open
+    symbols = [s for market in MARCHES.values() for s in market] + ["UNKNOWN"]
+    calls = list(zip((symbols[i % len(symbols)] for i in range(size)), synthetic_timestamps(size)))
+    return lambda: [is_market_open(s, t) for s, t in calls]
+
+def _bench_price_figure(size):
+    from widgets.indicators import calculate_technical
+    from widgets.chart import build_price_chart
+    df = calculate_technical(synthetic_ohlcv(size))
+    indicators = ["Bollinger Bands", "Ichimoku Cloud", "OBV"]
+    # Sérialisation comprise : c'est ce que paie st.plotly_chart à chaque rendu
+    return lambda: build_price_chart(df, "Candlestick", indicators, show_volume=True).to_json()
+
+def _bench_adjust(size):
+    """Ajustement complet de `size` barres portant un dividende trimestriel."""
+    from widgets.adjust import adjust
+    df = synthetic_ohlcv(size)
+    df["Dividends"] = 0.0
+    df.iloc[63::63, df.columns.get_loc("Dividends")] = 0.25
+    return lambda: adjust(df)
+
+def _bench_fx_align(size):
+    """`size` cotations (un an de séances) réparties sur trois places et trois devises, alignées as-of
+    sur une grille UTC quotidienne et converties en EUR."""
+    import pandas as pd
+    from widgets.fx import align
+    per_region = max(1, size // 3 // 252)
+    sessions = {"USD": "21:00", "EUR": "16:30", "JPY": "06:00"}  # Clôtures en UTC
+    frames, currencies = [], {}
+    for k, (currency, close_time) in enumerate(sessions.items()):
+        market_data, assets = synthetic_market_data(per_region, n_rows=252, seed=k)
+        closes = market_data["Close"].add_prefix(f"{currency}-")
+        closes.index = pd.DatetimeIndex(closes.index.strftime(f"%Y-%m-%d {close_time}"), tz="UTC")
+        frames.append(closes)
+        currencies.update(dict.fromkeys(closes.columns, currency))
+    wide = pd.concat(frames, axis=1, sort=False).sort_index()
+    rates = pd.DataFrame({"EURUSD=X": np.linspace(1.05, 1.15, len(wide)), "USDJPY=X": np.linspace(140, 155, len(wide))},
+                         index=wide.index)
+    grid = pd.date_range(wide.index[0].normalize(), wide.index[-1].normalize(), freq="D", tz="UTC") + pd.Timedelta("22h")
+    return lambda: align(wide, grid, "EUR", rates, currencies)
+
+def _bench_lod_view(size):
+    """Vue complète d'un historique de `size` barres : coût et charge utile constants grâce à la pyramide."""
+    from widgets.chart import build_price_chart
+    from widgets.lod import Pyramid
+    pyramid = Pyramid.from_frame("1m", synthetic_ohlcv(size))
+
+    def run():
+        _, frame, _ = pyramid.window(pyramid.start, pyramid.end)
+        return build_price_chart(frame, "Candlestick", ["Bollinger Bands"], show_volume=True).to_json()
+    return run
+
+# Frappes successives d'une saisie (préfixes), noms et fautes de frappe
+SEARCH_QUERIES = ["n", "nv", "nvd", "nvda", "g", "go", "gol", "gold", "goldm", "global hold", "capitl",
+                  "pharma bio", "zzzz", "tech", "a", "ab", "abc", "energy part", "finacial", "motors"]
+
+def _bench_symbol_search(size):
+    from widgets.symbol_index import SymbolIndex
+    index = SymbolIndex(synthetic_symbols(size))
+    return lambda: [index.search(q) for q in SEARCH_QUERIES]
+
+def _bench_alerts(size):
+    """`size` règles sur size / 20 symboles, tous réévalués à chaque cycle (régime établi : peu de déclenchements)."""
+    from widgets.alerts import AlertEngine
+    engine = AlertEngine(synthetic_rules(size, max(1, size // 20)))
+    rng = np.random.default_rng(0)
+    scale = {"RSI": 100, "CCI": 200, "WILLR": -100, "change_pct": 5}
+    values = rng.random((2, len(engine.symbols), len(engine.fields))) * [scale.get(f, 100) for f in engine.fields]
+    engine.previous[:], engine.current[:] = values
+    engine.evaluate(engine.symbols)
+    return lambda: engine.evaluate(engine.symbols)
+
+def _bench_peers(size):
+    """Pairs, rangs centiles dans le secteur et tableau affiché, pour 20 titres d'une table de `size` titres."""
+    from widgets.fundamentals import FundamentalsTable
+    table = FundamentalsTable(*synthetic_fundamentals(size))
+    symbols = table.symbols[:: max(1, size // 20)][:20]
+
+    def run():
+        for symbol in symbols:
+            rows, _, _ = table.peers(symbol)
+            row = table.rows[symbol]
+            table.percentiles(table.values[row], table.members(sector=table.sectors[row]))
+            table.frame(rows)
+    return run
+
+def _bench_montecarlo(size):
+    """`size` trajectoires GBM et bootstrap sur un an, calibrées sur un an de clôtures, objectif à +20 %."""
+    from widgets.montecarlo import simulate
+    close = synthetic_ohlcv(252, freq="B")["Close"].to_numpy()
+
+    def run():
+        for model in ("GBM", "Bootstrap"):
+            simulate(close, 252, model, n_paths=size, target=close[-1] * 1.2)
+    return run
+
+def _bench_vwap(size):
+    """VWAP de séance, bandes et profils de `size` barres 1 minute, puis 100 barres reçues une à une
+    (la dernière de chaque envoi remplacée par sa version définitive)."""
+    from widgets.vwap import SessionEngine
+    df = synthetic_ohlcv(size + 100, freq="min")
+    time_ = df.index.tz_localize(None).as_unit("ns").asi8
+    columns = [df[name].to_numpy() for name in ("High", "Low", "Close", "Volume")]
+
+    def run():
+        engine = SessionEngine()
+        engine.update(time_[:size], *(c[:size] for c in columns))
+        for i in range(size, size + 100):
+            engine.update(time_[i - 1:i + 1], *(c[i - 1:i + 1] for c in columns))
+    return run
+
+def _bench_normalize(size):
+    """Validation et normalisation d'un téléchargement de `size` cellules (un an de séances, 6 champs)."""
+    from widgets.normalize import normalize
+    frame = synthetic_download(max(1, size // 252 // 6))
+    return lambda: normalize(frame, fill_limit=3, call="download")
+
+# nom -> (setup(size) -> callable, tailles maximales raisonnables)
+BENCHMARKS = {
+    "calculate_technical": (_bench_technical, None),
+    "fear.calculate_component_momentum": (_bench_component("calculate_component_momentum"), None),
+    "fear.calculate_component_strength": (_bench_component("calculate_component_strength"), None),
+    "fear.calculate_component_volatility": (_bench_component("calculate_component_volatility"), None),
+    "fear.calculate_fear_greed_index": (_bench_fear_greed, None),
+    "trending.calculate_performance": (_bench_performance, 1_000_000),
+    "trending.rank_performances": (_bench_ranking, 1_000_000),
+    "indices.is_market_open": (_bench_market_open, 1_000_000),
+    "chart.build_price_chart": (_bench_price_figure, 1_000_000),
+    "adjust.adjust": (_bench_adjust, None),
+    "fx.align": (_bench_fx_align, 1_000_000),
+    "lod.price_view": (_bench_lod_view, None),
+    "symbol_index.search": (_bench_symbol_search, 100_000),
+    "alerts.evaluate": (_bench_alerts, 1_000_000),
+    "fundamentals.peers": (_bench_peers, 1_000_000),
+    "montecarlo.simulate": (_bench_montecarlo, 1_000_000),
+    "vwap.session": (_bench_vwap, 10_000_000),
+    "normalize.normalize": (_bench_normalize, 10_000_000),
+}
+
+def measure(func, repeat: int = 5, budget: float = 10.0) -> dict:
+    """Médiane/min du temps d'exécution puis pic d'allocation (mesuré à part, tracemalloc ralentit)."""
+    func()  # Échauffement (imports paresseux, caches internes)
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < repeat and (not timings or time.perf_counter() - start < budget):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "runs": len(timings),
+        "peak_mb": peak / 1e6,
+    }
+
+def run_suite(sizes, pattern=None, repeat=5) -> dict:
+    results = {}
+    for name, (setup, max_size) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        for size in sizes:
+            if max_size and size > max_size:
+                continue
+            key = f"{name}[{size}]"
+            results[key] = measure(setup(size), repeat=repeat)
+            r = results[key]
+            print(f"{key:<55} {r['median_s'] * 1e3:>10.2f} ms {r['peak_mb']:>10.1f} MB", flush=True)
+    return results
+
+def compare(results: dict, baseline: dict, time_threshold: float, memory_threshold: float) -> list:
+    """Renvoie la liste des régressions par rapport à la référence."""
+    regressions = []
+    for key, current in results.items():
+        ref = baseline.get(key)
+        if not ref:
+            continue
+        # Le minimum des N essais est bien plus stable que la médiane sur une machine bruitée :
+        # le bruit ne fait qu'ajouter du temps. Les anciennes références n'ont que la médiane.
+        before, after = ref.get("min_s", ref["median_s"]), current["min_s"]
+        if before >= MIN_MEASURED_TIME and after > before * time_threshold:
+            regressions.append(f"{key}: time {before * 1e3:.2f} ms -> {after * 1e3:.2f} ms (best of {current['runs']})")
+        if ref["peak_mb"] >= 1 and current["peak_mb"] > ref["peak_mb"] * memory_threshold:
+            regressions.append(f"{key}: memory {ref['peak_mb']:.1f} MB -> {current['peak_mb']:.1f} MB")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FinLite hot-path benchmarks")
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--sizes", type=int, nargs="+", help="row counts to benchmark")
+    parser.add_argument("--full", action="store_true", help="include the 10M-row tier")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--output", type=Path, help="also write this run's results as JSON")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    results = run_suite(sizes, args.pattern, args.repeat)
+    document = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "numpy": np.__version__, "processor": platform.processor()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2))
+
+    if args.save_baseline:
+        if args.baseline.exists():
+            # Conserve les mesures des benchmarks non relancés (-k, --sizes)
+            previous = json.loads(args.baseline.read_text())["results"]
+            document["results"] = {**previous, **results}
+        args.baseline.write_text(json.dumps(document, indent=2, sort_keys=True))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("No baseline found; run with --save-baseline first.")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text())["results"],
+                          args.time_threshold, args.memory_threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,109 +1,27 @@
 import streamlit as st
-import yfinance as yf
 import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
 from datetime import datetime
-from widgets.technical_charts import create_price_chart, create_gauge
+from widgets.chart import build_indicator_chart, create_gauge, new_figure
+from widgets.asset_data import get_asset_data, get_technical
+from widgets.lod import show_price_chart
+from widgets.fundamentals import show_peers
+from widgets.montecarlo import show_simulation
+from widgets.metrics import SectionTimer, start_metrics_server
+from widgets.search import show_search, require_known_symbol
+from widgets import fundamentals, snapshot
 
 # Configuration de la page
 st.set_page_config(page_title="Asset Details", layout="wide")
+start_metrics_server()
+snapshot.start()
+fundamentals.start()
+timer = SectionTimer("asset")
 
 # Couleurs par défaut
 positive_color = "#34C759"  # Vert
 negative_color = "#FF4B4B"  # Rouge
 
-@st.cache_data(ttl=3600, show_spinner="Loading asset data...")
-def get_asset_data(symbol):
-    """Retrieve asset data via yfinance."""
-    try:
-        asset = yf.Ticker(symbol)
-        return {
-            "info": asset.info,
-            "history": asset.history(period="1y", interval="1d", auto_adjust=False),
-            "financials": asset.financials,
-            "cashflow": asset.cashflow,
-            "dividends": asset.dividends,
-            "major_holders": asset.major_holders,
-            "institutional_holders": asset.institutional_holders,
-            "quarterly_earnings": asset.quarterly_earnings
-        }
-    except Exception as e:
-        st.error(f"Error retrieving data: {str(e)}")
-        st.stop()
-
-def calculate_technical(df):
-    """Calculate technical indicators manually without pandas_ta."""
-    df = df.copy()
-    
-    # RSI
-    delta = df['Close'].diff()
-    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-    
-    # MACD
-    ema12 = df['Close'].ewm(span=12, adjust=False).mean()
-    ema26 = df['Close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = ema12 - ema26
-    df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-    
-    # Stochastic Oscillator (%K)
-    low_14 = df['Low'].rolling(window=14).min()
-    high_14 = df['High'].rolling(window=14).max()
-    df['STOCH_K'] = 100 * (df['Close'] - low_14) / (high_14 - low_14)
-    
-    # CCI
-    typical_price = (df['High'] + df['Low'] + df['Close']) / 3
-    sma_tp = typical_price.rolling(window=20).mean()
-    mean_dev = typical_price.rolling(window=20).apply(lambda x: np.mean(np.abs(x - np.mean(x))))
-    df['CCI'] = (typical_price - sma_tp) / (0.015 * mean_dev)
-    
-    # Williams %R
-    high_14 = df['High'].rolling(window=14).max()
-    low_14 = df['Low'].rolling(window=14).min()
-    df['WILLR'] = -100 * (high_14 - df['Close']) / (high_14 - low_14)
-    
-    # ATR
-    high_low = df['High'] - df['Low']
-    high_close = np.abs(df['High'] - df['Close'].shift())
-    low_close = np.abs(df['Low'] - df['Close'].shift())
-    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    df['ATR'] = tr.rolling(window=14).mean()
-    
-    # Chaikin Oscillator (simplifié)
-    ad = ((2 * df['Close'] - df['High'] - df['Low']) / (df['High'] - df['Low']) * df['Volume']).cumsum()
-    df['CHAIKIN'] = ad.ewm(span=3, adjust=False).mean() - ad.ewm(span=10, adjust=False).mean()
-    
-    # Ultimate Oscillator
-    bp = df['Close'] - df['Low'].shift()
-    tr = pd.concat([df['High'] - df['Low'], np.abs(df['High'] - df['Close'].shift()), np.abs(df['Low'] - df['Close'].shift())], axis=1).max(axis=1)
-    avg7 = (bp.rolling(window=7).sum() / tr.rolling(window=7).sum())
-    avg14 = (bp.rolling(window=14).sum() / tr.rolling(window=14).sum())
-    avg28 = (bp.rolling(window=28).sum() / tr.rolling(window=28).sum())
-    df['UO'] = 100 * (4 * avg7 + 2 * avg14 + avg28) / 7
-    
-    # Bollinger Bands (bonus)
-    df['MA20'] = df['Close'].rolling(window=20).mean()
-    std = df['Close'].rolling(window=20).std()
-    df['BB_Upper'] = df['MA20'] + (std * 2)
-    df['BB_Lower'] = df['MA20'] - (std * 2)
-    
-    # OBV (bonus)
-    df['OBV'] = np.where(df['Close'] > df['Close'].shift(1), df['Volume'], 
-                        np.where(df['Close'] < df['Close'].shift(1), -df['Volume'], 0)).cumsum()
-    
-    # Ichimoku Cloud (bonus)
-    high_9, low_9 = df['High'].rolling(9).max(), df['Low'].rolling(9).min()
-    df['Tenkan'] = (high_9 + low_9) / 2
-    high_26, low_26 = df['High'].rolling(26).max(), df['Low'].rolling(26).min()
-    df['Kijun'] = (high_26 + low_26) / 2
-    df['SenkouA'] = ((df['Tenkan'] + df['Kijun']) / 2).shift(26)
-    df['SenkouB'] = ((df['High'].rolling(52).max() + df['Low'].rolling(52).min()) / 2).shift(26)
-    
-    return df
-
 # Sidebar
 with st.sidebar:
     st.markdown("""
@@ -116,14 +34,29 @@ with st.sidebar:
         bollinger_enabled = st.checkbox("Bollinger Bands", True)
         ichimoku_enabled = st.checkbox("Ichimoku Cloud", False)
         obv_enabled = st.checkbox("OBV", False)
+        vwap_enabled = st.checkbox("VWAP", False, help="Session VWAP with 1 and 2 standard-deviation bands "
+                                                       "(intraday periods) and VWAP anchored at the period start")
+        profile_enabled = st.checkbox("Volume Profile", False,
+                                      help="Volume traded by price level, with point of control and 70% value area")
+        adjusted = st.checkbox("Dividend-adjusted prices", False,
+                               help="Price chart, overlays, indicators and gauges on prices adjusted for dividends and splits")
         selected_indicators = [i for i, enabled in [("Bollinger Bands", bollinger_enabled), 
                                                    ("Ichimoku Cloud", ichimoku_enabled), 
-                                                   ("OBV", obv_enabled)] if enabled]
+                                                   ("OBV", obv_enabled),
+                                                   ("VWAP", vwap_enabled),
+                                                   ("Volume Profile", profile_enabled)] if enabled]
+    show_search()
 
-# Récupération des données
-asset_data = get_asset_data(symbol)
+# Récupération des données (symbole inconnu : arrêt avant tout appel réseau)
+require_known_symbol(symbol)
+try:
+    asset_data = get_asset_data(symbol)
+    history = get_technical(symbol, adjusted).frame()  # Vue sur les tableaux partagés, sans copie
+except Exception as e:
+    st.error(f"Error retrieving data for {symbol}: {str(e)}")
+    st.stop()
 info = asset_data["info"]
-history = calculate_technical(asset_data["history"])
+timer.lap("data")
 
 # En-tête principal
 st.subheader(f"{info.get('longName', symbol)} ({symbol})")
@@ -139,6 +72,8 @@ try:
 except Exception as e:
     st.error(f"Error displaying overview: {str(e)}")
 
+timer.lap("overview")
+
 # Layout en deux colonnes
 col1, col2 = st.columns([1, 3])
 
@@ -203,34 +138,35 @@ with col1:
     except Exception as e:
         st.error(f"Error displaying metrics: {str(e)}")
 
+timer.lap("metrics")
+
 # Colonne droite - Graphique principal
 with col2:
     try:
         chart_type = st.radio("Chart Type", ["Candlestick", "Line"], horizontal=True)
-        create_price_chart(history, chart_type, selected_indicators, key="main_chart")
+        show_price_chart(symbol, chart_type, selected_indicators, key="main_chart", adjusted=adjusted)
     except Exception as e:
         st.error(f"Error displaying chart: {str(e)}")
 
+timer.lap("price_chart")
+
 # Analyse Technique Avancée (RSI et MACD)
 st.subheader("Advanced Technical Analysis")
 try:
     col1, col2 = st.columns(2)
     with col1:
-        fig_rsi = go.Figure()
-        fig_rsi.add_trace(go.Scatter(x=history.index, y=history['RSI'], line=dict(color=positive_color), name="RSI"))
-        fig_rsi.update_layout(title="RSI (14 days)", yaxis_title="RSI", height=300, showlegend=False, template="plotly_white")
-        fig_rsi.add_hline(y=70, line_dash="dash", line_color="red", annotation_text="Overbought")
-        fig_rsi.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Oversold")
+        fig_rsi = build_indicator_chart(history, [("RSI", "RSI", positive_color)], "RSI (14 days)", "RSI",
+                                        levels=[(70, "red", "Overbought"), (30, "green", "Oversold")], showlegend=False)
         st.plotly_chart(fig_rsi, use_container_width=True, key="rsi_chart")
     with col2:
-        fig_macd = go.Figure()
-        fig_macd.add_trace(go.Scatter(x=history.index, y=history['MACD'], line=dict(color=positive_color), name="MACD"))
-        fig_macd.add_trace(go.Scatter(x=history.index, y=history['MACD_Signal'], line=dict(color=negative_color), name="Signal"))
-        fig_macd.update_layout(title="MACD (12/26/9)", yaxis_title="MACD", height=300, template="plotly_white")
+        fig_macd = build_indicator_chart(history, [("MACD", "MACD", positive_color), ("MACD_Signal", "Signal", negative_color)],
+                                         "MACD (12/26/9)", "MACD")
         st.plotly_chart(fig_macd, use_container_width=True, key="macd_chart")
 except Exception as e:
     st.error(f"Error in technical analysis: {str(e)}")
 
+timer.lap("technical_analysis")
+
 # Oscillateurs Techniques (Jauges)
 st.subheader("Technical Oscillators")
 try:
@@ -253,6 +189,17 @@ try:
 except Exception as e:
     st.error(f"Error in oscillators: {str(e)}")
 
+timer.lap("oscillators")
+
+# Simulation de Monte-Carlo (cônes de probabilité et objectif des analystes)
+st.subheader("Price Simulation")
+try:
+    show_simulation(symbol, history, info.get('targetMeanPrice'))
+except Exception as e:
+    st.error(f"Error in price simulation: {str(e)}")
+
+timer.lap("simulation")
+
 # Analyse Fondamentale
 st.subheader("Fundamental Analysis")
 try:
@@ -282,7 +229,7 @@ try:
         st.warning("Cash flow data not available")
 
     # Onglets restants
-    tab1, tab2, tab3, tab4 = st.tabs(["Valuation", "Finances", "Dividends", "Competitors"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Valuation", "Finances", "Dividends", "Peers"])
     with tab1:
         valuation_data = {
             "Ratio": ["P/E", "P/S", "EV/EBITDA", "P/B", "Dividend Yield", "Beta (5Y Monthly)", "EPS (TTM)"],
@@ -323,18 +270,12 @@ try:
         else:
             st.write("No dividend history available.")
     with tab4:
-        st.write("### Major Competitors")
-        st.write("This is a Lite/Demo version. Competitor data is not available in this release.")
-        sector = info.get("sector", "Unknown")
-        if sector == "Technology":
-            st.write("- Microsoft (MSFT)\n- Google (GOOGL)\n- Amazon (AMZN)")
-        elif sector == "Consumer Cyclical":
-            st.write("- Tesla (TSLA)\n- Amazon (AMZN)\n- Walmart (WMT)")
-        else:
-            st.write("Competitor data not readily available in this Lite version.")
+        show_peers(symbol, info)
 except Exception as e:
     st.error(f"Error in fundamental analysis: {str(e)}")
 
+timer.lap("fundamentals")
+
 # Revenue and Earnings
 st.subheader("Revenue and Earnings")
 try:
@@ -345,16 +286,18 @@ try:
             "Revenue (B$)": (quarterly_earnings['Revenue'] / 1e9).tolist(),
             "Earnings (EPS)": quarterly_earnings['Earnings'].tolist()
         }
-        fig_bar = go.Figure()
+        fig_bar = new_figure("Revenue and Earnings by Quarter (Last 4 Quarters)", height=400, date_axis=False,
+                             barmode="group")
         fig_bar.add_trace(go.Bar(x=revenue_data["Quarter"], y=revenue_data["Revenue (B$)"], name="Revenue (B$)", marker_color=positive_color))
         fig_bar.add_trace(go.Bar(x=revenue_data["Quarter"], y=revenue_data["Earnings (EPS)"], name="Earnings (EPS)", marker_color=negative_color))
-        fig_bar.update_layout(barmode='group', title="Revenue and Earnings by Quarter (Last 4 Quarters)", height=400)
         st.plotly_chart(fig_bar, use_container_width=True, key="revenue_earnings_chart")
     else:
         st.write("Données trimestrielles non disponibles via yfinance.")
 except Exception as e:
     st.error(f"Error in revenue and earnings: {str(e)}")
 
+timer.lap("earnings")
+
 # Shareholders and Insiders
 st.subheader("Shareholders and Insiders")
 try:
@@ -392,6 +335,8 @@ try:
 except Exception as e:
     st.error(f"Erreur lors de la récupération des données actionnaires/initiés : {str(e)}")
 
+timer.lap("shareholders")
+
 # Footer
 st.markdown("---")
 st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -0,0 +1,12 @@
+import streamlit as st
+from widgets.compare import show_compare
+from widgets.metrics import start_metrics_server
+
+# Configuration de la page
+st.set_page_config(page_title="Compare", layout="wide")
+start_metrics_server()
+
+with st.sidebar:
+    st.markdown("- 🏠 [Home](/)\n- 📊 [Asset](/asset?symbol=NVDA)\n- 📈 [Compare](/compare)")
+
+show_compare()
@@ -0,0 +1,10 @@
+import streamlit as st
+from widgets.correlation import show_correlation
+
+# Configuration de la page
+st.set_page_config(page_title="Correlation", layout="wide")
+
+with st.sidebar:
+    st.markdown("- 🏠 [Home](/)\n- 📊 [Asset](/asset?symbol=NVDA)")
+
+show_correlation()
@@ -0,0 +1,78 @@
+import os
+import hmac
+import streamlit as st
+import pandas as pd
+from widgets import metrics
+
+# Configuration de la page
+st.set_page_config(page_title="Diagnostics", layout="wide")
+metrics.start_metrics_server()
+
+ADMIN_TOKEN_ENV = "FINLIT_ADMIN_TOKEN"
+
+admin_token = os.environ.get(ADMIN_TOKEN_ENV)
+if not admin_token:
+    st.info(f"Diagnostics are disabled. Set {ADMIN_TOKEN_ENV} to enable this page.")
+    st.stop()
+
+token = st.query_params.get("token") or st.text_input("Admin token", type="password")
+if not hmac.compare_digest(str(token), admin_token):
+    if token:
+        st.error("Invalid token.")
+    st.stop()
+
+st.subheader("Runtime Diagnostics")
+data = metrics.snapshot()
+
+def histogram_table(name: str, label: str) -> pd.DataFrame:
+    rows = []
+    for (metric, labels), (buckets, total, count) in data["histograms"].items():
+        if metric != name or not count:
+            continue
+        rows.append({
+            label: dict(labels)[label],
+            "Count": count,
+            "Mean (ms)": total / count * 1e3,
+            "p50 ≤ (ms)": metrics.quantile(buckets, 0.50) * 1e3,
+            "p95 ≤ (ms)": metrics.quantile(buckets, 0.95) * 1e3,
+            "p99 ≤ (ms)": metrics.quantile(buckets, 0.99) * 1e3,
+            "Total (s)": total,
+        })
+    return pd.DataFrame(rows).sort_values("Total (s)", ascending=False) if rows else pd.DataFrame()
+
+def counter_value(name: str, **labels) -> float:
+    return data["counters"].get((name, tuple(sorted(labels.items()))), 0.0)
+
+st.markdown("#### Sections")
+sections = histogram_table("finlit_section_seconds", "section")
+if not sections.empty:
+    st.dataframe(sections, hide_index=True)
+else:
+    st.write("No section timings yet.")
+
+st.markdown("#### Caches")
+caches = sorted({dict(labels)["cache"] for (name, labels) in data["counters"] if name.startswith("finlit_cache_")})
+cache_rows = []
+for cache in caches:
+    hits = counter_value("finlit_cache_hits_total", cache=cache)
+    misses = counter_value("finlit_cache_misses_total", cache=cache)
+    cache_rows.append({
+        "Cache": cache, "Hits": int(hits), "Misses": int(misses),
+        "Evictions": int(counter_value("finlit_cache_evictions_total", cache=cache)),
+        "Hit rate": f"{hits / (hits + misses) * 100:.1f}%" if hits + misses else "N/A",
+    })
+if cache_rows:
+    st.dataframe(pd.DataFrame(cache_rows), hide_index=True)
+else:
+    st.write("No cache activity yet.")
+
+st.markdown("#### Provider calls")
+calls = histogram_table("finlit_provider_seconds", "call")
+if not calls.empty:
+    calls["Errors"] = [int(counter_value("finlit_provider_errors_total", call=c)) for c in calls["call"]]
+    st.dataframe(calls, hide_index=True)
+else:
+    st.write("No provider calls yet.")
+
+with st.expander("Prometheus export"):
+    st.code(metrics.render_prometheus(), language="text")
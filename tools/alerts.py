@@ -0,0 +1,62 @@
+"""Évaluation périodique des règles d'alerte.
+
+À chaque cycle, les données des symboles suivis sont relues depuis les mêmes caches
+que l'application (indicateurs, cartes d'indices, Fear & Greed) ; seules les règles
+des symboles dont les données ont changé sont évaluées, et les alertes nouvelles
+sont remises aux sinks après déduplication.
+
+Usage :
+    python -m tools.alerts --rules rules.txt --out alerts.jsonl
+    python -m tools.alerts --rules rules.txt --out alerts.jsonl --webhook http://localhost:9000/hook --interval 300
+    python -m tools.alerts --rules rules.txt --out alerts.jsonl --once
+"""
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+from contextlib import ExitStack
+
+from widgets.alerts import AlertEngine, FileSink, Notifier, WebhookSink, read_rules, refresh
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate alert rules against the dashboard data")
+    parser.add_argument("--rules", type=Path, required=True, help="rule file, one 'SYMBOL FIELD OPERATOR TARGET' per line")
+    parser.add_argument("--out", type=Path, required=True, help="JSON lines file receiving the alerts")
+    parser.add_argument("--webhook", help="also POST each batch of alerts to this URL")
+    parser.add_argument("--interval", type=float, default=300, help="seconds between refresh cycles")
+    parser.add_argument("--cooldown", type=float, default=3600, help="minimum seconds between two alerts of a rule")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--fake-provider", action="store_true", help="deterministic synthetic data (dry runs)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    try:
+        engine = AlertEngine(read_rules(args.rules))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    with ExitStack() as stack:
+        if args.fake_provider:
+            from tools.fake_provider import installed
+            stack.enter_context(installed())
+        return run(engine, args)
+
+def run(engine: AlertEngine, args) -> int:
+    sinks = [FileSink(args.out)] + ([WebhookSink(args.webhook)] if args.webhook else [])
+    notifier = Notifier(sinks, cooldown=args.cooldown, state_path=args.out.with_suffix(".state.json"))
+    print(f"{len(engine)} rules over {len(engine.symbols)} symbols")
+    try:
+        while True:
+            start = time.perf_counter()
+            changed = refresh(engine)
+            loaded = time.perf_counter()
+            sent = notifier.notify(engine.evaluate())
+            print(f"{changed} symbols changed, {len(sent)} alerts "
+                  f"(refresh {loaded - start:.2f}s, evaluation {(time.perf_counter() - loaded) * 1e3:.1f} ms)", flush=True)
+            if args.once:
+                return 0
+            time.sleep(max(0.0, args.interval - (time.perf_counter() - start)))
+    except KeyboardInterrupt:
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
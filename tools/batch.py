@@ -0,0 +1,230 @@
+"""Calcul en lot des indicateurs techniques, rendements et composantes de sentiment.
+
+Les symboles défilent dans un pool de processus borné : au plus `2 x workers`
+tâches sont en vol, chaque worker charge un historique (magasin mappé local s'il
+est frais, sinon le fournisseur), calcule `calculate_technical`, les rendements et
+les composantes momentum / force du Fear & Greed, écrit un fichier Parquet par
+symbole et ne renvoie qu'une ligne de synthèse. La mémoire reste donc constante
+quel que soit le nombre de symboles.
+
+Chaque symbole terminé est ajouté au journal `progress.jsonl` ; une exécution
+relancée sur le même répertoire de sortie reprend là où elle s'était arrêtée.
+
+Usage :
+    python -m tools.batch AAPL MSFT NVDA --out batch/
+    python -m tools.batch --symbols-file universe.txt --out batch/ --workers 8
+    python -m tools.batch --all --out batch/ --retry-failed
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+JOURNAL = "progress.jsonl"
+SUMMARY = "summary.parquet"
+HISTORY_PERIOD = "1y"  # Période publiée dans le magasin mappé par l'application
+RETURN_WINDOWS = {"return_1d": 1, "return_1w": 5, "return_1m": 21, "return_3m": 63, "return_1y": 252}
+
+_fake_provider = None  # Contexte du fournisseur factice, gardé ouvert pour la durée du worker
+
+def _init_worker(state_dir: str = None):
+    """Installe le fournisseur factice dans le worker, sur les magasins isolés du processus parent."""
+    global _fake_provider
+    if state_dir:
+        from tools.fake_provider import installed
+        _fake_provider = installed(state_dir=Path(state_dir))
+        _fake_provider.__enter__()
+
+def load_history(symbol: str, period: str, max_age: float) -> pd.DataFrame:
+    """Historique journalier depuis le magasin mappé (s'il couvre la période et est frais), sinon le fournisseur."""
+    from widgets import provider, mmap_store
+
+    if period == HISTORY_PERIOD:
+        stored = mmap_store.read("history", (symbol,), max_age=max_age)
+        if stored is not None:
+            return stored
+    return provider.history(symbol, period=period, interval="1d", auto_adjust=False)
+
+def process_symbol(symbol: str, period: str, max_age: float, output_dir: str, adjusted: bool = False) -> dict:
+    """Calcule et écrit les séries d'un symbole ; renvoie sa ligne de synthèse (ou l'erreur).
+
+    Avec `adjusted`, les prix sont ajustés des dividendes et divisions avant tout calcul :
+    les rendements sont alors des rendements totaux.
+    """
+    from widgets.adjust import adjust
+    from widgets.indicators import calculate_technical
+    from widgets.fear import calculate_component_momentum, calculate_component_strength
+
+    start = time.perf_counter()
+    try:
+        history = load_history(symbol, period, max_age)
+        if history is None or history.empty or "Close" not in history:
+            return {"symbol": symbol, "error": "no data"}
+        numeric = history.select_dtypes("number").astype(np.float64)
+        df = calculate_technical(adjust(numeric) if adjusted else numeric)
+        close = df["Close"]
+        df["Return"] = close.pct_change()
+        df["LogReturn"] = np.log(close).diff()
+
+        path = Path(output_dir) / "technical" / f"{_filename(symbol)}.parquet"
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(tmp)
+        os.replace(tmp, path)  # Un fichier présent est toujours complet
+
+        last = df.iloc[-1]
+        summary = {"symbol": symbol, "error": None, "rows": len(df), "as_of": df.index[-1].isoformat(),
+                   "close": float(last["Close"]), "rsi": float(last["RSI"]), "macd": float(last["MACD"]),
+                   "momentum": float(calculate_component_momentum(df)),
+                   "strength": float(calculate_component_strength(df))}
+        values = close.to_numpy()
+        for name, lag in RETURN_WINDOWS.items():
+            summary[name] = float(values[-1] / values[-1 - lag] - 1) if len(values) > lag else None
+        summary["volatility_1y"] = float(df["LogReturn"].tail(252).std() * np.sqrt(252))
+        summary["seconds"] = round(time.perf_counter() - start, 4)
+        return summary
+    except Exception as e:
+        return {"symbol": symbol, "error": f"{type(e).__name__}: {e}"}
+
+def _filename(symbol: str) -> str:
+    return "".join(c if c.isalnum() or c in "-._" else "_" for c in symbol)
+
+def read_journal(output_dir: Path) -> dict:
+    """Dernière ligne de synthèse par symbole (une ligne tronquée par une interruption est ignorée)."""
+    done = {}
+    path = output_dir / JOURNAL
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[row["symbol"]] = row
+    return done
+
+def read_symbols(args) -> list:
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        text = args.symbols_file.read_text(encoding="utf-8")
+        if args.symbols_file.suffix == ".csv":
+            symbols += pd.read_csv(args.symbols_file)["symbol"].astype(str).tolist()
+        else:
+            symbols += [line.split("#")[0].strip() for line in text.splitlines()]
+    if args.all:
+        from widgets.symbol_index import symbols_path
+        symbols += pd.read_csv(symbols_path())["symbol"].astype(str).tolist()
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+def market_volatility(period: str, max_age: float):
+    """Composante volatilité (VIX), commune à tous les symboles."""
+    from widgets.fear import VIX_SYMBOL, calculate_component_volatility
+    try:
+        return float(calculate_component_volatility(load_history(VIX_SYMBOL, period, max_age)))
+    except Exception as e:
+        print(f"VIX unavailable, volatility component skipped: {e}", file=sys.stderr)
+        return None
+
+def run(symbols: list, output_dir: Path, workers: int, period: str = HISTORY_PERIOD, max_age: float = None,
+        retry_failed: bool = False, fake: bool = False, adjusted: bool = False) -> dict:
+    """Traite les symboles restants et écrit la synthèse ; renvoie les compteurs de l'exécution."""
+    with ExitStack() as stack:
+        state_dir = None
+        if fake:
+            # Magasins disque temporaires partagés avec les workers : pas de données factices dans les vrais caches
+            from tools.fake_provider import installed
+            state_dir = str(stack.enter_context(installed()))
+        return _run(symbols, output_dir, workers, period, max_age, retry_failed, state_dir, adjusted)
+
+def _run(symbols: list, output_dir: Path, workers: int, period: str, max_age: float, retry_failed: bool,
+         state_dir: str, adjusted: bool) -> dict:
+    (output_dir / "technical").mkdir(parents=True, exist_ok=True)
+    for tmp in (output_dir / "technical").glob("*.tmp"):
+        tmp.unlink(missing_ok=True)  # Écritures interrompues d'une exécution précédente
+    done = read_journal(output_dir)
+    pending = [s for s in symbols if s not in done or (retry_failed and done[s].get("error"))]
+    print(f"{len(symbols)} symbols, {len(symbols) - len(pending)} already done, {len(pending)} to process "
+          f"on {workers} workers")
+
+    ok = failed = 0
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    queue = iter(pending)
+    with open(output_dir / JOURNAL, "a", encoding="utf-8") as journal, \
+            ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(state_dir,)) as pool:
+        in_flight = set()
+        try:
+            while True:
+                # File bornée : de nouveaux symboles ne sont soumis qu'à mesure que d'autres se terminent
+                for symbol in queue:
+                    in_flight.add(pool.submit(process_symbol, symbol, period, max_age, str(output_dir), adjusted))
+                    if len(in_flight) >= 2 * workers:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    row = future.result()
+                    journal.write(json.dumps(row, separators=(",", ":")) + "\n")
+                    if row["error"]:
+                        failed += 1
+                    else:
+                        ok += 1
+                journal.flush()
+                processed = ok + failed
+                if processed % 100 < len(finished):
+                    rate = processed / (time.perf_counter() - start)
+                    print(f"  {processed}/{len(pending)} ({rate:.1f} symbols/s, {failed} failed)", flush=True)
+        except KeyboardInterrupt:
+            for future in in_flight:
+                future.cancel()
+            print(f"Interrupted after {ok + failed} symbols; rerun the same command to resume.", file=sys.stderr)
+            raise
+
+    wanted = set(symbols)
+    rows = [row for row in read_journal(output_dir).values() if row["symbol"] in wanted]
+    summary = pd.DataFrame([row for row in rows if not row.get("error")])
+    if not summary.empty:
+        summary = summary.drop(columns=["error"]).set_index("symbol").sort_index()
+        summary["market_volatility"] = market_volatility(period, max_age)
+        summary.to_parquet(output_dir / SUMMARY)
+    elapsed = time.perf_counter() - start
+    print(f"Processed {ok + failed} symbols in {elapsed:.1f}s ({ok} ok, {failed} failed); "
+          f"{len(summary)} rows in {output_dir / SUMMARY}")
+    return {"processed": ok + failed, "ok": ok, "failed": failed, "summary_rows": len(summary)}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compute indicators, returns and sentiment components in bulk")
+    parser.add_argument("symbols", nargs="*", help="symbols to process")
+    parser.add_argument("--symbols-file", type=Path, help="text file (one symbol per line) or CSV with a symbol column")
+    parser.add_argument("--all", action="store_true", help="every symbol of the symbol master file")
+    parser.add_argument("--out", type=Path, required=True, help="output directory (reused to resume)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--period", default=HISTORY_PERIOD, help="history period (the local store holds 1y)")
+    parser.add_argument("--max-age", type=float, default=24 * 3600,
+                        help="maximum age (s) of a locally stored history before it is fetched again")
+    parser.add_argument("--retry-failed", action="store_true", help="reprocess symbols that failed in a previous run")
+    parser.add_argument("--adjusted", action="store_true",
+                        help="adjust prices for dividends and splits first (total returns)")
+    parser.add_argument("--fake-provider", action="store_true", help="deterministic synthetic data (dry runs)")
+    args = parser.parse_args(argv)
+
+    symbols = read_symbols(args)
+    if not symbols:
+        parser.error("no symbols given")
+    try:
+        result = run(symbols, args.out, max(1, args.workers), args.period, args.max_age,
+                     args.retry_failed, args.fake_provider, args.adjusted)
+    except KeyboardInterrupt:
+        return 130
+    return 0 if result["ok"] or not result["processed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
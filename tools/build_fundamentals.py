@@ -0,0 +1,61 @@
+"""Construit la table transversale des fondamentaux (.cache/fundamentals.npz).
+
+Télécharge le dict `info` de chaque société (P/E, P/S, EV/EBITDA, P/B, rendement,
+bêta, capitalisation, marges, secteur, industrie) avec un pool de threads, puis
+publie la table d'un bloc. À lancer périodiquement (cron) : l'application la
+recharge dès que le fichier change, sans redémarrage.
+
+Usage :
+    python -m tools.build_fundamentals                     # sociétés du fichier maître
+    python -m tools.build_fundamentals --symbols-file universe.txt --workers 16
+    python -m tools.build_fundamentals AAPL MSFT NVDA --output /tmp/fundamentals.npz
+    python -m tools.build_fundamentals --fake-provider --output /tmp/fundamentals.npz  # --output obligatoire
+"""
+import argparse
+import sys
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from tools.batch import read_symbols
+from widgets.fundamentals import build, fundamentals_path, universe
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the cross-sectional fundamentals table used for peers")
+    parser.add_argument("symbols", nargs="*", help="symbols to include (default: every company of the master file)")
+    parser.add_argument("--symbols-file", type=Path, help="text file (one symbol per line) or CSV with a symbol column")
+    parser.add_argument("--output", type=Path, help=f"table written (default: {fundamentals_path()})")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent provider requests")
+    parser.add_argument("--fake-provider", action="store_true", help="deterministic synthetic data (dry runs)")
+    args = parser.parse_args(argv)
+    if args.fake_provider and not args.output:
+        parser.error("--fake-provider requires --output: synthetic data must not replace the live table")
+    output = args.output or fundamentals_path()
+
+    with ExitStack() as stack:
+        if args.fake_provider:
+            from tools.fake_provider import installed
+            stack.enter_context(installed())
+        symbols = read_symbols(argparse.Namespace(symbols=args.symbols, symbols_file=args.symbols_file, all=False))
+        symbols = symbols or universe()
+        if not symbols:
+            parser.error("no symbols given and no symbol master file installed")
+
+        start = time.perf_counter()
+
+        def progress(done, total):
+            if done % 100 == 0 or done == total:
+                print(f"  {done}/{total} ({done / (time.perf_counter() - start):.1f} symbols/s)", flush=True)
+
+        table = build(symbols, args.workers, progress)
+    if not len(table):
+        print("No fundamentals retrieved; existing table left untouched.", file=sys.stderr)
+        return 1
+    table.save(output)
+    sectors = len(table.sector_index[0])
+    print(f"{len(table)}/{len(symbols)} companies in {sectors} sectors written to {output} "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Construit le fichier maître des symboles (data/symbols.csv).
+
+Fusionne les annuaires publics de NASDAQ Trader (titres cotés au NASDAQ et sur les
+autres bourses américaines, plusieurs dizaines de milliers de lignes) avec le
+fichier existant, qui conserve les indices, devises, contrats à terme, cryptos et
+titres étrangers au format Yahoo. Les lignes existantes priment.
+
+Usage :
+    python -m tools.build_symbols                          # télécharge puis fusionne
+    python -m tools.build_symbols --source-dir downloads/  # fichiers déjà téléchargés
+"""
+import argparse
+import csv
+import sys
+import urllib.request
+from pathlib import Path
+
+from widgets.symbol_index import symbols_path, SymbolIndex
+
+SOURCES = {
+    "nasdaqlisted.txt": "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt",
+    "otherlisted.txt": "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt",
+}
+EXCHANGES = {"A": "NYSE American", "N": "NYSE", "P": "NYSE Arca", "Z": "Cboe BZX", "V": "IEX"}
+FIELDS = ["symbol", "name", "exchange", "sector"]
+
+def _read_source(name: str, source_dir: Path = None) -> list:
+    if source_dir:
+        text = (source_dir / name).read_text(encoding="utf-8", errors="replace")
+    else:
+        with urllib.request.urlopen(SOURCES[name], timeout=30) as response:
+            text = response.read().decode("utf-8", errors="replace")
+    lines = [line for line in text.splitlines() if line and not line.startswith("File Creation Time")]
+    return list(csv.DictReader(lines, delimiter="|"))
+
+def _yahoo_symbol(symbol: str):
+    """BRK.B -> BRK-B ; les titres privilégiés ou droits ($, ^, espaces) sont ignorés."""
+    if not symbol or any(c in symbol for c in "$^ "):
+        return None
+    return symbol.replace(".", "-")
+
+def listed_symbols(source_dir: Path = None) -> list:
+    rows = []
+    for record in _read_source("nasdaqlisted.txt", source_dir):
+        symbol = _yahoo_symbol(record.get("Symbol"))
+        if symbol and record.get("Test Issue") != "Y":
+            rows.append({"symbol": symbol, "name": record.get("Security Name", ""), "exchange": "NASDAQ",
+                         "sector": "ETF" if record.get("ETF") == "Y" else ""})
+    for record in _read_source("otherlisted.txt", source_dir):
+        symbol = _yahoo_symbol(record.get("ACT Symbol"))
+        if symbol and record.get("Test Issue") != "Y":
+            rows.append({"symbol": symbol, "name": record.get("Security Name", ""),
+                         "exchange": EXCHANGES.get(record.get("Exchange"), record.get("Exchange", "")),
+                         "sector": "ETF" if record.get("ETF") == "Y" else ""})
+    return rows
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the symbol master file used by the search index")
+    parser.add_argument("--source-dir", type=Path, help="directory holding nasdaqlisted.txt and otherlisted.txt")
+    parser.add_argument("--output", type=Path, default=symbols_path())
+    args = parser.parse_args(argv)
+
+    merged = {row["symbol"]: row for row in listed_symbols(args.source_dir)}
+    if args.output.exists():
+        with open(args.output, newline="", encoding="utf-8") as f:
+            merged.update({row["symbol"]: row for row in csv.DictReader(f)})
+
+    tmp = args.output.with_suffix(".tmp")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(sorted(merged.values(), key=lambda row: row["symbol"]))
+    tmp.replace(args.output)
+    print(f"Wrote {len(merged)} symbols to {args.output} (index: {len(SymbolIndex.from_csv(args.output))} entries)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
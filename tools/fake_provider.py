@@ -0,0 +1,179 @@
+"""Fournisseur de données factice et déterministe, substituable à widgets.provider.
+
+Mêmes formes que yfinance (colonnes MultiIndex de download, attributs d'un Ticker),
+sans réseau : les harnais de profilage et de charge mesurent uniquement notre code.
+Tant qu'il est installé, les magasins disque (mmap, instantané, fondamentaux) sont
+redirigés vers un répertoire d'état à part : les données factices ne rejoignent
+jamais les caches de l'application réelle.
+"""
+import os
+import re
+import time
+import zlib
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from widgets import provider
+
+_PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 30, "y": 365}
+_INTERVALS = {"1m": "min", "2m": "2min", "5m": "5min", "15m": "15min", "30m": "30min", "60m": "h",
+              "1h": "h", "1d": "D", "5d": "5D", "1wk": "W", "1mo": "MS", "3mo": "QS"}
+END = pd.Timestamp("2026-10-16 20:00", tz="UTC")
+
+def _seed(*parts) -> int:
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+def _period_days(period: str) -> int:
+    if period == "max":
+        return 365 * 30
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period or "1mo")
+    return int(match.group(1)) * _PERIOD_DAYS[match.group(2)] if match else 30
+
+def fake_history(symbol: str, period: str = "1mo", interval: str = "1d", **_) -> pd.DataFrame:
+    """Barres OHLCV synthétiques (marche aléatoire) couvrant `period` à la résolution `interval`."""
+    freq = _INTERVALS.get(interval, "D")
+    start = END - pd.Timedelta(days=_period_days(period))
+    index = pd.date_range(start, END, freq=freq, name="Date" if freq in ("D", "5D", "W", "MS", "QS") else "Datetime")
+    if freq == "D":
+        index = index[index.dayofweek < 5]
+    rng = np.random.default_rng(_seed(symbol))
+    n = len(index)
+    base = 20 + _seed(symbol, "price") % 500
+    close = base * np.exp(np.cumsum(rng.normal(0.0002, 0.012, n)))
+    open_ = np.concatenate([[base], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.004, n)) * close
+    return pd.DataFrame({
+        "Open": open_, "High": np.maximum(open_, close) + spread, "Low": np.minimum(open_, close) - spread,
+        "Close": close, "Adj Close": close, "Volume": rng.integers(100_000, 20_000_000, n),
+        "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+
+def fake_download(symbols, period: str = "1mo", interval: str = "1d", **_) -> pd.DataFrame:
+    """Équivalent de yf.download : colonnes (Price, Ticker)."""
+    symbols = symbols.split() if isinstance(symbols, str) else list(symbols)
+    frames = {s: fake_history(s, period, interval).drop(columns=["Dividends", "Stock Splits"]) for s in symbols}
+    data = pd.concat(frames, axis=1, names=["Ticker", "Price"]).swaplevel(0, 1, axis=1)
+    return data.sort_index(axis=1, level=0, sort_remaining=False)
+
+class FakeTicker:
+    """Sous-ensemble de yf.Ticker utilisé par l'application."""
+
+    def __init__(self, symbol: str):
+        self.ticker = symbol
+        self._rng = np.random.default_rng(_seed(symbol, "fundamentals"))
+
+    def history(self, period="1mo", interval="1d", **kwargs):
+        return fake_history(self.ticker, period, interval)
+
+    @property
+    def info(self):
+        price = float(fake_history(self.ticker, "5d").iloc[-1]["Close"])
+        rng = np.random.default_rng(_seed(self.ticker, "info"))
+        return {
+            "symbol": self.ticker, "longName": f"{self.ticker} Holdings", "shortName": self.ticker,
+            "longBusinessSummary": f"{self.ticker} is a synthetic company used for offline profiling. " * 8,
+            "website": "https://example.com", "currency": "USD", "exchange": "NMS",
+            "sector": ["Technology", "Consumer Cyclical", "Healthcare", "Financial Services"][_seed(self.ticker) % 4],
+            "industry": "Synthetic", "regularMarketPrice": price, "currentPrice": price,
+            "regularMarketPreviousClose": price * 0.99, "regularMarketOpen": price * 0.995,
+            "regularMarketVolume": int(rng.integers(1e6, 5e7)), "bid": round(price * 0.999, 2), "ask": round(price * 1.001, 2),
+            "marketCap": float(rng.uniform(1e9, 3e12)), "beta": float(rng.uniform(0.5, 2)),
+            "trailingPE": float(rng.uniform(8, 60)), "priceToSalesTrailing12Months": float(rng.uniform(1, 20)),
+            "enterpriseToEbitda": float(rng.uniform(5, 40)), "priceToBook": float(rng.uniform(1, 30)),
+            "trailingEps": float(rng.uniform(1, 20)), "dividendRate": 1.0, "dividendYield": float(rng.uniform(0, 0.04)),
+            "payoutRatio": 0.3, "targetMeanPrice": price * float(rng.uniform(0.9, 1.3)),
+            "profitMargins": float(rng.uniform(0, 0.4)), "grossMargins": float(rng.uniform(0.2, 0.8)),
+            "operatingMargins": float(rng.uniform(0, 0.5)),
+        }
+
+    def _annual_frame(self, rows: dict) -> pd.DataFrame:
+        columns = pd.to_datetime(["2025-12-31", "2024-12-31", "2023-12-31", "2022-12-31"])
+        return pd.DataFrame({c: {k: v * (1 - 0.08 * i) for k, v in rows.items()} for i, c in enumerate(columns)})
+
+    @property
+    def financials(self):
+        revenue = float(self._rng.uniform(1e9, 4e11))
+        return self._annual_frame({"Total Revenue": revenue, "Net Income": revenue * 0.15,
+                                   "Ebit": revenue * 0.2, "Gross Profit": revenue * 0.45})
+
+    @property
+    def cashflow(self):
+        return self._annual_frame({"Free Cash Flow": float(self._rng.uniform(1e8, 1e11))})
+
+    @property
+    def dividends(self):
+        dates = pd.date_range(END - pd.Timedelta(days=365 * 6), END, freq="QS", tz="UTC", name="Date")
+        return pd.Series(0.25, index=dates, name="Dividends")
+
+    @property
+    def major_holders(self):
+        return pd.DataFrame({"Value": [0.02, 0.65, 0.66, 3500.0]},
+                            index=["insidersPercentHeld", "institutionsPercentHeld",
+                                   "institutionsFloatPercentHeld", "institutionsCount"])
+
+    @property
+    def institutional_holders(self):
+        return pd.DataFrame({
+            "Date Reported": pd.to_datetime(["2026-06-30"] * 3), "Holder": ["Vanguard", "BlackRock", "State Street"],
+            "% Out": [0.08, 0.07, 0.04], "Shares": [1.2e9, 1.0e9, 6e8], "Value": [1.5e11, 1.2e11, 7e10],
+        })
+
+    @property
+    def quarterly_earnings(self):
+        index = pd.to_datetime(["2025-12-31", "2026-03-31", "2026-06-30", "2026-09-30"])
+        return pd.DataFrame({"Revenue": self._rng.uniform(1e9, 1e11, 4), "Earnings": self._rng.uniform(0.5, 5, 4)}, index=index)
+
+def store_paths(state_dir: Path) -> dict:
+    """Variables d'environnement plaçant les magasins disque dans `state_dir`."""
+    from widgets.fundamentals import FUNDAMENTALS_PATH_ENV
+    from widgets.mmap_store import STORE_PATH_ENV
+    from widgets.snapshot import SNAPSHOT_PATH_ENV
+
+    return {STORE_PATH_ENV: str(state_dir / "mmap"), SNAPSHOT_PATH_ENV: str(state_dir / "snapshot.pkl"),
+            FUNDAMENTALS_PATH_ENV: str(state_dir / "fundamentals.npz")}
+
+@contextmanager
+def installed(latency: float = 0.0, state_dir: Path = None):
+    """Remplace yfinance derrière widgets.provider (l'instrumentation reste active).
+
+    `latency` simule le temps réseau de chaque appel, en secondes. Les magasins disque
+    pointent vers `state_dir` (partageable entre processus) ; à défaut, vers un
+    répertoire temporaire supprimé à la sortie. Renvoie ce répertoire.
+    """
+    def delayed(func):
+        def wrapper(*args, **kwargs):
+            if latency:
+                time.sleep(latency)
+            return func(*args, **kwargs)
+        return wrapper
+
+    class DelayedTicker(FakeTicker):
+        def __getattribute__(self, name):
+            if latency and not name.startswith("_") and name != "ticker":
+                time.sleep(latency)
+            return super().__getattribute__(name)
+
+    owned = state_dir is None
+    state_dir = Path(tempfile.mkdtemp(prefix="finlit-fake-")) if owned else Path(state_dir)
+    paths = store_paths(state_dir)
+    saved_env = {name: os.environ.get(name) for name in paths}
+    os.environ.update(paths)  # Lus à chaque accès par les magasins : effet immédiat
+    saved = provider.yf
+    provider.yf = SimpleNamespace(download=delayed(fake_download), Ticker=DelayedTicker if latency else FakeTicker)
+    try:
+        yield state_dir
+    finally:
+        provider.yf = saved
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if owned:
+            shutil.rmtree(state_dir, ignore_errors=True)
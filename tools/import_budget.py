@@ -0,0 +1,107 @@
+"""Rapport du coût d'import des widgets et budget de démarrage.
+
+Les modules importés au niveau module par chaque script de page sont relus dans
+le script lui-même, puis importés dans un interpréteur neuf avec `-X importtime`,
+après Streamlit (déjà chargé par le serveur). On mesure le temps attribuable à nos
+modules, on liste les dépendances les plus lourdes et on échoue si le budget est
+dépassé ou si un module lourd réservé au chargement paresseux est importé d'office.
+
+Usage :
+    python -m tools.import_budget            # rapport + vérification (exit 1 si dépassement)
+    python -m tools.import_budget --top 25
+"""
+import argparse
+import ast
+import json
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Script de chaque page mesurée
+PAGES = {"home": "app.py", "asset": "pages/asset.py"}
+# Temps d'import maximal (médiane, ms) au-delà de Streamlit
+BUDGET_MS = {"home": 600, "asset": 700}
+# Dépendances qui ne doivent être chargées qu'à l'usage
+LAZY_ONLY = ["yfinance", "plotly.express", "pandas_ta"]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+def page_imports(script: str) -> list:
+    """Modules importés au niveau module par `script` (hors Streamlit), dans l'ordre du fichier."""
+    tree = ast.parse((ROOT / script).read_text(encoding="utf-8"))
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # `from widgets import dashboard` importe le sous-module widgets.dashboard
+            submodules = [f"{node.module}.{alias.name}" for alias in node.names
+                          if (ROOT / node.module.replace(".", "/") / f"{alias.name}.py").exists()]
+            modules += submodules or [node.module]
+    return [m for m in dict.fromkeys(modules) if m.split(".")[0] != "streamlit"]
+
+def profile_imports(modules: list) -> dict:
+    """Importe `modules` dans un sous-processus ; renvoie temps, détail et modules chargés."""
+    code = (
+        "import json, sys, streamlit\n"
+        "print('--finlit-start--', file=sys.stderr)\n"
+        f"import {', '.join(modules)}\n"
+        "print(json.dumps(sorted(sys.modules)))\n"
+    )
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    stderr = proc.stderr.split("--finlit-start--", 1)[1]
+
+    total_us, self_by_package = 0, defaultdict(int)
+    for self_us, cumulative_us, indent, name in _LINE.findall(stderr):
+        self_by_package[name.split(".")[0]] += int(self_us)
+        if not indent:
+            total_us += int(cumulative_us)
+    return {
+        "total_ms": total_us / 1000,
+        "self_ms_by_package": {k: v / 1000 for k, v in self_by_package.items()},
+        "loaded": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time report and startup budget")
+    parser.add_argument("--repeat", type=int, default=5, help="interpreter runs per entry point (median kept)")
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages to list")
+    parser.add_argument("--json", type=Path, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    failures, report = [], {}
+    for entry, script in PAGES.items():
+        modules = page_imports(script)
+        runs = [profile_imports(modules) for _ in range(args.repeat)]
+        total = statistics.median(r["total_ms"] for r in runs)
+        packages = defaultdict(list)
+        for r in runs:
+            for package, ms in r["self_ms_by_package"].items():
+                packages[package].append(ms)
+        heaviest = sorted(((p, statistics.median(v)) for p, v in packages.items()), key=lambda kv: -kv[1])
+        eager = [m for m in LAZY_ONLY if m in runs[0]["loaded"]]
+        report[entry] = {"total_ms": total, "budget_ms": BUDGET_MS[entry],
+                         "heaviest": dict(heaviest[:args.top]), "eager_lazy_modules": eager}
+
+        print(f"{entry}: {total:.0f} ms (budget {BUDGET_MS[entry]} ms)")
+        for package, ms in heaviest[:args.top]:
+            print(f"  {package:<30} {ms:8.1f} ms")
+        if total > BUDGET_MS[entry]:
+            failures.append(f"{entry}: import time {total:.0f} ms exceeds budget of {BUDGET_MS[entry]} ms")
+        for module in eager:
+            failures.append(f"{entry}: '{module}' is imported at startup but must be loaded lazily")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    for failure in failures:
+        print(f"BUDGET EXCEEDED {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
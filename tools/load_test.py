@@ -0,0 +1,391 @@
+"""Test de charge : des centaines de sessions concurrentes contre de vrais serveurs Streamlit.
+
+Lance un ou plusieurs processus `streamlit` (app.py, fournisseur factice) puis
+simule des sessions de navigateur qui parlent le protocole du websocket
+(/_stcore/stream, messages BackMsg / ForwardMsg) : page d'accueil, fiche d'un
+symbole tiré au hasard (?symbol=...), puis clics courants (type de graphique,
+période, indicateurs, curseurs DCF) séparés de temps de réflexion. Les widgets
+sont retrouvés par libellé dans les éléments renvoyés par le serveur, et leur
+état cumulé est renvoyé à chaque rerun comme le ferait le navigateur.
+
+Mesures : latence de chaque rerun (envoi du message -> script_finished) par étape
+et au global (p50/p95/p99), débit, erreurs, et CPU / RSS de chaque processus
+échantillonnés chaque seconde dans /proc. Le rapport JSON liste les dépassements
+des SLO ; le code de sortie vaut 1 en cas de dépassement.
+
+Usage :
+    python -m tools.load_test --sessions 200 --duration 120 --out loadtest/
+    python -m tools.load_test --sessions 400 --servers 2 --ramp-up 60 --slo-p95 2 --slo-p99 5
+    python -m tools.load_test --url ws://staging:8501 --sessions 50   # serveur existant, sans mesures CPU
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_SCRIPT = str(ROOT / "app.py")
+STREAM_PATH = "/_stcore/stream"
+HEALTH_PATH = "/_stcore/health"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+EXTRA_SYMBOLS = ["AMD", "NFLX", "JPM", "KO", "XOM", "V", "MC.PA", "SAP.DE", "7203.T", "HSBA.L"]
+
+# Parcours : (poids, [(étape, page, action)]) ; action = None (chargement) ou (type, libellé, valeur)
+CLICK_PATHS = [
+    (3, [("home", "", None),
+         ("asset", "asset", None),
+         ("chart_line", "asset", ("radio", "Chart Type", "Line")),
+         ("period_5y", "asset", ("radio", "Period", "5Y")),
+         ("ichimoku", "asset", ("checkbox", "Ichimoku Cloud", True))]),
+    (2, [("asset", "asset", None),
+         ("bollinger", "asset", ("checkbox", "Bollinger Bands", True)),
+         ("dcf_growth", "asset", ("slider", "dcf_growth", 12.0)),
+         ("dcf_discount", "asset", ("slider", "dcf_discount", 8.5))]),
+    (2, [("asset", "asset", None),
+         ("period_1m", "asset", ("radio", "Period", "1M")),
+         ("adjusted", "asset", ("checkbox", "Dividend-adjusted prices", True)),
+         ("vwap", "asset", ("checkbox", "VWAP", True)),
+         ("volume_profile", "asset", ("checkbox", "Volume Profile", True)),
+         ("period_1d", "asset", ("radio", "Period", "1D")),
+         ("obv", "asset", ("checkbox", "OBV", True))]),
+    (1, [("home", "", None),
+         ("home_rerun", "", None),
+         ("indices_crypto", "", ("radio", "indices_market", "Crypto")),
+         ("trending_europe", "", ("radio", "trending_market", "Europe"))]),
+]
+
+# --- Serveurs -----------------------------------------------------------------
+
+def serve(port: int, latency: float, state_dir: Path):
+    """Point d'entrée des processus serveur : Streamlit avec le fournisseur factice."""
+    from streamlit.web import bootstrap
+    from tools.fake_provider import installed
+
+    fake = installed(latency=latency, state_dir=state_dir)
+    fake.__enter__()  # Reste installé jusqu'à la fin du processus
+    options = {"server_port": port, "server_headless": True, "server_fileWatcherType": "none",
+               "server_runOnSave": False, "browser_gatherUsageStats": False}
+    bootstrap.load_config_options(options)  # Comme `streamlit run` : les options doivent précéder run()
+    bootstrap.run(APP_SCRIPT, False, [], options)
+
+def start_servers(count: int, port: int, latency: float, state_dir: Path) -> list:
+    """Lance `count` serveurs sur des ports consécutifs ; caches disque isolés dans `state_dir`."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))}
+    servers = []
+    for i in range(count):
+        log = open(state_dir / f"server-{port + i}.log", "wb")
+        # Le fournisseur factice de chaque serveur place ses magasins disque dans `state_dir`
+        process = subprocess.Popen([sys.executable, "-m", "tools.load_test", "--serve", str(port + i),
+                                    "--latency", str(latency), "--state-dir", str(state_dir)],
+                                   cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        servers.append({"port": port + i, "process": process, "log": log})
+    return servers
+
+def wait_ready(urls: list, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        health = url.replace("ws://", "http://", 1) + HEALTH_PATH
+        while True:
+            try:
+                with urllib.request.urlopen(health, timeout=2) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{health} not ready after {timeout:.0f}s")
+            time.sleep(0.5)
+
+def stop_servers(servers: list) -> None:
+    for server in servers:
+        server["process"].terminate()
+    for server in servers:
+        try:
+            server["process"].wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server["process"].kill()
+        server["log"].close()
+
+# --- Ressources ---------------------------------------------------------------
+
+def proc_usage(pid: int) -> tuple:
+    """(secondes CPU cumulées, RSS en octets) d'un processus, lus dans /proc (Linux) ; None ailleurs."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss = int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, rss  # utime + stime
+
+async def sample_resources(processes: dict, samples: list, interval: float, started: float):
+    """Relève CPU (% d'un cœur sur l'intervalle) et RSS de chaque processus jusqu'à annulation."""
+    previous = {name: proc_usage(pid) for name, pid in processes.items()}
+    last = time.perf_counter()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        for name, pid in processes.items():
+            usage = proc_usage(pid)
+            if usage is None or previous[name] is None:
+                continue
+            cpu = 100 * (usage[0] - previous[name][0]) / (now - last)
+            samples.append({"t": round(now - started, 2), "process": name, "cpu_pct": round(cpu, 1),
+                            "rss_mb": round(usage[1] / 1e6, 1)})
+            previous[name] = usage
+        last = now
+
+# --- Sessions -----------------------------------------------------------------
+
+class Session:
+    """Une session de navigateur simulée sur un websocket."""
+
+    def __init__(self, ws, symbol: str):
+        from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+        self.ws = ws
+        self.symbol = symbol
+        self.page = None
+        self.widgets = {}   # libellé ou clé -> (type, id)
+        self.states = {}    # id -> WidgetState envoyé à chaque rerun
+        self.WidgetStates = WidgetStates
+
+    def _switch(self, page: str):
+        if page != self.page:  # Nouvelle page : les widgets de la précédente disparaissent
+            self.page = page
+            self.widgets.clear()
+            self.states.clear()
+
+    def set(self, kind: str, label: str, value):
+        widget = self.widgets.get(label)
+        if widget is None:
+            raise LookupError(f"widget {label!r} not rendered")
+        state = self.WidgetStates().widgets.add()
+        state.id = widget[1]
+        if kind == "radio":
+            state.string_value = value
+        elif kind == "checkbox":
+            state.bool_value = value
+        elif kind == "slider":
+            state.double_array_value.data.append(value)
+        self.states[state.id] = state
+
+    async def rerun(self, page: str, timeout: float) -> dict:
+        """Envoie un rerun et lit les messages jusqu'à script_finished."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        client = message.rerun_script
+        client.query_string = f"symbol={self.symbol}" if page else ""
+        client.page_name = page
+        client.widget_states.widgets.extend(self.states.values())
+        started = time.perf_counter()
+        await self.ws.send(message.SerializeToString())
+        received, errors = 0, []
+        async with asyncio.timeout(timeout):
+            while True:
+                data = await self.ws.recv()
+                received += len(data)
+                forward = ForwardMsg()
+                forward.ParseFromString(data)
+                kind = forward.WhichOneof("type")
+                if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                    element = forward.delta.new_element
+                    element_type = element.WhichOneof("type")
+                    if element_type == "exception":
+                        errors.append(element.exception.message)
+                    elif element_type in ("radio", "checkbox", "slider"):
+                        widget = getattr(element, element_type)
+                        entry = (element_type, widget.id)
+                        self.widgets[widget.label] = entry
+                        user_key = widget.id.rsplit("-", 1)[-1]  # « $$ID-<empreinte>-<clé> »
+                        if user_key != "None":
+                            self.widgets[user_key] = entry
+                elif kind == "script_finished":
+                    return {"latency": time.perf_counter() - started, "bytes": received,
+                            "status": forward.script_finished, "errors": errors}
+
+async def run_session(number: int, url: str, args, symbols: list, deadline: float, started: float,
+                      records: list, failures: defaultdict):
+    from websockets.asyncio.client import connect
+
+    rng = random.Random(args.seed * 100_003 + number)
+    await asyncio.sleep(args.ramp_up * number / max(args.sessions, 1))
+    weights = [w for w, _ in CLICK_PATHS]
+    while time.perf_counter() < deadline:
+        try:
+            async with connect(url + STREAM_PATH, subprotocols=["streamlit"], max_size=None,
+                               open_timeout=args.timeout) as ws:
+                session = Session(ws, rng.choice(symbols))
+                steps = rng.choices(CLICK_PATHS, weights)[0][1]
+                for step, page, action in steps:
+                    if time.perf_counter() >= deadline:
+                        break
+                    session._switch(page)
+                    if action is not None:
+                        session.set(*action)
+                    result = await session.rerun(page, args.timeout)
+                    records.append({"t": round(time.perf_counter() - started, 3), "session": number, "step": step,
+                                    "symbol": session.symbol, "latency_s": result["latency"],
+                                    "bytes": result["bytes"], "errors": len(result["errors"])})
+                    if result["errors"]:
+                        failures[f"exception: {result['errors'][0][:120]}"] += 1
+                    await asyncio.sleep(rng.expovariate(1 / args.think) if args.think > 0 else 0)
+        except Exception as exc:  # Session perdue (déconnexion, délai, widget absent) : on en rouvre une
+            failures[f"{type(exc).__name__}: {str(exc)[:120]}"] += 1
+            await asyncio.sleep(1)
+
+# --- Rapport ------------------------------------------------------------------
+
+def percentiles(latencies) -> dict:
+    values = np.asarray(latencies, dtype=np.float64)
+    if not len(values):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "p50_s": round(p50, 4), "p95_s": round(p95, 4), "p99_s": round(p99, 4),
+            "max_s": round(values.max(), 4), "mean_s": round(values.mean(), 4)}
+
+def timeline(records: list, samples: list, window: float) -> list:
+    """Fenêtres de `window` secondes : débit, p95 et ressources moyennes de chaque processus."""
+    buckets = defaultdict(lambda: {"latencies": [], "cpu": defaultdict(list), "rss": defaultdict(list)})
+    for r in records:
+        buckets[int(r["t"] // window)]["latencies"].append(r["latency_s"])
+    for s in samples:
+        bucket = buckets[int(s["t"] // window)]
+        bucket["cpu"][s["process"]].append(s["cpu_pct"])
+        bucket["rss"][s["process"]].append(s["rss_mb"])
+    rows = []
+    for key in sorted(buckets):
+        bucket = buckets[key]
+        rows.append({"t": key * window, "reruns_per_s": round(len(bucket["latencies"]) / window, 2),
+                     "p95_s": round(float(np.percentile(bucket["latencies"], 95)), 4) if bucket["latencies"] else None,
+                     "cpu_pct": {p: round(float(np.mean(v)), 1) for p, v in bucket["cpu"].items()},
+                     "rss_mb": {p: round(float(np.max(v)), 1) for p, v in bucket["rss"].items()}})
+    return rows
+
+def slo_violations(summary: dict, args) -> list:
+    overall = summary["overall"]
+    checks = [("p50_s", args.slo_p50), ("p95_s", args.slo_p95), ("p99_s", args.slo_p99)]
+    violations = [f"overall {key[:-2]} {overall[key]:.3f}s > {limit}s" for key, limit in checks
+                  if limit is not None and overall.get(key, 0) > limit]
+    if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+        violations.append(f"error rate {summary['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    if args.min_throughput is not None and summary["reruns_per_s"] < args.min_throughput:
+        violations.append(f"throughput {summary['reruns_per_s']:.2f}/s < {args.min_throughput}/s")
+    if args.max_rss_mb is not None:
+        for name, peak in summary["peak_rss_mb"].items():
+            if name != "client" and peak > args.max_rss_mb:
+                violations.append(f"{name} peak RSS {peak:.0f} MB > {args.max_rss_mb} MB")
+    if not overall.get("count"):
+        violations.append("no rerun completed")
+    return violations
+
+async def load(args, urls: list, processes: dict) -> tuple:
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    records, samples, failures = [], [], defaultdict(int)
+    started = time.perf_counter()
+    deadline = started + args.ramp_up + args.duration
+    sampler = asyncio.create_task(sample_resources(processes, samples, args.sample_interval, started))
+    await asyncio.gather(*(run_session(i, urls[i % len(urls)], args, symbols, deadline, started, records, failures)
+                           for i in range(args.sessions)))
+    sampler.cancel()
+    return records, samples, failures, time.perf_counter() - started
+
+def main(argv=None) -> int:
+    from widgets.asset_data import POPULAR_SYMBOLS
+
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the FinLite app")
+    parser.add_argument("--sessions", type=int, default=100, help="concurrent simulated browser sessions")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load after the ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=10, help="seconds over which sessions are started")
+    parser.add_argument("--think", type=float, default=2.0, help="mean think time between clicks in seconds")
+    parser.add_argument("--symbols", default=",".join(POPULAR_SYMBOLS + EXTRA_SYMBOLS))
+    parser.add_argument("--servers", type=int, default=1, help="server processes started (round-robin)")
+    parser.add_argument("--port", type=int, default=8600, help="port of the first server")
+    parser.add_argument("--url", action="append", help="target an already running server instead (repeatable)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated provider latency in seconds")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds before a rerun counts as failed")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--window", type=float, default=5.0, help="timeline window in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=Path("loadtest"), help="directory for the report")
+    parser.add_argument("--slo-p50", type=float, help="max overall p50 rerun latency in seconds")
+    parser.add_argument("--slo-p95", type=float, default=2.0, help="max overall p95 rerun latency in seconds")
+    parser.add_argument("--slo-p99", type=float, default=5.0, help="max overall p99 rerun latency in seconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="max share of failed reruns")
+    parser.add_argument("--min-throughput", type=float, help="min completed reruns per second")
+    parser.add_argument("--max-rss-mb", type=float, help="max RSS of each server process")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--state-dir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.latency, args.state_dir)
+        return 0
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    servers, processes = [], {"client": os.getpid()}
+    if args.url:
+        urls = [u.rstrip("/") for u in args.url]
+    else:
+        state_dir = Path(tempfile.mkdtemp(prefix="finlit-load-"))
+        servers = start_servers(args.servers, args.port, args.latency, state_dir)
+        urls = [f"ws://127.0.0.1:{s['port']}" for s in servers]
+        processes.update({f"server:{s['port']}": s["process"].pid for s in servers})
+        print(f"Starting {len(servers)} server(s), logs in {state_dir}/")
+    try:
+        wait_ready(urls)
+        print(f"Running {args.sessions} sessions for {args.ramp_up:.0f}s ramp-up + {args.duration:.0f}s")
+        records, samples, failures, elapsed = asyncio.run(load(args, urls, processes))
+    finally:
+        stop_servers(servers)
+
+    failed = sum(failures.values())
+    by_step = defaultdict(list)
+    for r in records:
+        by_step[r["step"]].append(r["latency_s"])
+    peak_rss = {}
+    for s in samples:
+        peak_rss[s["process"]] = max(peak_rss.get(s["process"], 0), s["rss_mb"])
+    summary = {
+        "sessions": args.sessions, "servers": len(urls), "elapsed_s": round(elapsed, 1),
+        "reruns": len(records), "reruns_per_s": round(len(records) / elapsed, 2),
+        "failures": dict(failures), "error_rate": failed / max(len(records) + failed, 1),
+        "overall": percentiles([r["latency_s"] for r in records]),
+        "steps": {step: percentiles(values) for step, values in sorted(by_step.items())},
+        "peak_rss_mb": peak_rss,
+        "mean_cpu_pct": {name: round(float(np.mean([s["cpu_pct"] for s in samples if s["process"] == name])), 1)
+                         for name in peak_rss},
+    }
+    summary["slo_violations"] = slo_violations(summary, args)
+    report = {"summary": summary, "timeline": timeline(records, samples, args.window), "resources": samples}
+    (args.out / "report.json").write_text(json.dumps(report, indent=2))
+    (args.out / "reruns.jsonl").write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    for step, stats in [("overall", summary["overall"]), *summary["steps"].items()]:
+        if stats["count"]:
+            print(f"{step:<14} n={stats['count']:<6} p50 {stats['p50_s'] * 1e3:7.0f} ms  "
+                  f"p95 {stats['p95_s'] * 1e3:7.0f} ms  p99 {stats['p99_s'] * 1e3:7.0f} ms")
+    print(f"Throughput {summary['reruns_per_s']:.2f} reruns/s, {failed} failures")
+    for name, peak in peak_rss.items():
+        print(f"{name:<14} mean CPU {summary['mean_cpu_pct'][name]:5.1f}%  peak RSS {peak:7.1f} MB")
+    for violation in summary["slo_violations"]:
+        print(f"SLO violated: {violation}")
+    print(f"Report written to {args.out}/")
+    return 1 if summary["slo_violations"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
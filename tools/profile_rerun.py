@@ -0,0 +1,191 @@
+"""Profilage headless des reruns complets de app.py et pages/asset.py.
+
+Exécute les vrais scripts via le runtime de test de Streamlit (AppTest) avec le
+fournisseur factice, à froid puis à chaud, et rejoue les interactions courantes.
+Pour chaque scénario : temps mur, temps CPU, allocations, détail par section
+(timers de widgets.metrics) et une pile échantillonnée au format « folded »
+(flamegraph.pl, speedscope, inferno). Les magasins disque (mmap, instantané,
+fondamentaux) vivent dans un répertoire temporaire : `.cache/` n'est jamais touché.
+
+Usage :
+    python -m tools.profile_rerun --out profiles/
+    python -m tools.profile_rerun --symbol MSFT --memory --latency 0.05
+"""
+import argparse
+import json
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from tools.fake_provider import installed, store_paths
+from widgets import dashboard, metrics, snapshot
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_SCRIPT = str(ROOT / "app.py")
+ASSET_SCRIPT = str(ROOT / "pages" / "asset.py")
+
+class StackSampler:
+    """Échantillonne périodiquement les piles de tous les threads (sauf lui-même)."""
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+def _section_totals() -> dict:
+    return {dict(labels)["section"]: total
+            for (name, labels), (_, total, _) in metrics.snapshot()["histograms"].items()
+            if name == "finlit_section_seconds"}
+
+def measure(action, trace_memory: bool = False, sample: bool = True) -> dict:
+    """Exécute `action` (un ou plusieurs reruns) et renvoie les mesures associées."""
+    before = _section_totals()
+    if trace_memory:
+        tracemalloc.start()
+    sampler = StackSampler() if sample else None
+    wall, cpu = time.perf_counter(), time.process_time()
+    if sampler:
+        with sampler:
+            at = action()
+    else:
+        at = action()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    result = {"wall_s": wall, "cpu_s": cpu}
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result.update(alloc_retained_mb=current / 1e6, alloc_peak_mb=peak / 1e6)
+    after = _section_totals()
+    result["sections"] = {k: v - before.get(k, 0.0) for k, v in after.items() if v - before.get(k, 0.0) > 0}
+    result["exceptions"] = [e.value for e in at.exception]
+    if sampler:
+        result["_folded"] = sampler.folded()
+    return result
+
+def _new(script: str, symbol: str = None, timeout: float = 120) -> AppTest:
+    at = AppTest.from_file(script, default_timeout=timeout)
+    if symbol:
+        at.query_params["symbol"] = symbol
+    return at
+
+def _by_label(elements, label):
+    return next(e for e in elements if e.label == label)
+
+def _wipe_stores(state_dir: Path):
+    """Vide les magasins disque et le snapshot en mémoire : le prochain rerun repart du fournisseur."""
+    for path in map(Path, store_paths(state_dir).values()):
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+    snapshot.clear()
+
+def scenarios(symbol: str, state_dir: Path) -> list:
+    """(nom, préparation, action) ; la préparation n'est pas mesurée."""
+    state = {}
+
+    def cold(script, sym=None):
+        def prepare():
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            dashboard.clear()
+            _wipe_stores(state_dir)
+            state["at"] = _new(script, sym)
+        return prepare
+
+    def warm(script, sym=None):
+        def prepare():
+            state["at"] = _new(script, sym)
+            state["at"].run()  # Remplit les caches
+        return prepare
+
+    def rerun():
+        return state["at"].run()
+
+    def interact(change):
+        return lambda: change(state["at"]).run()
+
+    asset_ready = warm(ASSET_SCRIPT, symbol)
+    return [
+        ("home.cold", cold(APP_SCRIPT), rerun),
+        ("home.warm", warm(APP_SCRIPT), rerun),
+        ("asset.cold", cold(ASSET_SCRIPT, symbol), rerun),
+        ("asset.warm", asset_ready, rerun),
+        ("asset.chart_type_line", asset_ready, interact(lambda at: _by_label(at.radio, "Chart Type").set_value("Line"))),
+        ("asset.dcf_growth_slider", asset_ready, interact(lambda at: at.slider(key="dcf_growth").set_value(12.0))),
+        ("asset.dcf_discount_slider", asset_ready, interact(lambda at: at.slider(key="dcf_discount").set_value(8.5))),
+        ("asset.ichimoku_checkbox", asset_ready, interact(lambda at: _by_label(at.checkbox, "Ichimoku Cloud").check())),
+        ("asset.obv_checkbox", asset_ready, interact(lambda at: _by_label(at.checkbox, "OBV").check())),
+    ]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless rerun profiler for the FinLite pages")
+    parser.add_argument("--symbol", default="NVDA")
+    parser.add_argument("--out", type=Path, default=Path("profiles"), help="directory for the report and folded stacks")
+    parser.add_argument("--repeat", type=int, default=3, help="measured runs per scenario (median kept)")
+    parser.add_argument("--memory", action="store_true", help="trace allocations (slows the runs down)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated provider latency in seconds")
+    parser.add_argument("-k", dest="pattern", help="only run scenarios whose name contains this string")
+    args = parser.parse_args(argv)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    report = {}
+    with installed(latency=args.latency) as state_dir:  # Magasins disque temporaires, supprimés en sortie
+        for name, prepare, action in scenarios(args.symbol, state_dir):
+            if args.pattern and args.pattern not in name:
+                continue
+            runs = []
+            for _ in range(args.repeat):
+                prepare()
+                runs.append(measure(action, trace_memory=args.memory))
+            runs.sort(key=lambda r: r["wall_s"])
+            median = runs[len(runs) // 2]
+            (args.out / f"{name}.folded").write_text(median.pop("_folded", ""))
+            for r in runs:
+                r.pop("_folded", None)
+            report[name] = {**median, "wall_s_runs": [r["wall_s"] for r in runs]}
+
+            top = sorted(median["sections"].items(), key=lambda kv: -kv[1])[:3]
+            detail = ", ".join(f"{k} {v * 1e3:.0f}ms" for k, v in top)
+            print(f"{name:<28} wall {median['wall_s'] * 1e3:8.1f} ms  cpu {median['cpu_s'] * 1e3:8.1f} ms  {detail}")
+            if median["exceptions"]:
+                print(f"  exceptions: {median['exceptions']}")
+
+    (args.out / "report.json").write_text(json.dumps(report, indent=2))
+    print(f"Report and folded stacks written to {args.out}/")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
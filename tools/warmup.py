@@ -0,0 +1,25 @@
+"""Préchauffage avant démarrage du serveur.
+
+Restaure le snapshot des caches, récupère les données manquantes ou expirées et
+réécrit le snapshot : le serveur lancé ensuite le recharge et sert la première
+requête comme en régime établi.
+
+Usage :
+    python -m tools.warmup && streamlit run app.py
+"""
+import sys
+import logging
+
+from widgets import snapshot
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    result = snapshot.warm_up(prefetch=True)
+    print(f"Restored {result['restored']} entries, warmed {len(result['warmed'])} datasets "
+          f"into {snapshot.snapshot_path()}")
+    for label in result["failed"]:
+        print(f"  failed: {label}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
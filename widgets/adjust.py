@@ -0,0 +1,129 @@
+"""Ajustement local des historiques pour les opérations sur titres (dividendes, divisions).
+
+Les barres brutes du fournisseur (`auto_adjust=False`) portent déjà leurs colonnes
+« Dividends » et « Stock Splits » : les prix ajustés et la série de rendement total
+se calculent donc sans second téléchargement.
+
+Chaque événement définit un facteur appliqué à toutes les barres qui le précèdent :
+1 - dividende / clôture de la veille pour un dividende, 1 / ratio pour une division
+(le volume étant multiplié par le ratio). Le facteur d'une barre est le produit des
+facteurs des événements postérieurs : un seul produit cumulé, parcouru à rebours.
+
+Yahoo publie des barres déjà ajustées des divisions (`splits_applied=True`, valeur
+par défaut) ; seuls les dividendes restent alors à appliquer.
+"""
+import numpy as np
+import pandas as pd
+
+PRICES = ("Open", "High", "Low", "Close")
+DIVIDENDS = "Dividends"
+SPLITS = "Stock Splits"
+
+def event_factors(close: np.ndarray, dividends: np.ndarray = None, splits: np.ndarray = None,
+                  splits_applied: bool = True) -> tuple:
+    """Facteurs (prix, volume) de l'événement de chaque barre, 1 sans événement.
+
+    Un dividende sur la première barre est ignoré (pas de clôture de la veille connue).
+    """
+    n = len(close)
+    price = np.ones(n)
+    volume = np.ones(n)
+    if dividends is not None and n > 1:
+        dividends = np.nan_to_num(np.asarray(dividends, dtype=np.float64))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = dividends[1:] / close[:-1]
+        price[1:] = np.where((dividends[1:] > 0) & (ratio < 1), 1.0 - ratio, 1.0)
+    if splits is not None and not splits_applied:
+        splits = np.nan_to_num(np.asarray(splits, dtype=np.float64))
+        ratio = np.where(splits > 0, splits, 1.0)
+        price /= ratio
+        volume *= ratio
+    return price, volume
+
+def cumulative_factors(events: np.ndarray) -> np.ndarray:
+    """Produit des facteurs des barres strictement postérieures (produit cumulé à rebours)."""
+    factors = np.ones(len(events))
+    if len(events) > 1:
+        factors[:-1] = np.cumprod(events[:0:-1])[::-1]
+    return factors
+
+class AdjustedHistory:
+    """Historique ajusté tenu à jour événement par événement.
+
+    Les colonnes ajustées sont conservées ; un événement nouveau ne retouche que les
+    barres qui le précèdent (une multiplication sur un préfixe), et les barres ajoutées
+    après le dernier événement sont reprises telles quelles.
+    """
+
+    def __init__(self, df: pd.DataFrame, splits_applied: bool = True):
+        self.splits_applied = splits_applied
+        self.index = df.index
+        self.raw_close = df["Close"].to_numpy(np.float64).copy()
+        self.extra = df.drop(columns=[c for c in (*PRICES, "Volume") if c in df])
+        price, volume = event_factors(self.raw_close, df.get(DIVIDENDS), df.get(SPLITS), splits_applied)
+        self.factor = cumulative_factors(price)
+        volume_factor = cumulative_factors(volume)
+        self.columns = {name: df[name].to_numpy(np.float64) * self.factor for name in PRICES if name in df}
+        if "Volume" in df:
+            self.columns["Volume"] = df["Volume"].to_numpy(np.float64) * volume_factor
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def add_event(self, when, dividend: float = 0.0, split: float = 0.0) -> int:
+        """Applique un dividende ou une division détaché(e) à la date `when` (barre la plus proche
+        à partir de cette date) ; renvoie le nombre de barres réajustées.
+
+        Un événement déjà présent dans les données d'origine ne doit pas être rejoué.
+        """
+        when = pd.Timestamp(when)
+        if when.tz is None and self.index.tz is not None:
+            when = when.tz_localize(self.index.tz)
+        position = int(self.index.searchsorted(when))
+        if position == 0:
+            return 0
+        close = self.raw_close[position - 1:position]
+        price, volume = event_factors(np.append(close, np.nan), [0.0, dividend], [1.0, split], self.splits_applied)
+        price_factor, volume_factor = price[1], volume[1]
+        if price_factor != 1.0:
+            self.factor[:position] *= price_factor
+            for name in PRICES:
+                if name in self.columns:
+                    self.columns[name][:position] *= price_factor
+        if volume_factor != 1.0 and "Volume" in self.columns:
+            self.columns["Volume"][:position] *= volume_factor
+        return position if price_factor != 1.0 or volume_factor != 1.0 else 0
+
+    def append(self, df: pd.DataFrame) -> int:
+        """Ajoute des barres postérieures ; leurs événements réajustent l'historique existant.
+        Renvoie le nombre de barres réajustées par ces événements."""
+        df = df[df.index > self.index[-1]] if len(self.index) else df
+        if df.empty:
+            return 0
+        start = len(self.index)
+        self.index = self.index.append(df.index)
+        self.raw_close = np.concatenate([self.raw_close, df["Close"].to_numpy(np.float64)])
+        self.factor = np.concatenate([self.factor, np.ones(len(df))])
+        for name in self.columns:
+            self.columns[name] = np.concatenate([self.columns[name], df[name].to_numpy(np.float64)])
+        self.extra = pd.concat([self.extra, df.drop(columns=[c for c in (*PRICES, "Volume") if c in df])])
+        touched = 0
+        dividends = df.get(DIVIDENDS, pd.Series(0.0, index=df.index)).fillna(0).to_numpy()
+        splits = df.get(SPLITS, pd.Series(0.0, index=df.index)).fillna(0).to_numpy()
+        for offset in np.flatnonzero((dividends > 0) | (splits > 0)):
+            touched = max(touched, self.add_event(self.index[start + offset], dividends[offset], splits[offset]))
+        return touched
+
+    def frame(self) -> pd.DataFrame:
+        """Prix et volume ajustés, facteur d'ajustement et rendement total (croissance de 1)."""
+        df = pd.DataFrame(self.columns, index=self.index)
+        for name in self.extra.columns:
+            df[name] = self.extra[name].to_numpy()
+        df["AdjFactor"] = self.factor
+        close = df["Close"].to_numpy()
+        df["TotalReturn"] = close / close[0] if len(close) else close
+        return df
+
+def adjust(df: pd.DataFrame, splits_applied: bool = True) -> pd.DataFrame:
+    """Version ajustée de barres brutes (passe unique, vectorisée)."""
+    return AdjustedHistory(df, splits_applied).frame()
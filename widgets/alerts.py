@@ -0,0 +1,309 @@
+"""Moteur de règles d'alerte incrémental.
+
+Une règle s'écrit « SYMBOLE CHAMP OPÉRATEUR CIBLE », la cible étant un nombre ou
+un autre champ du même symbole :
+
+    NVDA RSI crosses_above 70
+    AAPL Close crosses_above BB_Upper
+    FEAR_GREED composite below 25
+    ^GSPC change_pct moves 2
+
+Les champs sont les colonnes de `calculate_technical`, les scores de
+`widgets.fear` (pseudo-symbole FEAR_GREED) et les cotations des cartes d'indices
+(last, prev_close, change_pct ; pour un symbole hors des cartes, ils sont déduits
+de ses clôtures).
+
+Les règles sont stockées en colonnes NumPy triées par symbole (offsets CSR) ;
+les valeurs courantes et précédentes dans deux matrices symboles x champs. Une
+évaluation ne porte que sur les règles des symboles dont les données ont changé
+depuis la précédente, en une passe vectorielle. Une règle ne se déclenche qu'au
+front montant de sa condition (pas de répétition tant qu'elle reste vraie).
+"""
+import json
+import time
+import logging
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("finlite")
+
+FEAR_SYMBOL = "FEAR_GREED"
+FEAR_FIELDS = ("momentum", "strength", "volatility", "composite")
+QUOTE_FIELDS = ("last", "prev_close", "change_pct")
+OPERATORS = ("above", "below", "crosses_above", "crosses_below", "moves")
+ABOVE, BELOW, CROSSES_ABOVE, CROSSES_BELOW, MOVES = range(len(OPERATORS))
+
+_technical_fields = None
+
+def technical_fields() -> frozenset:
+    """Champs d'un symbole : colonnes de calculate_technical (déduites une fois d'un petit historique)
+    et cotations."""
+    global _technical_fields
+    if _technical_fields is None:
+        from widgets.indicators import calculate_technical
+        close = np.linspace(100, 110, 80)
+        sample = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                               "Volume": np.full(80, 1e6)}, index=pd.date_range("2024-01-01", periods=80))
+        _technical_fields = frozenset(calculate_technical(sample).columns) | frozenset(QUOTE_FIELDS)
+    return _technical_fields
+
+def parse_rule(text: str) -> dict:
+    """« SYMBOLE CHAMP OPÉRATEUR CIBLE » -> dict ; ValueError si la règle est invalide."""
+    parts = text.split()
+    if len(parts) != 4:
+        raise ValueError(f"Invalid rule '{text}': expected 'SYMBOL FIELD OPERATOR TARGET'")
+    symbol, field, operator, target = parts
+    symbol = symbol.upper()
+    if operator not in OPERATORS:
+        raise ValueError(f"Invalid rule '{text}': operator must be one of {', '.join(OPERATORS)}")
+    try:
+        threshold, target_field = float(target), None
+    except ValueError:
+        threshold, target_field = np.nan, target
+    allowed = FEAR_FIELDS if symbol == FEAR_SYMBOL else technical_fields()
+    for name in (field, target_field):
+        if name is not None and name not in allowed:
+            raise ValueError(f"Invalid rule '{text}': unknown field '{name}' for {symbol}")
+    if operator == "moves" and target_field is not None:
+        raise ValueError(f"Invalid rule '{text}': 'moves' needs a numeric threshold")
+    return {"rule": " ".join([symbol, field, operator, target]), "symbol": symbol, "field": field,
+            "operator": operator, "threshold": threshold, "target": target_field}
+
+def read_rules(path: Path) -> list:
+    """Règles d'un fichier texte (une par ligne, « # » pour les commentaires)."""
+    lines = (line.split("#")[0].strip() for line in Path(path).read_text(encoding="utf-8").splitlines())
+    return [line for line in lines if line]
+
+class AlertEngine:
+    """Règles indexées par symbole et champ, évaluées sur les seuls symboles modifiés."""
+
+    def __init__(self, rules: list):
+        specs = list({r["rule"]: r for r in (parse_rule(r) if isinstance(r, str) else r for r in rules)}.values())
+        self.symbols = sorted({r["symbol"] for r in specs})
+        self.fields = sorted({r["field"] for r in specs} | {r["target"] for r in specs if r["target"]})
+        self.symbol_ids = {s: i for i, s in enumerate(self.symbols)}
+        self.field_ids = {f: i for i, f in enumerate(self.fields)}
+
+        symbol = np.array([self.symbol_ids[r["symbol"]] for r in specs], dtype=np.int32)
+        order = np.argsort(symbol, kind="stable")
+        self.rules = [specs[i]["rule"] for i in order]
+        self.rule_symbol = symbol[order]
+        self.rule_field = np.array([self.field_ids[specs[i]["field"]] for i in order], dtype=np.int32)
+        self.rule_operator = np.array([OPERATORS.index(specs[i]["operator"]) for i in order], dtype=np.int8)
+        self.rule_threshold = np.array([specs[i]["threshold"] for i in order], dtype=np.float64)
+        self.rule_target = np.array([self.field_ids[specs[i]["target"]] if specs[i]["target"] else -1
+                                     for i in order], dtype=np.int32)
+        self.offsets = np.searchsorted(self.rule_symbol, np.arange(len(self.symbols) + 1)).astype(np.int64)
+        self.active = np.zeros(len(self.rules), dtype=bool)
+
+        # Champs utilisés par chaque symbole (ceux à lire lors d'une mise à jour)
+        used = [set() for _ in self.symbols]
+        for s, f, t in zip(self.rule_symbol, self.rule_field, self.rule_target):
+            used[s].add(self.fields[f])
+            if t >= 0:
+                used[s].add(self.fields[t])
+        self.symbol_fields = [sorted(u) for u in used]
+
+        # Valeurs courantes / précédentes à plat, suivies des seuils constants des règles : la
+        # valeur et le niveau de chaque règle se lisent par un seul accès indexé (cellule)
+        cells = len(self.symbols) * len(self.fields)
+        self._current = np.concatenate([np.full(cells, np.nan), self.rule_threshold])
+        self._previous = self._current.copy()
+        self.current = self._current[:cells].reshape(len(self.symbols), len(self.fields))
+        self.previous = self._previous[:cells].reshape(len(self.symbols), len(self.fields))
+        width = max(len(self.fields), 1)
+        self.rule_cell = self.rule_symbol.astype(np.int64) * width + self.rule_field
+        self.rule_level_cell = np.where(self.rule_target >= 0, self.rule_symbol.astype(np.int64) * width + self.rule_target,
+                                        cells + np.arange(len(self.rules)))
+        # « below » et « crosses_below » : comparaisons inversées par le signe
+        self.rule_sign = np.where(np.isin(self.rule_operator, (BELOW, CROSSES_BELOW)), -1.0, 1.0)
+        self.rule_cross = np.isin(self.rule_operator, (CROSSES_ABOVE, CROSSES_BELOW))
+        self.rule_moves = self.rule_operator == MOVES
+        self.as_of = [None] * len(self.symbols)
+        self._dirty = set()
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _columns(self, symbol: str, available) -> tuple:
+        i = self.symbol_ids.get(symbol)
+        if i is None:
+            return None, [], []
+        names = [f for f in self.symbol_fields[i] if f in available]
+        return i, names, [self.field_ids[f] for f in names]
+
+    def update(self, symbol: str, values: dict, as_of=None) -> bool:
+        """Nouvelle observation ponctuelle (score, cotation) ; les valeurs courantes passent en précédentes.
+
+        Renvoie False (symbole non marqué) si rien n'a changé.
+        """
+        i, names, ids = self._columns(symbol, values)
+        if i is None or not ids:
+            return False
+        new = np.array([np.nan if values[f] is None else values[f] for f in names], dtype=np.float64)
+        if np.array_equal(new, self.current[i, ids], equal_nan=True):
+            return False
+        self.previous[i, ids] = self.current[i, ids]
+        self.current[i, ids] = new
+        self.as_of[i] = as_of
+        self._dirty.add(i)
+        return True
+
+    def update_frame(self, symbol: str, df: pd.DataFrame) -> bool:
+        """Historique (sortie de calculate_technical) : valeurs des deux dernières barres."""
+        i, names, ids = self._columns(symbol, df.columns)
+        if i is None or not ids or df.empty or df.index[-1] == self.as_of[i]:
+            return False
+        rows = df[names].to_numpy(dtype=np.float64)[-2:]
+        self.previous[i, ids] = rows[0] if len(rows) == 2 else np.nan
+        self.current[i, ids] = rows[-1]
+        self.as_of[i] = df.index[-1]
+        self._dirty.add(i)
+        return True
+
+    def evaluate(self, symbols=None) -> list:
+        """Alertes déclenchées pour `symbols` (par défaut : les symboles modifiés depuis la dernière évaluation)."""
+        if symbols is None:
+            ids = np.fromiter(self._dirty, dtype=np.int64, count=len(self._dirty))
+            self._dirty.clear()
+        else:
+            ids = np.array([self.symbol_ids[s] for s in symbols if s in self.symbol_ids], dtype=np.int64)
+        if not len(ids):
+            return []
+        starts, lengths = self.offsets[ids], self.offsets[ids + 1] - self.offsets[ids]
+        total = int(lengths.sum())
+        if not total:
+            return []
+        # Indices des règles concernées : concaténation des plages [start, end) sans boucle
+        rules = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+
+        value, before = self._current[self.rule_cell[rules]], self._previous[self.rule_cell[rules]]
+        level_cell = self.rule_level_cell[rules]
+        level, level_before = self._current[level_cell], self._previous[level_cell]
+        moves = self.rule_moves[rules]
+        if moves.any():
+            value[moves] = np.abs(value[moves])
+        sign = self.rule_sign[rules]
+        condition = value * sign > level * sign
+        condition &= ~self.rule_cross[rules] | (before * sign <= level_before * sign)
+        fired = rules[condition & ~self.active[rules]]
+        self.active[rules] = condition
+
+        alerts = []
+        for r in fired:
+            s = self.rule_symbol[r]
+            as_of = self.as_of[s]
+            alerts.append({
+                "rule": self.rules[r], "symbol": self.symbols[s], "field": self.fields[self.rule_field[r]],
+                "value": float(self.current[s, self.rule_field[r]]),
+                "level": float(self._current[self.rule_level_cell[r]]),
+                "as_of": as_of.isoformat() if hasattr(as_of, "isoformat") else as_of,
+            })
+        return alerts
+
+class FileSink:
+    """Une alerte par ligne JSON, ajoutée au fichier."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def send(self, alerts: list):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(a, separators=(",", ":")) + "\n" for a in alerts)
+
+class WebhookSink:
+    """POST JSON du lot d'alertes vers une URL (une erreur est journalisée, pas propagée)."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alerts: list):
+        request = urllib.request.Request(self.url, data=json.dumps({"alerts": alerts}).encode(),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except Exception as e:
+            logger.warning("Alert webhook %s failed: %s", self.url, e)
+
+class Notifier:
+    """Déduplique les alertes (même règle et même barre, ou même règle pendant `cooldown` secondes)
+    avant de les remettre aux sinks ; l'état peut être conservé entre deux exécutions."""
+
+    def __init__(self, sinks: list, cooldown: float = 3600, state_path: Path = None, max_keys: int = 100_000):
+        self.sinks = sinks
+        self.cooldown = cooldown
+        self.state_path = Path(state_path) if state_path else None
+        self.max_keys = max_keys
+        self.sent = OrderedDict()  # règle -> (as_of, instant d'envoi)
+        if self.state_path and self.state_path.exists():
+            try:
+                self.sent.update((k, tuple(v)) for k, v in json.loads(self.state_path.read_text()).items())
+            except Exception as e:
+                logger.warning("Ignoring unreadable alert state %s: %s", self.state_path, e)
+
+    def notify(self, alerts: list) -> list:
+        now = time.time()
+        fresh = []
+        for alert in alerts:
+            last = self.sent.get(alert["rule"])
+            if last and (last[0] == alert["as_of"] or now - last[1] < self.cooldown):
+                continue
+            self.sent[alert["rule"]] = (alert["as_of"], now)
+            self.sent.move_to_end(alert["rule"])
+            fresh.append(alert)
+        while len(self.sent) > self.max_keys:
+            self.sent.popitem(last=False)
+        if fresh:
+            for sink in self.sinks:
+                sink.send(fresh)
+            if self.state_path:
+                tmp = self.state_path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(self.sent))
+                tmp.replace(self.state_path)
+        return fresh
+
+def refresh(engine: AlertEngine) -> int:
+    """Alimente le moteur depuis les mêmes fonctions que l'application ; renvoie le nombre de
+    symboles dont les données ont changé (les seuls qui seront évalués)."""
+    from widgets.indices import MARCHES, index_snapshot
+    from widgets.asset_data import get_technical
+    from widgets.fear import calculate_fear_greed_index
+
+    changed = 0
+    index_markets = {m for m, indices in MARCHES.items() for s in indices if s in engine.symbol_ids}
+    quoted = set()
+    for market in index_markets:
+        for quote in index_snapshot(market):
+            if quote["symbol"] in engine.symbol_ids:
+                quoted.add(quote["symbol"])
+                changed += engine.update(quote["symbol"], quote, as_of=quote["as_of"])
+    for i, symbol in enumerate(engine.symbols):
+        fields = set(engine.symbol_fields[i])
+        if symbol == FEAR_SYMBOL:
+            data = calculate_fear_greed_index()
+            if not data["error"]:
+                changed += engine.update(symbol, data, as_of=data["timestamp"])
+            continue
+        needs_quote = symbol not in quoted and fields & set(QUOTE_FIELDS)
+        if not (fields - set(QUOTE_FIELDS) or needs_quote):
+            continue
+        try:
+            frame = get_technical(symbol).frame()
+        except Exception as e:
+            logger.warning("Alert data for %s unavailable: %s", symbol, e)
+            continue
+        updated = engine.update_frame(symbol, frame)
+        if needs_quote and len(frame) > 1:
+            last, prev_close = float(frame["Close"].iloc[-1]), float(frame["Close"].iloc[-2])
+            updated |= engine.update(symbol, {"last": last, "prev_close": prev_close,
+                                              "change_pct": (last - prev_close) / prev_close * 100},
+                                     as_of=frame.index[-1])
+        changed += updated
+    return changed
@@ -0,0 +1,64 @@
+import os
+import numpy as np
+from widgets import provider
+from widgets.metrics import instrumented_cache
+from widgets.snapshot import persisted
+from widgets.mmap_store import mapped
+from widgets.history_store import CompactHistory
+from widgets.indicators import calculate_technical
+from widgets.adjust import adjust
+
+ASSET_TTL = 3600
+# Actifs pré-chargés au démarrage (lien par défaut de la sidebar + grandes capitalisations)
+POPULAR_SYMBOLS = os.environ.get("FINLIT_POPULAR_SYMBOLS", "NVDA,AAPL,MSFT,AMZN,GOOGL,META,TSLA").split(",")
+
+@instrumented_cache("asset", ttl=ASSET_TTL, show_spinner="Loading asset data...")
+@persisted("asset", ttl=ASSET_TTL)
+def get_asset_data(symbol):
+    """Retrieve asset data via yfinance.
+
+    Provider errors propagate: Streamlit never caches an exception, so a failure
+    (even in the background warm-up, where st.stop() is a no-op) is retried on
+    the next call instead of being served from the cache for ASSET_TTL.
+    """
+    asset = provider.ticker(symbol)
+    return {
+        "info": provider.field(asset, "info"),
+        "financials": provider.field(asset, "financials"),
+        "cashflow": provider.field(asset, "cashflow"),
+        "dividends": provider.field(asset, "dividends"),
+        "major_holders": provider.field(asset, "major_holders"),
+        "institutional_holders": provider.field(asset, "institutional_holders"),
+        "quarterly_earnings": provider.field(asset, "quarterly_earnings")
+    }
+
+@mapped("history", ttl=ASSET_TTL)
+def fetch_history(symbol):
+    """1y daily history, published once to the mapped store shared by all worker processes.
+
+    Raises on provider errors and on an empty response, which is never published.
+    """
+    history = provider.history(symbol, period="1y", interval="1d", auto_adjust=False)
+    if history is None or history.empty:
+        raise ValueError(f"No price history for {symbol}")
+    return history
+
+@instrumented_cache("history", resource=True, ttl=ASSET_TTL, max_entries=256, show_spinner=False)
+def get_history(symbol) -> CompactHistory:
+    """History as read-only compact columns (views on the mapped store, no copy)."""
+    return CompactHistory.from_frame(fetch_history(symbol))
+
+@mapped("technical", ttl=ASSET_TTL)
+def compute_technical(symbol, adjusted=False):
+    """History plus indicator columns, computed by the first worker that needs them.
+
+    With `adjusted`, prices are first adjusted for dividends and splits from the
+    history's own corporate-action columns (no extra download).
+    """
+    history = get_history(symbol).frame(np.float64)
+    return calculate_technical(adjust(history) if adjusted else history)
+
+@instrumented_cache("technical", resource=True, ttl=ASSET_TTL, max_entries=256, show_spinner=False)
+def get_technical(symbol, adjusted=False) -> CompactHistory:
+    """Indicator frame shared by all sessions; its columns are read-only mapped views."""
+    return CompactHistory.from_frame(compute_technical(symbol, adjusted))
@@ -1,77 +1,204 @@
-import plotly.graph_objects as go
+"""Moteur de graphiques unique de l'application.
+
+- Un seul gabarit de mise en page (couleurs, police, marges) pour tous les graphiques.
+- Les traces sont construites directement depuis des tableaux NumPy : l'axe des
+  dates est transmis en millisecondes float64 sur un axe de type « date ». Plotly
+  les sérialise en binaire. Un DatetimeIndex horodaté aurait été converti en
+  Timestamp puis en texte, point par point et pour chaque trace.
+- Au-delà de WEBGL_THRESHOLD points par figure, les lignes passent en WebGL
+  (Scattergl). Les chandeliers, qui n'ont pas d'équivalent WebGL, sont
+  remplacés par la ligne de clôture au-delà de CANDLESTICK_LIMIT bougies.
+"""
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
-
-def create_price_chart(df, symbol, name, chart_type='Candlesticks', show_volume=True, show_bollinger=False, show_ema=False, show_rsi=False, show_macd=False, show_fibo=False, theme_colors=None):
-    colors = {
-        'primary': '#57d5b9',
-        'secondary': '#6a6c79',
-        'positive': '#50a394',
-        'negative': '#c1467f',
-        'background': '#1a1a1a',
-        'grid': '#2d2d36',
-        'volume': 'rgba(100, 100, 100, 0.15)',
-        'text': '#ffffff'
-    }
-    if theme_colors:
-        colors.update(theme_colors)
-    
-    fig = go.Figure()
-    try:
-        _validate_data(df)
-        df = df.copy()
-
-        if show_bollinger:
-            df = _add_bollinger_bands(df)
-        
-        _add_main_chart(fig, df, chart_type, colors)
-        if show_volume:
-            _add_volume(fig, df, colors)
-        if show_bollinger:
-            _plot_bollinger_bands(fig, df, colors)
-
-        _configure_layout(fig, df, symbol, name, colors, show_fibo)
-
-    except Exception as e:
-        fig = _handle_error(fig, e)
+import streamlit as st
+
+WEBGL_THRESHOLD = 20_000  # Points (toutes traces confondues) au-delà desquels une figure passe en WebGL
+CANDLESTICK_LIMIT = WEBGL_THRESHOLD // 4  # Bougies (4 valeurs chacune) au-delà desquelles on trace la clôture
+
+COLORS = {
+    "positive": "#34C759",
+    "negative": "#FF4B4B",
+    "neutral": "#898fa3",
+    "band": "rgba(150,150,150,0.5)",
+    "volume": "rgba(100,100,100,0.25)",
+    "obv": "#1f77b4",
+    "senkou_a": "green",
+    "senkou_b": "red",
+    "vwap": "#ff7f0e",
+    "vwap_band": "rgba(255,127,14,0.45)",
+    "avwap": "#9467bd",
+    "profile": "rgba(31,119,180,0.25)",
+    "value_area": "rgba(31,119,180,0.5)",
+}
+CHART_HEIGHT = 400
+INDICATOR_HEIGHT = 300
+GAUGE_HEIGHT = 200
+RANGE_BUTTONS = [dict(count=1, label="1M", step="month", stepmode="backward"),
+                 dict(count=6, label="6M", step="month", stepmode="backward"),
+                 dict(count=1, label="YTD", step="year", stepmode="todate"),
+                 dict(count=1, label="1Y", step="year", stepmode="backward"),
+                 dict(step="all", label="All")]
+
+_template = None
+
+def template():
+    """Gabarit partagé (construit une fois par processus, au premier graphique)."""
+    global _template
+    if _template is None:
+        import plotly.io as pio
+        import plotly.graph_objects as go
+        _template = go.layout.Template(pio.templates["plotly_white"])
+        _template.layout.update(
+            font=dict(family="Arial, sans-serif", size=12),
+            margin=dict(t=40, b=20, l=50, r=20),
+            colorway=[COLORS["positive"], COLORS["negative"], "#1f77b4", "#ff7f0e", "#9467bd",
+                      "#8c564b", "#e377c2", "#17becf", "#bcbd22", "#7f7f7f"],
+        )
+    return _template
 
+def dates(index) -> np.ndarray:
+    """Axe des x : millisecondes depuis l'epoch (heure locale de l'index) pour un axe de type date."""
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.as_unit("ns").asi8 / 1e6
+    return np.asarray(index)
+
+def use_webgl(points: int) -> bool:
+    return points > WEBGL_THRESHOLD
+
+def new_figure(title: str = None, height: int = CHART_HEIGHT, date_axis: bool = True, **layout):
+    import plotly.graph_objects as go  # Chargé seulement quand un graphique est construit
+    fig = go.Figure(layout=dict(template=template(), title=title, height=height, **layout))
+    if date_axis:
+        fig.update_xaxes(type="date")
     return fig
 
-def _validate_data(df):
-    required = ['Open', 'High', 'Low', 'Close']
-    missing = [col for col in required if col not in df.columns]
-    if missing:
-        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+def add_line(fig, x, y, name: str, color: str = None, webgl: bool = False, dash: str = None, **kwargs):
+    """Ajoute une ligne ; `webgl` choisit Scattergl (à décider pour toute la figure, les
+    remplissages « tonexty » ne traversant pas les deux types de traces)."""
+    import plotly.graph_objects as go
+    trace = go.Scattergl if webgl else go.Scatter
+    fig.add_trace(trace(x=x, y=y, mode="lines", name=name, line=dict(color=color, dash=dash), **kwargs))
+    return fig
+
+def bollinger(close: np.ndarray, window: int = 20, num_std: float = 2.0) -> tuple:
+    """Bandes de Bollinger (haute, basse) calculées en NumPy, NaN sur la période de chauffe."""
+    close = np.asarray(close, dtype=np.float64)
+    upper, lower = np.full(len(close), np.nan), np.full(len(close), np.nan)
+    if len(close) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(close, window)
+        mean, std = windows.mean(axis=1), windows.std(axis=1, ddof=1)
+        upper[window - 1:], lower[window - 1:] = mean + num_std * std, mean - num_std * std
+    return upper, lower
+
+def build_price_chart(df, chart_type="Candlestick", indicators=None, show_volume=False, range_selector=False,
+                      title="Price History (1 Year)", profile=None):
+    """Construit la figure du graphique de prix (sans l'afficher).
 
-def _add_main_chart(fig, df, chart_type, colors):
-    if chart_type == 'Candlesticks':
-        fig.add_trace(go.Candlestick(x=df.index, open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'], name='Prix', increasing_line_color=colors['positive'], decreasing_line_color=colors['negative']))
+    Les colonnes VWAP, VWAP_Upper*/VWAP_Lower* et AVWAP (widgets.vwap.overlay) sont tracées
+    si présentes ; `profile` (widgets.vwap.Profile) ajoute le profil de volume à droite.
+    """
+    import plotly.graph_objects as go
+    indicators = indicators or []
+    x = dates(df.index)
+    vwap_columns = [c for c in df.columns if c.startswith(("VWAP", "AVWAP"))]
+    lines = (1 + 2 * ("Bollinger Bands" in indicators) + ("OBV" in indicators) + 2 * ("Ichimoku Cloud" in indicators)
+             + len(vwap_columns))
+    webgl = use_webgl(len(df) * (lines + show_volume))
+    fig = new_figure(title, yaxis_title="Price ($)", xaxis_title="Date", showlegend=True)
+
+    if chart_type == "Candlestick" and len(df) <= CANDLESTICK_LIMIT:
+        fig.add_trace(go.Candlestick(x=x, open=df["Open"].to_numpy(), high=df["High"].to_numpy(),
+                                     low=df["Low"].to_numpy(), close=df["Close"].to_numpy(), name="Price",
+                                     increasing_line_color=COLORS["positive"],
+                                     decreasing_line_color=COLORS["negative"]))
     else:
-        fig.add_trace(go.Scatter(x=df.index, y=df['Close'], mode='lines', line=dict(color=colors['primary'], width=1.5), name='Prix'))
-
-def _add_bollinger_bands(df):
-    bb = ta.bbands(df['Close'], length=20)
-    return pd.concat([df, bb], axis=1).dropna()
-
-def _plot_bollinger_bands(fig, df, colors):
-    fig.add_trace(go.Scatter(x=df.index, y=df['BBU_20_2.0'], line=dict(color=colors['grid'], width=1), name='Bollinger Up'))
-    fig.add_trace(go.Scatter(x=df.index, y=df['BBL_20_2.0'], fill='tonexty', line=dict(color=colors['grid'], width=1), name='Bollinger Low'))
-
-def _add_volume(fig, df, colors):
-    if 'Volume' in df.columns:
-        fig.add_trace(go.Bar(x=df.index, y=df['Volume'], name='Volume', marker=dict(color=colors['volume']), yaxis='y2'))
-
-def _configure_layout(fig, df, symbol, name, colors, show_fibo):
-    fig.update_layout(
-        height=600, template="plotly_dark", plot_bgcolor=colors['background'], paper_bgcolor=colors['background'], font=dict(color=colors['text'], size=12),
-        margin=dict(t=60, b=40, l=60, r=40),
-        xaxis=dict(rangeselector=dict(buttons=[dict(count=1, label="1D", step="day"), dict(count=5, label="5D", step="day"), dict(count=1, label="1M", step="month"), dict(count=5, label="5M", step="month"), dict(count=1, label="1Y", step="year"), dict(count=2, label="2Y", step="year"), dict(count=5, label="5Y", step="year")], bgcolor=colors['background'], activecolor=colors['primary'], bordercolor=colors['grid'], borderwidth=1, font=dict(color=colors['text'], size=10)), rangeslider=dict(visible=True), type="date"),
-        yaxis=dict(title="Prix ($)", gridcolor=colors['grid'], side='left'),
-        yaxis2=dict(title="Volume", overlaying='y', side='right', showgrid=False),
-        legend=dict(orientation="h", yanchor="top", y=1.02, xanchor="right", x=0.98),
-        annotations=[dict(text=f"FinLite - {name} ({symbol})", x=0.5, y=0.5, xref="paper", yref="paper", showarrow=False, font=dict(size=20, color=colors['text']))]
-    )
-
-def _handle_error(fig, error):
-    print(f"Erreur : {str(error)}")
-    return fig.add_annotation(text="Erreur de chargement", xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False)
\ No newline at end of file
+        add_line(fig, x, df["Close"].to_numpy(), "Price", COLORS["positive"], webgl)
+
+    if "Bollinger Bands" in indicators:
+        if "BB_Upper" in df and "BB_Lower" in df:
+            upper, lower = df["BB_Upper"].to_numpy(), df["BB_Lower"].to_numpy()
+        else:
+            upper, lower = bollinger(df["Close"].to_numpy())
+        add_line(fig, x, upper, "BB Upper", COLORS["band"], webgl)
+        add_line(fig, x, lower, "BB Lower", COLORS["band"], webgl, fill="tonexty")
+    if "OBV" in indicators:
+        add_line(fig, x, df["OBV"].to_numpy(), "OBV", COLORS["obv"], webgl, yaxis="y2")
+        fig.update_layout(yaxis2=dict(title="OBV", overlaying="y", side="right", showgrid=False))
+    if "Ichimoku Cloud" in indicators:
+        add_line(fig, x, df["SenkouA"].to_numpy(), "Senkou A", COLORS["senkou_a"], webgl)
+        add_line(fig, x, df["SenkouB"].to_numpy(), "Senkou B", COLORS["senkou_b"], webgl, fill="tonexty")
+    if "VWAP" in df:
+        add_line(fig, x, df["VWAP"].to_numpy(), "VWAP", COLORS["vwap"], webgl)
+        for column in vwap_columns:
+            if column.startswith(("VWAP_Upper", "VWAP_Lower")):
+                label = f"VWAP {'+' if 'Upper' in column else '-'}{column[len('VWAP_Upper'):]}σ"
+                add_line(fig, x, df[column].to_numpy(), label, COLORS["vwap_band"], webgl, dash="dot",
+                         showlegend=False)
+    if "AVWAP" in df:
+        add_line(fig, x, df["AVWAP"].to_numpy(), "Anchored VWAP", COLORS["avwap"], webgl, dash="dash")
+    if profile is not None and profile.total > 0:
+        # Barres horizontales adossées au bord droit, sur le quart de la largeur
+        low, high = profile.value_area()
+        prices = profile.prices
+        inside = (prices >= low) & (prices <= high)
+        fig.add_trace(go.Bar(x=profile.volume, y=prices, orientation="h", xaxis="x2", name="Volume Profile",
+                             marker=dict(color=np.where(inside, COLORS["value_area"], COLORS["profile"])),
+                             width=profile.step, hovertemplate="%{y:.2f}: %{x:,.0f}<extra></extra>"))
+        fig.update_layout(xaxis2=dict(overlaying="x", range=[float(profile.volume.max()) * 4, 0], visible=False),
+                          bargap=0)
+        if len(x):
+            add_line(fig, [x[0], x[-1]], [profile.poc, profile.poc], "POC", COLORS["value_area"], dash="dash")
+    if show_volume and "Volume" in df:
+        volume = df["Volume"].to_numpy()
+        if webgl:
+            fig.add_trace(go.Scattergl(x=x, y=volume, mode="lines", fill="tozeroy", name="Volume",
+                                       line=dict(color=COLORS["volume"], width=0), yaxis="y3"))
+        else:
+            fig.add_trace(go.Bar(x=x, y=volume, name="Volume", marker=dict(color=COLORS["volume"]), yaxis="y3"))
+        # Volume cantonné au cinquième inférieur du graphique, sans axe visible
+        top = float(np.nanmax(volume)) * 5 if len(volume) else 1
+        fig.update_layout(yaxis3=dict(overlaying="y", range=[0, top], visible=False))
+    if range_selector:
+        fig.update_xaxes(rangeselector=dict(buttons=RANGE_BUTTONS))
+    return fig
+
+def build_indicator_chart(df, series: list, title: str, yaxis_title: str, levels: list = None,
+                          height: int = INDICATOR_HEIGHT, showlegend: bool = True):
+    """Oscillateur(s) sous le graphique de prix.
+
+    `series` : [(colonne, libellé, couleur)] ; `levels` : [(valeur, couleur, libellé)] en pointillés.
+    """
+    x = dates(df.index)
+    webgl = use_webgl(len(df) * len(series))
+    fig = new_figure(title, height=height, yaxis_title=yaxis_title, showlegend=showlegend)
+    for column, name, color in series:
+        add_line(fig, x, df[column].to_numpy(), name, color, webgl)
+    for value, color, label in levels or []:
+        fig.add_hline(y=value, line_dash="dash", line_color=color, annotation_text=label)
+    return fig
+
+def build_gauge(name, value, min_val, max_val):
+    """Construit la jauge d'un oscillateur (sans l'afficher)."""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=value if pd.notna(value) else min_val,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': name},
+        gauge={
+            'axis': {'range': [min_val, max_val]},
+            'bar': {'color': COLORS["positive"] if value >= (max_val + min_val) / 2 else COLORS["negative"]},
+            'threshold': {'line': {'color': "red", 'width': 2}, 'value': max_val * 0.8 if max_val > 0 else min_val * 0.8}
+        }
+    ))
+    fig.update_layout(template=template(), height=GAUGE_HEIGHT, margin=dict(t=40, b=20))
+    return fig
+
+def create_price_chart(df, chart_type="Candlestick", indicators=None, key="price_chart"):
+    st.plotly_chart(build_price_chart(df, chart_type, indicators), use_container_width=True, key=key)
+
+def create_gauge(name, value, min_val, max_val, description, key):
+    st.plotly_chart(build_gauge(name, value, min_val, max_val), use_container_width=True, key=key)
@@ -0,0 +1,152 @@
+"""Comparaison de N symboles sur un axe temporel commun.
+
+Les clôtures sont gardées en un seul tableau large (dates x symboles) : l'alignement
+et la normalisation (base 100, variation en %, force relative contre un indice de
+référence) sont des opérations vectorielles sur ce tableau, sans DataFrame par symbole.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+from widgets import provider
+from widgets.chart import add_line, dates, new_figure, use_webgl
+from widgets.fx import BASE_CURRENCIES, align as align_utc, currency_of, fx_symbols
+from widgets.metrics import instrumented_cache, timed
+from widgets.symbol_index import is_known, is_comprehensive, load_index
+
+MODES = ["Rebased to 100", "% change", "Relative strength"]
+PERIODS = ["6mo", "1y", "2y", "5y", "10y", "max"]
+DEFAULT_SYMBOLS = "AAPL, MSFT, NVDA, GOOGL, AMZN"
+DEFAULT_BENCHMARK = "^GSPC"
+LOCAL_CURRENCY = "Local"
+
+def align(closes: pd.DataFrame) -> np.ndarray:
+    """Prix alignés : report de la dernière cotation, NaN avant la première cotation de chaque symbole."""
+    values = closes.to_numpy(dtype=np.float64)
+    observed = ~np.isnan(values)
+    # Indice de la dernière cotation connue à chaque date (report avant sans boucle)
+    last = np.where(observed, np.arange(len(values))[:, None], -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+    aligned = values[np.maximum(last, 0), np.arange(values.shape[1])]
+    aligned[last < 0] = np.nan
+    return aligned
+
+def first_valid(values: np.ndarray) -> np.ndarray:
+    """Première valeur non manquante de chaque colonne (NaN si la colonne est vide)."""
+    observed = ~np.isnan(values)
+    rows = observed.argmax(axis=0)
+    base = values[rows, np.arange(values.shape[1])]
+    base[~observed.any(axis=0)] = np.nan
+    return base
+
+def normalize(closes: pd.DataFrame, mode: str = "Rebased to 100", benchmark: pd.Series = None) -> pd.DataFrame:
+    """Normalise toutes les colonnes en une opération.
+
+    - « Rebased to 100 » : prix / premier prix x 100 ;
+    - « % change »      : variation depuis le premier prix ;
+    - « Relative strength » : performance rapportée à celle de `benchmark` depuis
+      la première cotation de chaque symbole (100 = même performance que la référence).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'; expected one of {MODES}")
+    prices = align(closes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = prices / first_valid(prices)
+        if mode == "Relative strength":
+            if benchmark is None:
+                raise ValueError("Relative strength requires a benchmark series")
+            bench = align(benchmark.reindex(closes.index).to_frame())[:, 0]
+            # Performance de la référence depuis la date de départ de chaque symbole
+            start = (~np.isnan(prices)).argmax(axis=0)
+            bench_growth = bench[:, None] / bench[start][None, :]
+            values = growth / bench_growth * 100
+        elif mode == "% change":
+            values = (growth - 1) * 100
+        else:
+            values = growth * 100
+    return pd.DataFrame(values, index=closes.index, columns=closes.columns)
+
+def build_comparison_chart(normalized: pd.DataFrame, mode: str = "Rebased to 100", log_scale: bool = False,
+                           title: str = None, names: dict = None):
+    """Une trace par colonne ; WebGL quand le nombre total de points est élevé."""
+    names = names or {}
+    x = dates(normalized.index)
+    webgl = use_webgl(normalized.size)
+    values = normalized.to_numpy()
+    fig = new_figure(title, height=None, hovermode="x unified", legend_title_text=None, yaxis_title=mode,
+                     margin=dict(t=60 if title else 20, b=20))
+    for j, column in enumerate(normalized.columns):
+        add_line(fig, x, values[:, j], names.get(column, column), webgl=webgl, connectgaps=True)
+    if mode == "% change":
+        fig.update_layout(yaxis_ticksuffix="%")
+    if log_scale and mode != "% change":
+        fig.update_yaxes(type="log")
+    return fig
+
+@instrumented_cache("compare", ttl=3600, show_spinner="Loading prices...")
+def get_closes(symbols: tuple, period: str = "1y") -> pd.DataFrame:
+    """Clôtures journalières de tous les symboles en un seul téléchargement.
+
+    Les erreurs du fournisseur remontent à l'appelant : une exception n'est jamais mise en cache.
+    """
+    data = provider.download(list(symbols), period=period, interval="1d", progress=False)
+    if data.empty:
+        return pd.DataFrame()
+    return data["Close"].reindex(columns=list(symbols))
+
+def parse_symbols(text: str) -> tuple:
+    """Symboles saisis (séparés par des virgules ou espaces), dédupliqués dans l'ordre."""
+    symbols = [s.strip().upper() for s in text.replace(",", " ").split()]
+    return tuple(dict.fromkeys(s for s in symbols if s))
+
+@timed("show_compare")
+def show_compare():
+    """Point d'entrée de la vue de comparaison."""
+    st.subheader("Compare Assets")
+    col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+    with col1:
+        symbols = parse_symbols(st.text_input("Symbols (comma separated)", DEFAULT_SYMBOLS, key="compare_symbols"))
+    with col2:
+        benchmark = st.text_input("Benchmark", DEFAULT_BENCHMARK, key="compare_benchmark").strip().upper()
+    with col3:
+        period = st.selectbox("Period", PERIODS, index=PERIODS.index("5y"), key="compare_period")
+    with col4:
+        currency = st.selectbox("Currency", [LOCAL_CURRENCY] + BASE_CURRENCIES, key="compare_currency",
+                                help="Convert every price into this currency with the daily FX rates")
+    mode = st.radio("Normalization", MODES, horizontal=True, key="compare_mode")
+    log_scale = st.checkbox("Log scale", False, key="compare_log", disabled=mode == "% change")
+
+    unknown = [s for s in symbols + (benchmark,) if not is_known(s)]
+    if unknown and is_comprehensive():
+        st.error(f"Unknown symbol(s): {', '.join(unknown)}")
+        return
+    if unknown:
+        st.warning(f"Not in the local symbol list, loaded from the data provider: {', '.join(unknown)}")
+    if not symbols:
+        st.info("Enter at least one symbol.")
+        return
+
+    instruments = tuple(dict.fromkeys(symbols + (benchmark,)))
+    rates = () if currency == LOCAL_CURRENCY else tuple(sorted(fx_symbols({currency_of(s) for s in instruments}, currency)))
+    try:
+        closes = get_closes(tuple(dict.fromkeys(instruments + rates)), period)
+    except Exception as e:
+        st.error(f"Error fetching prices: {str(e)}")
+        return
+    if closes.empty:
+        st.warning("No data available for comparison.")
+        return
+    closes = closes.dropna(how="all")
+    if currency != LOCAL_CURRENCY:
+        closes = align_utc(closes[list(instruments)], base=currency, rates=closes[list(rates)])
+    normalized = normalize(closes[list(symbols)], mode, closes[benchmark])
+    index = load_index()
+    names = {s: f"{s} - {index.names[i]}" if (i := index.find(s)) is not None else s for s in symbols}
+    st.plotly_chart(build_comparison_chart(normalized, mode, log_scale, names=names), use_container_width=True)
+
+    last = normalized.ffill().iloc[-1]
+    summary = pd.DataFrame({"Symbol": last.index, mode: last.to_numpy()}).sort_values(mode, ascending=False)
+    st.dataframe(summary, hide_index=True, column_config={mode: st.column_config.NumberColumn(format="%.2f")})
+
+if __name__ == "__main__":
+    st.set_page_config(layout="wide")
+    show_compare()
@@ -0,0 +1,182 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+from widgets import provider
+from widgets.metrics import instrumented_cache, timed
+from widgets.indices import MARCHES
+from widgets.trending import MARKETS
+
+ROLLING_WINDOWS = {"Full period": None, "Rolling 60 days": 60, "Rolling 20 days": 20}
+
+def tracked_instruments() -> dict:
+    """Tous les symboles suivis (indices + trending), dédupliqués : {symbole: nom}."""
+    instruments = {}
+    for indices in MARCHES.values():
+        for symbol, details in indices.items():
+            instruments.setdefault(symbol, details["name"])
+    for assets in MARKETS.values():
+        for asset in assets:
+            instruments.setdefault(asset["symbol"], asset["name"])
+    return instruments
+
+def aligned_returns(closes: pd.DataFrame) -> np.ndarray:
+    """Log-rendements alignés (T x N) ; NaN là où l'instrument n'a pas coté.
+
+    Chaque rendement couvre l'intervalle depuis la dernière cotation de l'instrument,
+    ce qui évite de perdre une ligne à chaque jour férié d'un seul marché.
+    """
+    prices = closes.to_numpy(dtype=np.float64)
+    observed = ~np.isnan(prices)
+    filled = pd.DataFrame(prices).ffill().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(filled), axis=0)
+    returns[~observed[1:]] = np.nan
+    return returns
+
+def _masked_moments(x: np.ndarray):
+    """Sommes croisées sur les observations communes à chaque paire, via produits matriciels."""
+    mask = ~np.isnan(x)
+    x0 = np.where(mask, x, 0.0)
+    m = mask.astype(np.float64)
+    return m.T @ m, x0.T @ m, (x0 * x0).T @ m, x0.T @ x0
+
+def _corr_from_moments(n, sx, sxx, sxy, min_periods: int) -> np.ndarray:
+    """Corrélation de Pearson à partir des sommes (sx[i, j] = somme de x_i là où i et j cotent)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx * sx / n
+        corr = cov / np.sqrt(var * var.T)
+    corr[n < min_periods] = np.nan
+    np.clip(corr, -1.0, 1.0, out=corr)
+    return corr
+
+def correlation_matrix(returns: np.ndarray, min_periods: int = 20) -> np.ndarray:
+    """Matrice de corrélation N x N en un seul passage (NaN traités par paires complètes)."""
+    if not np.isnan(returns).any():
+        # Chemin rapide : standardisation puis un seul produit matriciel
+        z = returns - returns.mean(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z /= np.sqrt((z * z).sum(axis=0))
+            corr = z.T @ z
+        if len(returns) < min_periods:
+            corr[:] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+    return _corr_from_moments(*_masked_moments(returns), min_periods)
+
+class IncrementalCorrelation:
+    """Corrélation mise à jour par blocs de nouvelles barres, optionnellement sur fenêtre glissante.
+
+    Les sommes croisées sont maintenues en matrices N x N : ajouter ou retirer un bloc
+    de B barres coûte quelques produits (B x N)ᵀ(B x N), sans recalcul complet.
+    """
+
+    def __init__(self, n_assets: int, window: int = None, min_periods: int = 20):
+        self.window = window
+        self.min_periods = min_periods
+        self._moments = [np.zeros((n_assets, n_assets)) for _ in range(4)]
+        # Barres de la fenêtre en anneau (sans fenêtre, rien n'est à retirer : rien n'est gardé)
+        self._ring = np.empty((window, n_assets)) if window else None
+        self._start = self._count = 0
+
+    def _apply(self, block: np.ndarray, sign: float):
+        for acc, part in zip(self._moments, _masked_moments(block)):
+            acc += sign * part
+
+    def update(self, rows: np.ndarray):
+        """Ajoute de nouvelles barres de rendements (B x N) et retire celles sorties de la fenêtre."""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        self._apply(rows, 1.0)
+        if not self.window:
+            return self
+        window = self.window
+        if len(rows) >= window:  # Le bloc remplit à lui seul la fenêtre
+            if self._count:
+                self._apply(self._oldest(self._count), -1.0)
+            if len(rows) > window:
+                self._apply(rows[:-window], -1.0)
+            self._ring[:] = rows[-window:]
+            self._start, self._count = 0, window
+            return self
+        expired = self._count + len(rows) - window
+        if expired > 0:
+            self._apply(self._oldest(expired), -1.0)
+            self._start, self._count = (self._start + expired) % window, self._count - expired
+        self._ring[(self._start + self._count + np.arange(len(rows))) % window] = rows
+        self._count += len(rows)
+        return self
+
+    def _oldest(self, count: int) -> np.ndarray:
+        """Les `count` plus anciennes barres de l'anneau."""
+        return self._ring[(self._start + np.arange(count)) % self.window]
+
+    def matrix(self) -> np.ndarray:
+        return _corr_from_moments(*(m.copy() for m in self._moments), self.min_periods)
+
+def rolling_correlation(returns: np.ndarray, window: int, step: int = 1, min_periods: int = None):
+    """Génère (indice de fin, matrice) pour chaque fenêtre glissante, tous les `step` barres."""
+    tracker = IncrementalCorrelation(returns.shape[1], window, min_periods or max(2, window // 2))
+    tracker.update(returns[:window])
+    yield window - 1, tracker.matrix()
+    for end in range(window + step, len(returns) + 1, step):
+        tracker.update(returns[end - step:end])
+        yield end - 1, tracker.matrix()
+
+def cluster_order(corr: np.ndarray) -> np.ndarray:
+    """Ordre de sériation spectrale : rapproche les instruments fortement corrélés."""
+    affinity = np.nan_to_num((corr + 1) / 2, nan=0.5)
+    np.fill_diagonal(affinity, 0.0)
+    laplacian = np.diag(affinity.sum(axis=1)) - affinity
+    _, vectors = np.linalg.eigh(laplacian)
+    fiedler = vectors[:, 1] if len(corr) > 1 else np.zeros(len(corr))
+    return np.argsort(fiedler, kind="stable")
+
+@instrumented_cache("correlation", ttl=3600)
+def get_closes(symbols: tuple, period: str = "1y") -> pd.DataFrame:
+    """Clôtures journalières de tous les symboles en un seul téléchargement.
+
+    Les erreurs du fournisseur remontent à l'appelant : une exception n'est jamais mise en cache.
+    """
+    data = provider.download(list(symbols), period=period, interval="1d", progress=False)
+    if data.empty:
+        return pd.DataFrame()
+    return data["Close"].reindex(columns=list(symbols))
+
+def create_heatmap(corr: np.ndarray, labels: list, title: str):
+    order = cluster_order(corr)
+    ordered_labels = [labels[i] for i in order]
+    fig = px.imshow(
+        corr[np.ix_(order, order)], x=ordered_labels, y=ordered_labels,
+        zmin=-1, zmax=1, color_continuous_scale="RdYlGn", aspect="auto", title=title
+    )
+    fig.update_layout(height=max(500, 18 * len(labels)), margin=dict(t=60, b=20))
+    return fig
+
+@timed("show_correlation")
+def show_correlation():
+    """Point d'entrée du widget de corrélation."""
+    st.subheader("Cross-Asset Correlation")
+    instruments = tracked_instruments()
+    try:
+        closes = get_closes(tuple(instruments))
+    except Exception as e:
+        st.error(f"Error fetching prices: {str(e)}")
+        return
+    if closes.empty:
+        st.warning("No data available for correlation.")
+        return
+
+    choice = st.radio("Window", list(ROLLING_WINDOWS), horizontal=True)
+    window = ROLLING_WINDOWS[choice]
+    returns = aligned_returns(closes)
+    if window:
+        corr = IncrementalCorrelation(returns.shape[1], window, min_periods=window // 2).update(returns[-window:]).matrix()
+    else:
+        corr = correlation_matrix(returns)
+
+    labels = [instruments[s] for s in closes.columns]
+    st.plotly_chart(create_heatmap(corr, labels, f"Daily Return Correlation - {choice}"), use_container_width=True)
+
+if __name__ == "__main__":
+    st.set_page_config(layout="wide")
+    show_correlation()
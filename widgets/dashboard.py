@@ -0,0 +1,118 @@
+"""Instantané matérialisé de la page d'accueil, partagé par toutes les sessions.
+
+Un thread de fond (un par processus) reconstruit à chaque minute tout ce que la
+page d'accueil affiche, pour tous les marchés (chargés en parallèle) : cartes des
+indices (statut d'ouverture, cours, variation) déjà mises en HTML, figures des évolutions sur 5 jours, classements des tendances
+par marché et vue de l'indice de sentiment (jauge comprise). Les données viennent
+des caches habituels ; un cache expiré est donc rechargé par ce thread et non par
+une session.
+
+L'instantané est immuable et versionné. Sa publication remplace une seule
+référence (affectation atomique) : une session lit toujours un instantané complet,
+l'ancien ou le nouveau, et ne fait plus que rendre le marché sélectionné : changer
+d'onglet ne déclenche aucun chargement.
+"""
+import datetime
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from widgets.metrics import timed
+
+logger = logging.getLogger("finlit")
+
+REFRESH_INTERVAL = 60  # secondes ; le statut d'ouverture des places change à la minute
+
+class Dashboard:
+    """Contenu figé de la page d'accueil ; jamais modifié après publication.
+
+    - cards : marché -> tuple du HTML des cartes d'indices (vide faute de données) ;
+    - charts : marché -> (figure, None) ou (None, message) ;
+    - trending : marché -> (cartes des meilleurs, cartes des pires, message) ;
+    - sentiment : vue de widgets.fear.sentiment_view (None faute de données).
+    """
+
+    __slots__ = ("version", "created", "cards", "charts", "trending", "sentiment")
+
+    def __init__(self, version: int, created: datetime.datetime, cards: dict, charts: dict, trending: dict,
+                 sentiment: dict):
+        self.version = version
+        self.created = created
+        self.cards = cards
+        self.charts = charts
+        self.trending = trending
+        self.sentiment = sentiment
+
+    @property
+    def age(self) -> float:
+        return (datetime.datetime.now(datetime.UTC) - self.created).total_seconds()
+
+_current = None
+_version = 0
+_build_lock = threading.Lock()
+
+def build(version: int = 0, now: datetime.datetime = None) -> Dashboard:
+    """Calcule un instantané complet depuis les caches de données (sans rien afficher)."""
+    from widgets.indices import MARCHES, build_line_chart, get_indices_data, index_cards
+    from widgets.trending import MARKETS, fetch_market_data, trending_cards
+    from widgets.fear import calculate_fear_greed_index, sentiment_view
+
+    now = now or datetime.datetime.now(datetime.UTC)
+    with timed("dashboard.build"):
+        # Tous les marchés sont chargés en parallèle : un cache expiré ne coûte qu'une latence
+        with ThreadPoolExecutor(len(MARCHES) + len(MARKETS) + 1, thread_name_prefix="finlit-dashboard") as pool:
+            indices = {market: pool.submit(get_indices_data, market) for market in MARCHES}
+            markets = {market: pool.submit(fetch_market_data, market) for market in MARKETS}
+            fear_greed = pool.submit(calculate_fear_greed_index)
+        cards, charts = {}, {}
+        for market, future in indices.items():
+            data = future.result()
+            cards[market] = () if data.empty else tuple(index_cards(market, data, now))
+            charts[market] = build_line_chart(market, data)
+        trending = {market: trending_cards(market, future.result()) for market, future in markets.items()}
+        sentiment = sentiment_view(fear_greed.result())
+    return Dashboard(version, now, cards, charts, trending, sentiment)
+
+def _publish() -> Dashboard:
+    """Construit et publie un instantané (appelé verrou pris)."""
+    global _current, _version
+    dashboard = build(_version + 1)
+    _version, _current = dashboard.version, dashboard
+    return dashboard
+
+def refresh() -> Dashboard:
+    """Construit et publie un nouvel instantané."""
+    with _build_lock:
+        return _publish()
+
+def current() -> Dashboard:
+    """Instantané publié ; au premier appel du processus, il est construit (les sessions
+    concurrentes attendent ce seul calcul)."""
+    dashboard = _current
+    if dashboard is not None:
+        return dashboard
+    with _build_lock:
+        return _current or _publish()
+
+def clear():
+    """Oublie l'instantané publié (le prochain appel à current() le reconstruit)."""
+    global _current
+    with _build_lock:
+        _current = None
+
+def _refresh_loop(interval: float):
+    while True:
+        try:
+            refresh()
+        except Exception as e:  # L'instantané précédent reste publié
+            logger.warning("Dashboard refresh failed: %s", e)
+        time.sleep(interval - time.time() % interval)  # Aligné sur le début de la minute
+
+@st.cache_resource(show_spinner=False)
+def start(interval: float = REFRESH_INTERVAL):
+    """Une fois par processus : démarre la reconstruction périodique de l'instantané."""
+    threading.Thread(target=_refresh_loop, args=(interval,), name="finlit-dashboard", daemon=True).start()
+    return True
@@ -1,23 +1,23 @@
 # widgets/fear.py
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
 from datetime import datetime
+from widgets import provider
+from widgets.metrics import instrumented_cache, timed
+from widgets.snapshot import persisted
 
 # Configuration
 CACHE_TTL = 7200  # 2 hours cache
 INDEX_SYMBOL = "^GSPC"  # S&P 500
 VIX_SYMBOL = "^VIX"     # Volatility Index
 
-@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+@instrumented_cache("fear_market_data", ttl=CACHE_TTL, show_spinner=False)
+@persisted("fear_market_data", ttl=CACHE_TTL)
 def get_market_data(symbol: str, period: str, interval: str) -> pd.DataFrame:
     """Fetch financial data with robust error handling"""
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period, interval=interval)
-        return hist[~hist.index.duplicated()]  # Remove duplicate timestamps
+        return provider.history(symbol, period=period, interval=interval)  # Already sorted and deduplicated
     except Exception as e:
         st.error(f"Error fetching {symbol} data: {str(e)}")
         return pd.DataFrame()
@@ -65,7 +65,7 @@ def calculate_component_volatility(vix_df: pd.DataFrame) -> float:
     volatility = ((vix_current - vix_ma50) / vix_ma50) * 100
     return np.clip(100 - (volatility + 20) * 2.5, 0, 100)  # Correction appliquée ici
 
-@st.cache_data(ttl=3600)
+@instrumented_cache("fear_greed_index", ttl=3600)
 def calculate_fear_greed_index() -> dict:
     """Main calculation function with fallback logic"""
     sp500 = get_market_data(INDEX_SYMBOL, "1y", "1d")
@@ -87,8 +87,9 @@ def calculate_fear_greed_index() -> dict:
         "error": None if not sp500.empty and not vix.empty else "Missing market data"
     }
 
-def create_sentiment_gauge(score: float) -> go.Figure:
+def create_sentiment_gauge(score: float) -> "go.Figure":
     """Create interactive gauge chart with professional styling"""
+    import plotly.graph_objects as go
     fig = go.Figure(go.Indicator(
         mode="gauge+number+delta",
         value=score,
@@ -139,70 +140,62 @@ def create_sentiment_gauge(score: float) -> go.Figure:
     )
     return fig
 
-def display_fear_greed_widget():
-    """Main widget display function"""
-    st.markdown("""
-    <style>
-    .sentiment-header {
-        text-align: center;
-        margin-bottom: 30px !important;
-    }
-    .component-card {
-        background: rgba(255,255,255,0.1);
-        border-radius: 10px;
-        padding: 15px;
-        margin: 10px 0;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+SENTIMENT_CONFIG = {
+    "Extreme Fear": {"emoji": "😱", "color": "#FF4B4B", "range": (0, 25)},
+    "Fear": {"emoji": "😨", "color": "#FF8C8C", "range": (25, 45)},
+    "Neutral": {"emoji": "😐", "color": "#FFD700", "range": (45, 55)},
+    "Greed": {"emoji": "😎", "color": "#90EE90", "range": (55, 75)},
+    "Extreme Greed": {"emoji": "🤑", "color": "#34C759", "range": (75, 100)}
+}
 
-    with st.spinner("Analyzing market conditions..."):
-        data = calculate_fear_greed_index()
-    
+def sentiment_view(data: dict) -> dict:
+    """Everything the widget shows for one index computation (None when data is missing)"""
     if data["error"]:
-        st.error("Market data unavailable - please try again later")
-        return
+        return None
 
     score = data["composite"]
-    sentiment_config = {
-        "Extreme Fear": {"emoji": "😱", "color": "#FF4B4B", "range": (0, 25)},
-        "Fear": {"emoji": "😨", "color": "#FF8C8C", "range": (25, 45)},
-        "Neutral": {"emoji": "😐", "color": "#FFD700", "range": (45, 55)},
-        "Greed": {"emoji": "😎", "color": "#90EE90", "range": (55, 75)},
-        "Extreme Greed": {"emoji": "🤑", "color": "#34C759", "range": (75, 100)}
-    }
-
     current_sentiment = next(
-        (k for k, v in sentiment_config.items() if v["range"][0] <= score <= v["range"][1]),
+        (k for k, v in SENTIMENT_CONFIG.items() if v["range"][0] <= score <= v["range"][1]),
         "Neutral"
     )
+    return {
+        "sentiment": current_sentiment,
+        **SENTIMENT_CONFIG[current_sentiment],
+        "gauge": create_sentiment_gauge(score),
+        "components": [
+            ("Momentum", data["momentum"], "#FFD700",
+             "S&P 500 vs 125-day moving average"),
+            ("Price Strength", data["strength"], "#34C759",
+             "Position relative to 52-week range"),
+            ("Volatility", data["volatility"], "#FF4B4B",
+             "VIX vs 50-day average")
+        ],
+        "updated": pd.to_datetime(data["timestamp"]).strftime("%Y-%m-%d %H:%M UTC"),
+    }
+
+def render_sentiment(view: dict):
+    """Render a precomputed sentiment view"""
+    if view is None:
+        st.error("Market data unavailable - please try again later")
+        return
 
     # Header
     st.markdown(f"""
     <div class="sentiment-header">
-        <h2 style="color:{sentiment_config[current_sentiment]['color']};">
-            {sentiment_config[current_sentiment]['emoji']} {current_sentiment}
+        <h2 style="color:{view['color']};">
+            {view['emoji']} {view['sentiment']}
         </h2>
    
     </div>
     """, unsafe_allow_html=True)
 
     # Gauge Chart
-    st.plotly_chart(create_sentiment_gauge(score), use_container_width=True)
+    st.plotly_chart(view["gauge"], use_container_width=True)
 
     # Component Breakdown
     st.markdown("### Market Sentiment Components")
     
-    components = [
-        ("Momentum", data["momentum"], "#FFD700", 
-         "S&P 500 vs 125-day moving average"),
-        ("Price Strength", data["strength"], "#34C759",
-         "Position relative to 52-week range"),
-        ("Volatility", data["volatility"], "#FF4B4B",
-         "VIX vs 50-day average")
-    ]
-    
-    for name, value, color, desc in components:
+    for name, value, color, desc in view["components"]:
         with st.container(border=False):
             cols = st.columns([1, 3])
             with cols[0]:
@@ -213,8 +206,32 @@ def display_fear_greed_widget():
                 st.caption(desc)
 
     # Data Freshness
-    updated_time = pd.to_datetime(data["timestamp"]).strftime("%Y-%m-%d %H:%M UTC")
-    st.caption(f"Last update: {updated_time}")
+    st.caption(f"Last update: {view['updated']}")
+
+@timed("display_fear_greed_widget")
+def display_fear_greed_widget(dashboard=None):
+    """Main widget display function (from the materialized dashboard snapshot when given)"""
+    st.markdown("""
+    <style>
+    .sentiment-header {
+        text-align: center;
+        margin-bottom: 30px !important;
+    }
+    .component-card {
+        background: rgba(255,255,255,0.1);
+        border-radius: 10px;
+        padding: 15px;
+        margin: 10px 0;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+    if dashboard is not None:
+        render_sentiment(dashboard.sentiment)
+        return
+    with st.spinner("Analyzing market conditions..."):
+        data = calculate_fear_greed_index()
+    render_sentiment(sentiment_view(data))
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,374 @@
+"""Table transversale des fondamentaux et recherche de pairs.
+
+Les ratios de milliers de titres (P/E, P/S, EV/EBITDA, P/B, rendement, bêta,
+capitalisation, marges) sont tenus en une matrice titres x ratios, rafraîchie en
+bloc hors du chemin des requêtes (`tools.build_fundamentals`, ou le thread de fond
+lancé par `start`) et enregistrée dans un seul fichier .npz remplacé atomiquement.
+
+Au chargement :
+- un index secteur / industrie en CSR (codes triés, offsets, lignes) donne les
+  membres d'un groupe par simple découpage ;
+- chaque ratio est transformé (logarithme des multiples et de la capitalisation),
+  centré sur la médiane du secteur du titre et réduit par son écart interquartile
+  (centiles de tout l'univers pour un secteur de moins de MIN_GROUP valeurs),
+  borné à ±3, les valeurs manquantes ramenées à 0 : les pairs d'un titre sont ses
+  plus proches voisins euclidiens dans cet espace, trouvés par np.argpartition.
+
+L'univers est celui du fichier maître des symboles : quelques dizaines de sociétés
+avec le fichier livré, plusieurs milliers une fois `tools.build_symbols` lancé.
+La reconstruction de fond est protégée par un fichier verrou partagé entre
+processus : un seul worker télécharge l'univers quand la table expire.
+
+Une requête (pairs, rangs centiles dans le secteur) ne touche que quelques
+tableaux NumPy : quelques centaines de microsecondes pour des milliers de titres.
+"""
+import os
+import time
+import logging
+import warnings
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger("finlit")
+
+FUNDAMENTALS_PATH_ENV = "FINLIT_FUNDAMENTALS_PATH"
+DEFAULT_FUNDAMENTALS_PATH = Path(".cache") / "fundamentals.npz"
+FUNDAMENTALS_TTL = 24 * 3600
+TABLE_FORMAT = 1
+# Ratio -> (clé du dict `info` du fournisseur, libellé, transformation logarithmique)
+RATIOS = {
+    "pe": ("trailingPE", "P/E", True),
+    "ps": ("priceToSalesTrailing12Months", "P/S", True),
+    "ev_ebitda": ("enterpriseToEbitda", "EV/EBITDA", True),
+    "pb": ("priceToBook", "P/B", True),
+    "dividend_yield": ("dividendYield", "Dividend Yield", False),
+    "beta": ("beta", "Beta", False),
+    "market_cap": ("marketCap", "Market Cap", True),
+    "gross_margin": ("grossMargins", "Gross Margin", False),
+    "operating_margin": ("operatingMargins", "Operating Margin", False),
+    "net_margin": ("profitMargins", "Net Margin", False),
+}
+COLUMNS = list(RATIOS)
+# Secteurs du fichier maître qui ne sont pas des sociétés (pas de fondamentaux)
+NON_EQUITY_SECTORS = {"Index", "Currency", "Cryptocurrency", "Commodities", "ETF"}
+CLIP = 3.0
+MIN_GROUP = 10  # Valeurs minimales d'un ratio dans un secteur pour le normaliser sur ses propres centiles
+REBUILD_TIMEOUT = 6 * 3600  # Au-delà, un verrou de reconstruction est réputé abandonné
+
+def _number(value) -> float:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value if np.isfinite(value) else np.nan
+
+def ratios_from_info(info: dict) -> np.ndarray:
+    """Vecteur des ratios (ordre de COLUMNS) lu dans le dict `info` du fournisseur ; NaN si absent."""
+    return np.array([_number(info.get(key)) for key, _, _ in RATIOS.values()])
+
+def _transform(values: np.ndarray) -> np.ndarray:
+    """Logarithme des colonnes multiplicatives (valeurs négatives ou nulles -> NaN)."""
+    values = np.array(values, dtype=np.float64, copy=True)
+    logs = [j for j, (_, _, log) in enumerate(RATIOS.values()) if log]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        part = values[..., logs]
+        values[..., logs] = np.where(part > 0, np.log(part), np.nan)
+    return values
+
+def nan_quantiles(values: np.ndarray, q: list) -> np.ndarray:
+    """Centiles de chaque colonne hors NaN ; 0 pour une colonne vide."""
+    if not len(values):
+        return np.zeros((len(q), values.shape[1]))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Colonne entièrement vide
+        return np.nan_to_num(np.nanpercentile(values, q, axis=0))
+
+def _group_index(labels: np.ndarray) -> tuple:
+    """CSR d'un libellé par ligne : (libellés distincts triés, offsets, lignes regroupées, code par ligne)."""
+    names, codes = np.unique(labels, return_inverse=True)
+    rows = np.argsort(codes, kind="stable").astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(names)))]).astype(np.int64)
+    return names, offsets, rows, codes.astype(np.int32)
+
+class FundamentalsTable:
+    """Ratios de N titres (matrice N x len(COLUMNS)) avec index sectoriels et espace normalisé."""
+
+    def __init__(self, symbols, names, sectors, industries, values: np.ndarray, updated: float = None):
+        self.symbols = np.asarray(symbols, dtype=str)
+        self.names = np.asarray(names, dtype=str)
+        self.sectors = np.asarray(sectors, dtype=str)
+        self.industries = np.asarray(industries, dtype=str)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.symbols), len(COLUMNS))
+        self.updated = updated if updated is not None else time.time()
+        self.rows = {s: i for i, s in enumerate(self.symbols)}
+        self.sector_index = _group_index(self.sectors)
+        self.industry_index = _group_index(self.industries)
+
+        # Centre et échelle par secteur (dernière ligne : tout l'univers, repli des petits secteurs)
+        transformed = _transform(self.values)
+        names, offsets, rows, codes = self.sector_index
+        q1, center, q3 = nan_quantiles(transformed, [25, 50, 75])
+        self.center = np.tile(center, (len(names) + 1, 1))
+        self.scale = np.tile(np.where(q3 - q1 > 0, q3 - q1, 1.0), (len(names) + 1, 1))
+        for code in range(len(names)):
+            group = transformed[rows[offsets[code]:offsets[code + 1]]]
+            enough = (~np.isnan(group)).sum(axis=0) >= MIN_GROUP
+            if enough.any():
+                q1, center, q3 = nan_quantiles(group, [25, 50, 75])
+                self.center[code, enough] = center[enough]
+                self.scale[code, enough] = np.where(q3 - q1 > 0, q3 - q1, self.scale[code])[enough]
+        self.features = self._scaled(transformed, codes)
+        for array in (self.values, self.features):
+            array.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def _scaled(self, transformed: np.ndarray, codes) -> np.ndarray:
+        features = (transformed - self.center[codes]) / self.scale[codes]
+        return np.nan_to_num(np.clip(features, -CLIP, CLIP), nan=0.0)
+
+    def normalize(self, values: np.ndarray, sector: str = None) -> np.ndarray:
+        """Ratios bruts -> espace de distance (médiane du secteur 0, écart interquartile 1, borné, NaN -> 0)."""
+        names = self.sector_index[0]
+        code = int(np.searchsorted(names, sector)) if sector else len(names)
+        if code >= len(names) or names[code] != sector:
+            code = len(names)  # Secteur inconnu : centiles de tout l'univers
+        return self._scaled(_transform(values), code)
+
+    def members(self, sector: str = None, industry: str = None) -> np.ndarray:
+        """Lignes d'un secteur ou d'une industrie (vide si inconnu)."""
+        label, (names, offsets, rows, _) = ((industry, self.industry_index) if industry is not None
+                                            else (sector, self.sector_index))
+        code = int(np.searchsorted(names, label))
+        if code >= len(names) or names[code] != label:
+            return rows[:0]
+        return rows[offsets[code]:offsets[code + 1]]
+
+    def peers(self, symbol: str, k: int = 8, info: dict = None) -> tuple:
+        """(lignes des k plus proches voisins, distances, groupe retenu).
+
+        Le groupe est l'industrie du titre si elle compte assez de membres, sinon son
+        secteur, sinon tout l'univers. Un titre absent de la table est placé d'après
+        son dict `info` (ratios, secteur et industrie).
+        """
+        row = self.rows.get(symbol)
+        if row is not None:
+            vector, sector, industry = self.features[row], self.sectors[row], self.industries[row]
+        else:
+            info = info or {}
+            sector, industry = info.get("sector") or "", info.get("industry") or ""
+            vector = self.normalize(ratios_from_info(info), sector)
+        for group, candidates in ((industry, self.members(industry=industry) if industry else None),
+                                  (sector, self.members(sector=sector) if sector else None),
+                                  ("All", np.arange(len(self), dtype=np.int32))):
+            if candidates is not None:
+                candidates = candidates[candidates != row] if row is not None else candidates
+                if len(candidates) >= k or group == "All":
+                    break
+        if not len(candidates):
+            return candidates, np.empty(0), group
+        distances = np.sqrt(((self.features[candidates] - vector) ** 2).sum(axis=1))
+        top = min(k, len(candidates))
+        nearest = np.argpartition(distances, top - 1)[:top]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return candidates[nearest], distances[nearest], group
+
+    def percentiles(self, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Rang centile (0-100) de chaque ratio de `values` parmi les lignes `rows` ; NaN si non comparable."""
+        group = self.values[rows]
+        valid = ~np.isnan(group)
+        counts = valid.sum(axis=0)
+        with np.errstate(invalid="ignore"):
+            below = (group < values).sum(axis=0) + 0.5 * (group == values).sum(axis=0)
+            ranks = np.where((counts > 0) & ~np.isnan(values), below / np.maximum(counts, 1) * 100, np.nan)
+        return ranks
+
+    def frame(self, rows) -> pd.DataFrame:
+        """Lignes de la table en DataFrame (libellés de colonnes lisibles)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        values = self.values[rows]
+        columns = {"Symbol": self.symbols[rows], "Name": self.names[rows], "Industry": self.industries[rows]}
+        columns.update((label, values[:, j]) for j, (_, label, _) in enumerate(RATIOS.values()))
+        return pd.DataFrame(columns)
+
+    def save(self, path: Path = None):
+        """Écrit la table de façon atomique."""
+        path = path or fundamentals_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, format=TABLE_FORMAT, updated=self.updated, columns=np.array(COLUMNS), symbols=self.symbols,
+                 names=self.names, sectors=self.sectors, industries=self.industries, values=self.values)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "FundamentalsTable":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format"]) != TABLE_FORMAT or list(data["columns"]) != COLUMNS:
+                raise ValueError(f"incompatible fundamentals table {path}")
+            return cls(data["symbols"], data["names"], data["sectors"], data["industries"], data["values"],
+                       float(data["updated"]))
+
+def fundamentals_path() -> Path:
+    return Path(os.environ.get(FUNDAMENTALS_PATH_ENV, DEFAULT_FUNDAMENTALS_PATH))
+
+def universe() -> list:
+    """Sociétés du fichier maître (indices, devises, cryptos, matières premières et ETF exclus).
+
+    Avec le fichier livré, quelques dizaines de titres ; la table ne couvre des milliers de
+    sociétés qu'une fois le fichier maître complet construit par `tools.build_symbols`.
+    """
+    from widgets.symbol_index import load_index
+    index = load_index()
+    return [s for s, sector in zip(index.symbols, index.sectors) if sector not in NON_EQUITY_SECTORS]
+
+def fetch_info(symbol: str) -> dict:
+    from widgets import provider
+    return provider.field(provider.ticker(symbol), "info") or {}
+
+def build(symbols: list, workers: int = 8, progress=None) -> FundamentalsTable:
+    """Télécharge le dict `info` de chaque symbole (threads : attente réseau) et construit la table.
+
+    Les symboles en échec sont ignorés ; `progress(done, total)` est appelé au fil de l'eau.
+    """
+    rows = []
+
+    def one(symbol):
+        try:
+            info = fetch_info(symbol)
+        except Exception as e:
+            logger.warning("Fundamentals of %s unavailable: %s", symbol, e)
+            return None
+        return (symbol, info.get("longName") or info.get("shortName") or symbol, info.get("sector") or "",
+                info.get("industry") or "", ratios_from_info(info))
+
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        for done, row in enumerate(pool.map(one, symbols), 1):
+            if row is not None:
+                rows.append(row)
+            if progress:
+                progress(done, len(symbols))
+    if not rows:
+        return FundamentalsTable([], [], [], [], np.empty((0, len(COLUMNS))))
+    symbols, names, sectors, industries, values = zip(*rows)
+    return FundamentalsTable(symbols, names, sectors, industries, np.vstack(values))
+
+def refresh(symbols: list = None, workers: int = 8, path: Path = None) -> FundamentalsTable:
+    """Reconstruit la table (par défaut sur `universe()`) et la publie."""
+    table = build(symbols if symbols is not None else universe(), workers)
+    if len(table):
+        table.save(path)
+    return table
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load(path: str, mtime: float) -> FundamentalsTable:
+    return FundamentalsTable.load(Path(path))
+
+def load_table() -> FundamentalsTable:
+    """Table publiée, partagée par toutes les sessions et rechargée quand le fichier change ;
+    None si aucune table n'a encore été construite."""
+    path = fundamentals_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    try:
+        return _load(str(path), mtime)
+    except Exception as e:
+        logger.warning("Ignoring unreadable fundamentals table %s: %s", path, e)
+        return None
+
+def _is_stale(path: Path, ttl: float) -> bool:
+    try:
+        return time.time() - path.stat().st_mtime >= ttl
+    except FileNotFoundError:
+        return True
+
+def _acquire(lock: Path) -> bool:
+    """Crée le fichier verrou de façon exclusive (tous processus confondus) ; False s'il est déjà pris.
+    Un verrou plus vieux que REBUILD_TIMEOUT (worker tué en cours de route) est repris."""
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    for _ in range(2):
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            if not _is_stale(lock, REBUILD_TIMEOUT):
+                return False
+            try:
+                lock.unlink()
+            except FileNotFoundError:
+                pass
+    return False
+
+def _background_loop(ttl: float):
+    path = fundamentals_path()
+    lock = path.with_name(f"{path.name}.lock")
+    while True:
+        if _is_stale(path, ttl) and _acquire(lock):  # Un seul processus reconstruit la table
+            try:
+                if _is_stale(path, ttl):  # Elle a pu être publiée entre-temps
+                    table = refresh(path=path)
+                    logger.info("Fundamentals table rebuilt: %d symbols", len(table))
+            except Exception as e:
+                logger.warning("Fundamentals refresh failed: %s", e)
+            finally:
+                lock.unlink(missing_ok=True)
+        time.sleep(max(60.0, ttl / 24))
+
+@st.cache_resource(show_spinner=False)
+def start(ttl: float = FUNDAMENTALS_TTL):
+    """Une fois par processus : reconstruit la table en arrière-plan si elle manque ou a expiré."""
+    threading.Thread(target=_background_loop, args=(ttl,), name="finlit-fundamentals", daemon=True).start()
+    return True
+
+def show_peers(symbol: str, info: dict, k: int = 8):
+    """Onglet « Peers » : titres aux ratios les plus proches et rangs centiles dans le secteur."""
+    table = load_table()
+    if table is None or not len(table):
+        st.info("The fundamentals table is being built in the background; peers will appear shortly.")
+        return
+    rows, distances, group = table.peers(symbol, k, info)
+    if not len(rows):
+        st.write("No comparable companies found.")
+        return
+    row = table.rows.get(symbol)
+    values = table.values[row] if row is not None else ratios_from_info(info)
+    sector = table.sectors[row] if row is not None else info.get("sector") or ""
+    sector_rows = table.members(sector=sector) if sector else np.arange(len(table))
+    if not len(sector_rows):
+        sector_rows, sector = np.arange(len(table)), "All"
+
+    st.write(f"### Closest peers ({group})")
+    peers = table.frame(rows)
+    peers.insert(3, "Distance", distances)
+    peers["Market Cap"] = peers["Market Cap"] / 1e9
+    peers = peers.rename(columns={"Market Cap": "Market Cap (B$)"})
+    st.dataframe(peers, hide_index=True, column_config={
+        "Distance": st.column_config.NumberColumn(format="%.2f"),
+        **{label: st.column_config.NumberColumn(format="%.2f") for _, label, _ in RATIOS.values()
+           if label != "Market Cap"},
+        "Market Cap (B$)": st.column_config.NumberColumn(format="%.1f"),
+    })
+
+    st.write(f"### Percentile ranks ({sector or 'All'}, {len(sector_rows)} companies)")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Ratio inconnu de tous les pairs : reste NaN (cellule vide)
+        peer_median = np.nanmedian(table.values[rows], axis=0)
+    ranks = pd.DataFrame({
+        "Ratio": [label for _, label, _ in RATIOS.values()],
+        "Value": values,
+        "Sector percentile": table.percentiles(values, sector_rows),
+        "Peer median": peer_median,
+    })
+    st.dataframe(ranks, hide_index=True, column_config={
+        "Value": st.column_config.NumberColumn(format="%.3g"),
+        "Sector percentile": st.column_config.ProgressColumn(format="%.0f", min_value=0, max_value=100),
+        "Peer median": st.column_config.NumberColumn(format="%.3g"),
+    })
+    st.caption(f"{len(table):,} companies, updated {pd.Timestamp(table.updated, unit='s'):%Y-%m-%d %H:%M} UTC.")
@@ -0,0 +1,146 @@
+"""Alignement as-of sur une grille UTC commune et conversion dans une devise de référence.
+
+Les séries de places différentes (fuseaux, heures d'ouverture) et les cours de
+change sont rangés dans un seul tableau large : instants UTC (int64 ns) x séries,
+NaN quand une série ne cote pas. La fusion des horodatages est un tri unique, et la
+jointure as-of (dernière valeur connue à chaque instant de la grille) un report
+avant vectoriel suivi d'une recherche dichotomique de la grille dans l'index.
+
+La conversion multiplie chaque colonne par le produit d'au plus deux taux alignés
+sur la même grille (devise -> USD -> devise de référence), en une opération.
+"""
+import numpy as np
+import pandas as pd
+
+BASE_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "HKD", "CNY", "CAD"]
+# Devises cotées « XXXUSD » par convention (les autres le sont « USDXXX »), comme dans MARCHES["Currencies"]
+USD_QUOTED = {"EUR", "GBP", "AUD", "NZD"}
+# Sous-unités cotées par certaines places : (devise, facteur)
+SUBUNITS = {"GBp": ("GBP", 0.01), "GBX": ("GBP", 0.01), "ZAc": ("ZAR", 0.01), "ILA": ("ILS", 0.01)}
+EXCHANGE_CURRENCIES = {"Euronext Paris": "EUR", "Euronext Amsterdam": "EUR", "XETRA": "EUR", "LSE": "GBp",
+                       "TSE": "JPY", "HKEX": "HKD", "SIX": "CHF", "KRX": "KRW", "SSE": "CNY", "TSX": "CAD"}
+SUFFIX_CURRENCIES = {".PA": "EUR", ".AS": "EUR", ".DE": "EUR", ".F": "EUR", ".MI": "EUR", ".MC": "EUR",
+                     ".BR": "EUR", ".L": "GBp", ".T": "JPY", ".HK": "HKD", ".SS": "CNY", ".SZ": "CNY",
+                     ".TO": "CAD", ".SW": "CHF", ".KS": "KRW"}
+
+def currency_of(symbol: str) -> str:
+    """Devise de cotation : MARCHES, puis place du fichier maître, puis suffixe Yahoo ; USD à défaut."""
+    from widgets.indices import MARCHES
+    from widgets.symbol_index import load_index
+
+    symbol = symbol.upper()
+    for market in MARCHES.values():
+        if symbol in market and "currency" in market[symbol]:
+            return market[symbol]["currency"]
+    if symbol.endswith("=X") and len(symbol) == 8:
+        return symbol[3:6]  # Paire de change : cotée dans la seconde devise
+    index = load_index()
+    row = index.find(symbol)
+    if row is not None and index.exchanges[row] in EXCHANGE_CURRENCIES:
+        return EXCHANGE_CURRENCIES[index.exchanges[row]]
+    dot = symbol.rfind(".")
+    if dot > 0:
+        return SUFFIX_CURRENCIES.get(symbol[dot:], "USD")
+    return "USD"
+
+def fx_legs(currency: str, base: str) -> tuple:
+    """(facteur d'unité, [(symbole de change, exposant)]) pour passer de `currency` à `base`."""
+    currency, scale = SUBUNITS.get(currency, (currency, 1.0))
+    legs = []
+    if currency != base:
+        if currency != "USD":
+            legs.append((f"{currency}USD=X", 1) if currency in USD_QUOTED else (f"USD{currency}=X", -1))
+        if base != "USD":
+            legs.append((f"{base}USD=X", -1) if base in USD_QUOTED else (f"USD{base}=X", 1))
+    return scale, legs
+
+def fx_symbols(currencies, base: str) -> list:
+    """Paires de change nécessaires pour convertir toutes ces devises (dédupliquées)."""
+    return list(dict.fromkeys(symbol for c in currencies for symbol, _ in fx_legs(c, base)[1]))
+
+def utc_ns(index: pd.Index) -> np.ndarray:
+    """Instants UTC en int64 ns ; un index sans fuseau (dates journalières) est lu comme UTC."""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.as_unit("ns").asi8
+
+def merge(series: dict) -> tuple:
+    """Fusionne des séries d'horodatages quelconques en (instants UTC triés, valeurs instants x séries, noms).
+
+    Tous les horodatages sont concaténés puis triés une fois ; chaque valeur est placée
+    dans sa cellule par une seule affectation indexée.
+    """
+    names = list(series)
+    times = [utc_ns(s.index) for s in series.values()]
+    flat = np.concatenate(times) if times else np.empty(0, np.int64)
+    grid = np.unique(flat)
+    values = np.full((len(grid), len(names)), np.nan)
+    rows = np.searchsorted(grid, flat)
+    if names:
+        columns = np.repeat(np.arange(len(names)), [len(t) for t in times])
+        values[rows, columns] = np.concatenate([s.to_numpy(np.float64) for s in series.values()])
+    return grid, values, names
+
+def asof(times: np.ndarray, values: np.ndarray, grid: np.ndarray, tolerance: int = None) -> np.ndarray:
+    """Dernière valeur connue de chaque colonne à chaque instant de `grid` (int64 ns, triés).
+
+    NaN avant la première cotation, ou si la dernière cotation date de plus de
+    `tolerance` ns.
+    """
+    last = np.where(np.isnan(values), np.int32(-1), np.arange(len(values), dtype=np.int32)[:, None])
+    np.maximum.accumulate(last, axis=0, out=last)  # Ligne de la dernière cotation de chaque colonne
+    rows = np.searchsorted(times, grid, side="right") - 1
+    if len(rows) != len(times) or (rows != np.arange(len(times))).any():  # Grille distincte des instants
+        last = np.where(rows[:, None] >= 0, last[np.maximum(rows, 0)], np.int32(-1))
+    out = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+    stale = last < 0
+    if tolerance is not None:
+        stale |= grid[:, None] - times[np.maximum(last, 0)] > tolerance
+    out[stale] = np.nan
+    return out
+
+def convert(values: np.ndarray, currencies: list, base: str, rates: dict) -> np.ndarray:
+    """Convertit chaque colonne de `values` (devise `currencies[j]`) en `base`.
+
+    `rates` : symbole de change -> taux aligné sur les mêmes instants. Les facteurs sont
+    calculés une fois par devise distincte puis répartis sur les colonnes ; une colonne
+    dont un taux manque devient NaN.
+    """
+    distinct, inverse = np.unique(np.asarray(currencies, dtype=str), return_inverse=True)
+    factors = np.ones((len(values), len(distinct)))
+    for k, currency in enumerate(distinct):
+        scale, legs = fx_legs(str(currency), base)
+        factors[:, k] *= scale
+        for symbol, exponent in legs:
+            if symbol in rates:
+                factors[:, k] *= rates[symbol] if exponent > 0 else 1.0 / rates[symbol]
+            else:
+                factors[:, k] = np.nan
+    return values * factors[:, inverse]
+
+def _asof_frame(df: pd.DataFrame, grid: np.ndarray, tolerance: int) -> np.ndarray:
+    times, values = utc_ns(df.index), df.to_numpy(np.float64)
+    if (np.diff(times) < 0).any():
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+    return asof(times, values, grid, tolerance)
+
+def align(closes: pd.DataFrame, grid: pd.DatetimeIndex = None, base: str = None, rates: pd.DataFrame = None,
+          currencies: dict = None, tolerance: pd.Timedelta = None) -> pd.DataFrame:
+    """Aligne les colonnes de `closes` sur une grille UTC (par défaut leurs propres instants)
+    par jointure as-of et, avec `base`, les convertit dans cette devise.
+
+    `rates` : cours des paires de change (colonnes nommées comme `fx_symbols`), alignés sur la
+    même grille ; `currencies` : symbole -> devise, à défaut `currency_of`.
+    """
+    grid = np.sort(utc_ns(closes.index)) if grid is None else utc_ns(grid)
+    tolerance = None if tolerance is None else pd.Timedelta(tolerance).value
+    aligned = _asof_frame(closes, grid, tolerance)
+    if base:
+        fx = {}
+        if rates is not None and not rates.empty:
+            fx = dict(zip(rates.columns, _asof_frame(rates, grid, tolerance).T))
+        currencies = [(currencies or {}).get(c) or currency_of(c) for c in closes.columns]
+        aligned = convert(aligned, currencies, base, fx)
+    return pd.DataFrame(aligned, index=pd.DatetimeIndex(grid, tz="UTC"), columns=closes.columns)
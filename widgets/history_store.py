@@ -0,0 +1,65 @@
+"""Historiques compacts, immuables et partagés entre sessions.
+
+st.cache_data renvoie une copie désérialisée à chaque appel : chaque session de la
+page actif détenait son propre historique, puis une copie enrichie d'une vingtaine
+de colonnes float64. Ici les colonnes sont stockées une fois par processus dans des
+tableaux en lecture seule (float32 quand la précision le permet, volume en int64,
+index partagé) ; chaque session n'en reçoit qu'une vue.
+"""
+import numpy as np
+import pandas as pd
+
+# Erreur absolue maximale tolérée lors du passage en float32
+FLOAT32_TOLERANCE = 1e-3
+
+def compact_array(values) -> np.ndarray:
+    """Tableau en lecture seule, float32 si l'aller-retour reste sous la tolérance.
+
+    Un tableau déjà compact et en lecture seule (vue mappée par exemple) est renvoyé sans copie.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == "f" and values.dtype != np.float32:
+        values = values.astype(np.float64, copy=False)
+        narrow = values.astype(np.float32)
+        if np.nanmax(np.abs(narrow - values), initial=0.0) <= FLOAT32_TOLERANCE:
+            values = narrow
+    elif values.dtype.kind in "iu":
+        values = values.astype(np.int64, copy=False)
+    if values.flags.writeable:
+        if values.base is not None:
+            values = values.copy()  # Ne pas garder de vue sur le bloc du DataFrame source
+        values.flags.writeable = False
+    return values
+
+class CompactHistory:
+    """Colonnes OHLCV (et dérivées) immuables partageant un même index."""
+
+    __slots__ = ("index", "columns")
+
+    def __init__(self, index: pd.Index, columns: dict):
+        self.index = index
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, base: "CompactHistory" = None) -> "CompactHistory":
+        """Compacte `df` ; les colonnes déjà présentes dans `base` sont réutilisées telles quelles."""
+        index = base.index if base is not None else df.index
+        columns = dict(base.columns) if base is not None else {}
+        for name in df.columns:
+            if name not in columns:
+                columns[name] = compact_array(df[name].to_numpy())
+        return cls(index, columns)
+
+    def frame(self, dtype=None) -> pd.DataFrame:
+        """DataFrame vue sur les tableaux partagés ; `dtype` convertit (copie) les colonnes flottantes."""
+        if dtype is not None:
+            columns = {k: v.astype(dtype) if v.dtype.kind == "f" else v for k, v in self.columns.items()}
+            return pd.DataFrame(columns, index=self.index, copy=False)
+        return pd.DataFrame(self.columns, index=self.index, copy=False)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(v.nbytes for v in self.columns.values()) + self.index.nbytes
+
+    def __len__(self) -> int:
+        return len(self.index)
@@ -0,0 +1,112 @@
+import pandas as pd
+import numpy as np
+
+# Fenêtres par défaut des indicateurs (celles historiquement codées en dur dans asset.py)
+DEFAULT_PARAMS = {
+    "rsi_window": 14,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "stoch_window": 14,
+    "cci_window": 20,
+    "willr_window": 14,
+    "atr_window": 14,
+    "bb_window": 20,
+    "bb_std": 2.0,
+    "ichimoku_tenkan": 9,
+    "ichimoku_kijun": 26,
+    "ichimoku_senkou": 52,
+}
+
+def resolve_params(params=None) -> dict:
+    """Fusionne les paramètres fournis avec les valeurs par défaut."""
+    if not params:
+        return dict(DEFAULT_PARAMS)
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown indicator parameters: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_PARAMS, **params}
+
+def _rolling_mean_deviation(series: pd.Series, window: int) -> pd.Series:
+    """Écart absolu moyen glissant, vectorisé (équivalent à rolling().apply sans boucle Python)."""
+    values = series.to_numpy(dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        out[window - 1:] = np.abs(windows - windows.mean(axis=1, keepdims=True)).mean(axis=1)
+    return pd.Series(out, index=series.index)
+
+def calculate_technical(df, params=None):
+    """Calculate technical indicators manually without pandas_ta."""
+    p = resolve_params(params)
+    df = df.copy()
+
+    # RSI
+    delta = df['Close'].diff()
+    gain = delta.where(delta > 0, 0).rolling(window=p["rsi_window"]).mean()
+    loss = -delta.where(delta < 0, 0).rolling(window=p["rsi_window"]).mean()
+    rs = gain / loss
+    df['RSI'] = 100 - (100 / (1 + rs))
+
+    # MACD
+    ema_fast = df['Close'].ewm(span=p["macd_fast"], adjust=False).mean()
+    ema_slow = df['Close'].ewm(span=p["macd_slow"], adjust=False).mean()
+    df['MACD'] = ema_fast - ema_slow
+    df['MACD_Signal'] = df['MACD'].ewm(span=p["macd_signal"], adjust=False).mean()
+
+    # Stochastic Oscillator (%K)
+    low_n = df['Low'].rolling(window=p["stoch_window"]).min()
+    high_n = df['High'].rolling(window=p["stoch_window"]).max()
+    df['STOCH_K'] = 100 * (df['Close'] - low_n) / (high_n - low_n).replace(0, np.nan)  # Fenêtre plate : indéfini
+
+    # CCI
+    typical_price = (df['High'] + df['Low'] + df['Close']) / 3
+    sma_tp = typical_price.rolling(window=p["cci_window"]).mean()
+    mean_dev = _rolling_mean_deviation(typical_price, p["cci_window"])
+    df['CCI'] = (typical_price - sma_tp) / (0.015 * mean_dev)
+
+    # Williams %R
+    high_n = df['High'].rolling(window=p["willr_window"]).max()
+    low_n = df['Low'].rolling(window=p["willr_window"]).min()
+    df['WILLR'] = -100 * (high_n - df['Close']) / (high_n - low_n).replace(0, np.nan)
+
+    # ATR
+    high_low = df['High'] - df['Low']
+    high_close = np.abs(df['High'] - df['Close'].shift())
+    low_close = np.abs(df['Low'] - df['Close'].shift())
+    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+    df['ATR'] = tr.rolling(window=p["atr_window"]).mean()
+
+    # Chaikin Oscillator (simplifié)
+    spread = df['High'] - df['Low']
+    multiplier = ((2 * df['Close'] - df['High'] - df['Low']) / spread.replace(0, np.nan)).where(spread != 0, 0.0)
+    ad = (multiplier * df['Volume']).cumsum()  # Barre plate (séance comblée) : aucun flux
+    df['CHAIKIN'] = ad.ewm(span=3, adjust=False).mean() - ad.ewm(span=10, adjust=False).mean()
+
+    # Ultimate Oscillator
+    bp = df['Close'] - df['Low'].shift()
+    tr = pd.concat([df['High'] - df['Low'], np.abs(df['High'] - df['Close'].shift()), np.abs(df['Low'] - df['Close'].shift())], axis=1).max(axis=1)
+    avg7 = (bp.rolling(window=7).sum() / tr.rolling(window=7).sum().replace(0, np.nan))
+    avg14 = (bp.rolling(window=14).sum() / tr.rolling(window=14).sum().replace(0, np.nan))
+    avg28 = (bp.rolling(window=28).sum() / tr.rolling(window=28).sum().replace(0, np.nan))
+    df['UO'] = 100 * (4 * avg7 + 2 * avg14 + avg28) / 7
+
+    # Bollinger Bands (bonus)
+    df['MA20'] = df['Close'].rolling(window=p["bb_window"]).mean()
+    std = df['Close'].rolling(window=p["bb_window"]).std()
+    df['BB_Upper'] = df['MA20'] + (std * p["bb_std"])
+    df['BB_Lower'] = df['MA20'] - (std * p["bb_std"])
+
+    # OBV (bonus)
+    df['OBV'] = np.where(df['Close'] > df['Close'].shift(1), df['Volume'],
+                        np.where(df['Close'] < df['Close'].shift(1), -df['Volume'], 0)).cumsum()
+
+    # Ichimoku Cloud (bonus)
+    high_t, low_t = df['High'].rolling(p["ichimoku_tenkan"]).max(), df['Low'].rolling(p["ichimoku_tenkan"]).min()
+    df['Tenkan'] = (high_t + low_t) / 2
+    high_k, low_k = df['High'].rolling(p["ichimoku_kijun"]).max(), df['Low'].rolling(p["ichimoku_kijun"]).min()
+    df['Kijun'] = (high_k + low_k) / 2
+    df['SenkouA'] = ((df['Tenkan'] + df['Kijun']) / 2).shift(p["ichimoku_kijun"])
+    df['SenkouB'] = ((df['High'].rolling(p["ichimoku_senkou"]).max() + df['Low'].rolling(p["ichimoku_senkou"]).min()) / 2).shift(p["ichimoku_kijun"])
+
+    return df
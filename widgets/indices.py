@@ -1,35 +1,41 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import plotly.express as px
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from widgets import provider
+from widgets.metrics import instrumented_cache, timed
+from widgets.mmap_store import mapped
+from widgets.compare import normalize, build_comparison_chart
+from widgets.fx import align
+from widgets.normalize import last_two_valid
 
 # Configuration des marchés et indices avec heures d'ouverture (en UTC)
 MARCHES = {
     "US": {
-        "^GSPC": {"name": "S&P 500", "position": 0, "open_utc": (13, 30), "close_utc": (20, 0)},  # 9h30-16h EST
-        "^DJI": {"name": "Dow Jones", "position": 1, "open_utc": (13, 30), "close_utc": (20, 0)},
-        "^IXIC": {"name": "Nasdaq", "position": 2, "open_utc": (13, 30), "close_utc": (20, 0)}
+        "^GSPC": {"name": "S&P 500", "position": 0, "open_utc": (13, 30), "close_utc": (20, 0), "currency": "USD"},  # 9h30-16h EST
+        "^DJI": {"name": "Dow Jones", "position": 1, "open_utc": (13, 30), "close_utc": (20, 0), "currency": "USD"},
+        "^IXIC": {"name": "Nasdaq", "position": 2, "open_utc": (13, 30), "close_utc": (20, 0), "currency": "USD"}
     },
     "Europe": {
-        "^STOXX50E": {"name": "Euro Stoxx 50", "position": 0, "open_utc": (8, 0), "close_utc": (16, 30)},  # 9h-17h30 CET
-        "^FTSE": {"name": "FTSE 100", "position": 1, "open_utc": (8, 0), "close_utc": (16, 30)},  # 8h-16h30 GMT
-        "^GDAXI": {"name": "DAX", "position": 2, "open_utc": (8, 0), "close_utc": (16, 30)}  # 9h-17h30 CET
+        "^STOXX50E": {"name": "Euro Stoxx 50", "position": 0, "open_utc": (8, 0), "close_utc": (16, 30), "currency": "EUR"},  # 9h-17h30 CET
+        "^FTSE": {"name": "FTSE 100", "position": 1, "open_utc": (8, 0), "close_utc": (16, 30), "currency": "GBP"},  # 8h-16h30 GMT
+        "^GDAXI": {"name": "DAX", "position": 2, "open_utc": (8, 0), "close_utc": (16, 30), "currency": "EUR"}  # 9h-17h30 CET
     },
     "Asia": {
-        "000001.SS": {"name": "SSE Compo", "position": 0, "open_utc": (1, 30), "close_utc": (7, 0)},  # 9h30-15h CST
-        "^N225": {"name": "Nikkei 225", "position": 1, "open_utc": (0, 0), "close_utc": (6, 0)},  # 9h-15h JST
-        "^HSI": {"name": "Hang Seng", "position": 2, "open_utc": (1, 30), "close_utc": (8, 0)}  # 9h30-16h HKT
+        "000001.SS": {"name": "SSE Compo", "position": 0, "open_utc": (1, 30), "close_utc": (7, 0), "currency": "CNY"},  # 9h30-15h CST
+        "^N225": {"name": "Nikkei 225", "position": 1, "open_utc": (0, 0), "close_utc": (6, 0), "currency": "JPY"},  # 9h-15h JST
+        "^HSI": {"name": "Hang Seng", "position": 2, "open_utc": (1, 30), "close_utc": (8, 0), "currency": "HKD"}  # 9h30-16h HKT
     },
     "Commodities": {
-        "CL=F": {"name": "Crude Oil", "position": 0, "open_utc": (0, 0), "close_utc": (23, 59)},  # 24h approx
-        "GC=F": {"name": "Gold Future", "position": 1, "open_utc": (0, 0), "close_utc": (23, 59)},
-        "SI=F": {"name": "Silver", "position": 2, "open_utc": (0, 0), "close_utc": (23, 59)}
+        "CL=F": {"name": "Crude Oil", "position": 0, "open_utc": (0, 0), "close_utc": (23, 59), "currency": "USD"},  # 24h approx
+        "GC=F": {"name": "Gold Future", "position": 1, "open_utc": (0, 0), "close_utc": (23, 59), "currency": "USD"},
+        "SI=F": {"name": "Silver", "position": 2, "open_utc": (0, 0), "close_utc": (23, 59), "currency": "USD"}
     },
     "Crypto": {
-        "BTC-USD": {"name": "BTC", "position": 0, "open_utc": (0, 0), "close_utc": (23, 59)},  # 24h
-        "BNB-USD": {"name": "BNB", "position": 1, "open_utc": (0, 0), "close_utc": (23, 59)},
-        "ETH-USD": {"name": "ETH", "position": 2, "open_utc": (0, 0), "close_utc": (23, 59)}
+        "BTC-USD": {"name": "BTC", "position": 0, "open_utc": (0, 0), "close_utc": (23, 59), "currency": "USD"},  # 24h
+        "BNB-USD": {"name": "BNB", "position": 1, "open_utc": (0, 0), "close_utc": (23, 59), "currency": "USD"},
+        "ETH-USD": {"name": "ETH", "position": 2, "open_utc": (0, 0), "close_utc": (23, 59), "currency": "USD"}
     },
     "Currencies": {
         "EURUSD=X": {"name": "EUR/USD", "position": 0, "open_utc": (0, 0), "close_utc": (23, 59)},  # 24h
@@ -38,13 +44,14 @@ MARCHES = {
     }
 }
 
-@st.cache_data(ttl=300)  # Cache de 5 minutes
+@instrumented_cache("indices", resource=True, ttl=300)  # Cache de 5 minutes, partagé entre sessions
+@mapped("indices", ttl=300)
 def get_indices_data(market: str):
     """Récupère les données des indices pour un marché donné."""
     indices = MARCHES.get(market, {})
     symbols = list(indices.keys())
     try:
-        data = yf.download(symbols, period="5d", interval="1h", progress=False)
+        data = provider.download(symbols, period="5d", interval="1h", progress=False)
         if data.empty:
             st.warning(f"No data returned for {market}.")
         return data
@@ -70,28 +77,66 @@ def is_market_open(symbol: str, current_time: datetime.datetime) -> bool:
     else:  # Cas où le marché traverse minuit
         return current_time_utc >= open_time or current_time_utc <= close_time
 
-def render_index_cards(market: str):
-    """Affiche les cartes des indices en 3 colonnes avec statut du marché."""
+def index_snapshot(market: str, current_time: datetime.datetime = None) -> list:
+    """Dernier cours, clôture précédente et variation de chaque indice du marché (sans rendu)."""
     data = get_indices_data(market)
+    current_time = current_time or datetime.datetime.now(datetime.UTC)
+    closes = data["Close"] if not data.empty else pd.DataFrame()
+    positions = dict(zip(closes.columns, zip(*last_two_valid(closes)))) if len(closes.columns) else {}
+    quotes = []
+    for symbol, details in MARCHES[market].items():
+        last_row, prev_row = positions.get(symbol, (-1, -1))
+        last = float(closes[symbol].iloc[last_row]) if last_row >= 0 else None
+        prev_close = float(closes[symbol].iloc[prev_row]) if prev_row >= 0 else None
+        quotes.append({
+            "symbol": symbol,
+            "name": details["name"],
+            "open": is_market_open(symbol, current_time),
+            "last": last,
+            "prev_close": prev_close,
+            "change_pct": (last - prev_close) / prev_close * 100 if prev_close else None,
+            "as_of": closes.index[last_row].isoformat() if last_row >= 0 else None,
+        })
+    return quotes
+
+def index_cards(market: str, data: pd.DataFrame, current_time: datetime.datetime) -> list:
+    """HTML des cartes des indices d'un marché (statut d'ouverture, dernier cours, variation)."""
     indices = MARCHES[market]
-    current_time = datetime.datetime.now(datetime.UTC)  # Heure actuelle en UTC
-    
-    if data.empty:
-        st.write("No data available for this market.")
-        return
     
     # Couleurs par défaut de Streamlit
     positive_color = "#34C759"  # Vert
     negative_color = "#FF4B4B"  # Rouge (primaryColor)
 
-    cols = st.columns(3)
-    for i, (symbol, details) in enumerate(indices.items()):
-        with cols[i]:
-            try:
-                if not is_market_open(symbol, current_time):
-                    open_hour, open_minute = details["open_utc"]
-                    close_hour, close_minute = details["close_utc"]
-                    st.markdown(
+    closes = data["Close"]
+    positions = dict(zip(closes.columns, zip(*last_two_valid(closes)))) if len(closes.columns) else {}
+    cards = []
+    for symbol, details in indices.items():
+        try:
+            if not is_market_open(symbol, current_time):
+                open_hour, open_minute = details["open_utc"]
+                close_hour, close_minute = details["close_utc"]
+                cards.append(
+                    f"""
+                    <a href='/asset?symbol={symbol}' style='text-decoration: none; color: inherit;'>
+                        <div class='asset-card' style='border-radius: 10px; border: 1px solid #ccc; background: transparent; cursor: pointer;'>
+                            <div style='background-color: #666; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
+                                {symbol}
+                            </div>
+                            <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
+                                <div style='font-size: 0.9rem; font-weight: 500;'>{details['name']}</div>
+                                <div style='color: #898fa3; font-size: 0.8rem;'>💤 Market closed</div>
+                                <div style='color: #898fa3; font-size: 0.7rem;'>Open: {open_hour:02d}:{open_minute:02d} - Close: {close_hour:02d}:{close_minute:02d} UTC</div>
+                            </div>
+                        </div>
+                    </a>
+                    """
+                )
+            elif positions.get(symbol, (-1, -1))[0] >= 0:
+                last_row, prev_row = positions[symbol]
+                current = closes[symbol].iloc[last_row]
+                prev_close = closes[symbol].iloc[prev_row] if prev_row >= 0 else None
+                if prev_close is None:
+                    cards.append(
                         f"""
                         <a href='/asset?symbol={symbol}' style='text-decoration: none; color: inherit;'>
                             <div class='asset-card' style='border-radius: 10px; border: 1px solid #ccc; background: transparent; cursor: pointer;'>
@@ -100,80 +145,40 @@ def render_index_cards(market: str):
                                 </div>
                                 <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
                                     <div style='font-size: 0.9rem; font-weight: 500;'>{details['name']}</div>
-                                    <div style='color: #898fa3; font-size: 0.8rem;'>💤 Market closed</div>
-                                    <div style='color: #898fa3; font-size: 0.7rem;'>Open: {open_hour:02d}:{open_minute:02d} - Close: {close_hour:02d}:{close_minute:02d} UTC</div>
+                                    <div style='color: #898fa3; font-size: 0.8rem;'>Insufficient data</div>
                                 </div>
                             </div>
                         </a>
-                        """,
-                        unsafe_allow_html=True
+                        """
                     )
-                elif symbol in data["Close"] and not data["Close"][symbol].isna().all():
-                    current = data["Close"][symbol].iloc[-1]
-                    prev_close = data["Close"][symbol].iloc[-2]
-                    if pd.isna(current) or pd.isna(prev_close):
-                        st.markdown(
-                            f"""
-                            <a href='/asset?symbol={symbol}' style='text-decoration: none; color: inherit;'>
-                                <div class='asset-card' style='border-radius: 10px; border: 1px solid #ccc; background: transparent; cursor: pointer;'>
-                                    <div style='background-color: #666; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
-                                        {symbol}
-                                    </div>
-                                    <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
-                                        <div style='font-size: 0.9rem; font-weight: 500;'>{details['name']}</div>
-                                        <div style='color: #898fa3; font-size: 0.8rem;'>Insufficient data</div>
-                                    </div>
-                                </div>
-                            </a>
-                            """,
-                            unsafe_allow_html=True
-                        )
-                    else:
-                        change_percent = ((current - prev_close) / prev_close) * 100
-                        background_color = positive_color if change_percent >= 0 else negative_color
-                        st.markdown(
-                            f"""
-                            <a href='/asset?symbol={symbol}' style='text-decoration: none; color: inherit;'>
-                                <div class='asset-card' style='border-radius: 10px; border: 1px solid #ccc; background: transparent; cursor: pointer;'>
-                                    <div style='background-color: {background_color}; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
-                                        {symbol}
-                                    </div>
-                                    <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
-                                        <div style='font-size: 0.9rem; font-weight: 500;'>{details['name']}</div>
-                                        <div style='display: flex; justify-content: space-between; align-items: center;'>
-                                            <div>
-                                                <div style='color: {positive_color if change_percent >= 0 else negative_color}; font-size: 0.9rem;'>
-                                                    {'▲' if change_percent >= 0 else '▼'} {abs(change_percent):.2f}%
-                                                </div>
-                                                <div style='color: #898fa3; font-size: 0.8rem;'>Prev: {prev_close:,.2f}$</div>
-                                            </div>
-                                            <div style='font-size: 1rem; font-weight: bold;'>{current:,.2f}$</div>
-                                        </div>
-                                    </div>
-                                </div>
-                            </a>
-                            """,
-                            unsafe_allow_html=True
-                        )
                 else:
-                    st.markdown(
+                    change_percent = ((current - prev_close) / prev_close) * 100
+                    background_color = positive_color if change_percent >= 0 else negative_color
+                    cards.append(
                         f"""
                         <a href='/asset?symbol={symbol}' style='text-decoration: none; color: inherit;'>
                             <div class='asset-card' style='border-radius: 10px; border: 1px solid #ccc; background: transparent; cursor: pointer;'>
-                                <div style='background-color: #666; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
+                                <div style='background-color: {background_color}; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
                                     {symbol}
                                 </div>
                                 <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
                                     <div style='font-size: 0.9rem; font-weight: 500;'>{details['name']}</div>
-                                    <div style='color: #898fa3; font-size: 0.8rem;'>Data unavailable</div>
+                                    <div style='display: flex; justify-content: space-between; align-items: center;'>
+                                        <div>
+                                            <div style='color: {positive_color if change_percent >= 0 else negative_color}; font-size: 0.9rem;'>
+                                                {'▲' if change_percent >= 0 else '▼'} {abs(change_percent):.2f}%
+                                            </div>
+                                            <div style='color: #898fa3; font-size: 0.8rem;'>Prev: {prev_close:,.2f}$</div>
+                                        </div>
+                                        <div style='font-size: 1rem; font-weight: bold;'>{current:,.2f}$</div>
+                                    </div>
                                 </div>
                             </div>
                         </a>
-                        """,
-                        unsafe_allow_html=True
+                        """
                     )
-            except Exception as e:
-                st.markdown(
+            else:
+                cards.append(
                     f"""
                     <a href='/asset?symbol={symbol}' style='text-decoration: none; color: inherit;'>
                         <div class='asset-card' style='border-radius: 10px; border: 1px solid #ccc; background: transparent; cursor: pointer;'>
@@ -182,62 +187,121 @@ def render_index_cards(market: str):
                             </div>
                             <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
                                 <div style='font-size: 0.9rem; font-weight: 500;'>{details['name']}</div>
-                                <div style='color: #898fa3; font-size: 0.8rem;'>Error: {str(e)}</div>
+                                <div style='color: #898fa3; font-size: 0.8rem;'>Data unavailable</div>
                             </div>
                         </div>
                     </a>
-                    """,
-                    unsafe_allow_html=True
+                    """
                 )
+        except Exception as e:
+            cards.append(
+                f"""
+                <a href='/asset?symbol={symbol}' style='text-decoration: none; color: inherit;'>
+                    <div class='asset-card' style='border-radius: 10px; border: 1px solid #ccc; background: transparent; cursor: pointer;'>
+                        <div style='background-color: #666; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
+                            {symbol}
+                        </div>
+                        <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
+                            <div style='font-size: 0.9rem; font-weight: 500;'>{details['name']}</div>
+                            <div style='color: #898fa3; font-size: 0.8rem;'>Error: {str(e)}</div>
+                        </div>
+                    </div>
+                </a>
+                """
+            )
+    return cards
 
-def render_line_chart(market: str):
-    """Affiche un graphique en ligne des évolutions en pourcentage dans un container."""
+def render_cards(cards: list):
+    """Affiche des cartes déjà construites en 3 colonnes."""
+    cols = st.columns(3)
+    for i, card in enumerate(cards):
+        with cols[i]:
+            st.markdown(card, unsafe_allow_html=True)
+
+def render_index_cards(market: str):
+    """Affiche les cartes des indices en 3 colonnes avec statut du marché."""
     data = get_indices_data(market)
-    indices = MARCHES[market]
+    if data.empty:
+        st.write("No data available for this market.")
+        return
+    render_cards(index_cards(market, data, datetime.datetime.now(datetime.UTC)))
 
+def build_line_chart(market: str, data: pd.DataFrame) -> tuple:
+    """(figure, None) des évolutions en pourcentage, ou (None, message) faute de données."""
+    indices = MARCHES[market]
     if data.empty:
-        st.warning("No data available for the chart.")
+        return None, "No data available for the chart."
+
+    closes = data["Close"].reindex(columns=[s for s in indices if s in data["Close"]]).dropna(axis=1, how="all")
+    if closes.empty:
+        return None, "No valid data available for the chart."
+
+    # Grille horaire UTC commune : chaque indice y prend sa dernière cotation connue (as-of)
+    observed = closes.dropna(how="all").index
+    grid = pd.date_range(observed.min().floor("h"), observed.max().ceil("h"), freq="h")
+    normalized = normalize(align(closes, grid), "% change")
+    names = {symbol: details["name"] for symbol, details in indices.items()}
+    fig = build_comparison_chart(normalized, "% change", title=f"{market} Indices - 5 Day Performance (UTC)",
+                                 names=names)
+    return fig, None
+
+def render_chart(fig, message: str = None):
+    if fig is None:
+        st.warning(message)
         return
+    with st.container():
+        st.plotly_chart(fig, use_container_width=True)
 
-    data_frames = []
-    for symbol, details in indices.items():
-        if symbol in data["Close"] and not data["Close"][symbol].isna().all():
-            hist = pd.DataFrame({"Close": data["Close"][symbol]}).reset_index()
-            hist = hist.rename(columns={"Date": "Datetime"})  # Standardisation
-            initial_value = hist["Close"].iloc[0]
-            if pd.notna(initial_value):
-                hist["Percent_Change"] = ((hist["Close"] - initial_value) / initial_value) * 100
-                hist["Name"] = details["name"]
-                data_frames.append(hist)
-
-    if data_frames:
-        combined_df = pd.concat(data_frames)
-        with st.container():
-            fig = px.line(
-                combined_df,
-                x="Datetime",
-                y="Percent_Change",
-                color="Name",
-                title=f"{market} Indices - 5 Day Performance",
-                labels={"Percent_Change": "Change (%)", "Datetime": "Time"}
-            )
-            fig.update_layout(yaxis_ticksuffix="%")
-            st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.warning("No valid data available for the chart.")
+def render_line_chart(market: str):
+    """Affiche un graphique en ligne des évolutions en pourcentage dans un container."""
+    render_chart(*build_line_chart(market, get_indices_data(market)))
+
+def select_market(markets: list, key: str) -> str:
+    """Onglets pilotés par l'état de la session : seul le marché retourné est calculé et
+    rendu (st.tabs exécute le corps de chaque onglet à chaque rerun)."""
+    return st.radio("Market", markets, horizontal=True, key=key, label_visibility="collapsed")
+
+_prefetch_pool = ThreadPoolExecutor(4, thread_name_prefix="finlit-prefetch")
+_prefetching = set()
+_prefetch_lock = threading.Lock()
 
-def show_indices():
-    """Point d’entrée du widget avec onglets."""
+def prefetch(fetch, markets):
+    """Remplit en tâche de fond, en parallèle, les caches des marchés non affichés pour
+    qu'un changement d'onglet soit immédiat (une seule tâche en vol par marché)."""
+    def run(market):
+        try:
+            fetch(market)
+        finally:
+            with _prefetch_lock:
+                _prefetching.discard((fetch, market))
+
+    for market in markets:
+        with _prefetch_lock:
+            if (fetch, market) in _prefetching:
+                continue
+            _prefetching.add((fetch, market))
+        _prefetch_pool.submit(run, market)
+
+@timed("show_indices")
+def show_indices(dashboard=None):
+    """Point d’entrée du widget ; seul le marché sélectionné est rendu. Avec `dashboard`,
+    rendu depuis l'instantané matérialisé (widgets.dashboard) sans aucun calcul ; sinon
+    les autres marchés sont préchargés en tâche de fond."""
     st.subheader("Market Indices")
-    
-    tab_names = list(MARCHES.keys())
-    tabs = st.tabs(tab_names)
-    
-    for i, tab in enumerate(tabs):
-        with tab:
-            market = tab_names[i]
-            render_index_cards(market)
-            render_line_chart(market)
+
+    markets = list(MARCHES.keys())
+    market = select_market(markets, "indices_market")
+    if dashboard is None:
+        prefetch(get_indices_data, [m for m in markets if m != market])
+        render_index_cards(market)
+        render_line_chart(market)
+        return
+    cards = dashboard.cards[market]
+    if cards:
+        render_cards(cards)
+    else:
+        st.write("No data available for this market.")
+    render_chart(*dashboard.charts[market])
 
 if __name__ == "__main__":
     st.set_page_config(layout="wide")
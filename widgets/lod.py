@@ -0,0 +1,256 @@
+"""Niveaux de détail (pyramides) du graphique de prix d'un actif.
+
+Chaque résolution du fournisseur (1 minute, 5 minutes, 1 heure, 1 jour) est
+téléchargée une fois sur toute sa période disponible, puis agrégée en une
+pyramide : chaque niveau regroupe FACTOR barres du précédent (ouverture de la
+première, plus haut et plus bas du groupe, clôture de la dernière, volume cumulé).
+
+Pour une plage visible, on retient la résolution la plus grossière qui remplit
+encore le graphique (au moins MIN_POINTS barres attendues) ; les résolutions
+intrajournalières ne sont donc téléchargées que lorsque l'utilisateur zoome sur
+quelques jours ou quelques semaines. Dans la pyramide, le niveau le plus fin qui
+tient en MAX_POINTS barres est découpé par recherche dichotomique : le volume
+envoyé au navigateur et le temps de rendu ne dépendent plus de la longueur de
+l'historique.
+
+En journalier, les vues qui tiennent dans la dernière année (dont la vue par
+défaut) reprennent l'historique 1 an déjà chargé par la page (magasin mappé) :
+l'historique complet (« max ») n'est téléchargé que pour remonter plus loin. Les
+barres de chauffe des indicateurs y sont prises au mieux : sur la vue 1 an, les
+premières valeurs de Bollinger ou d'Ichimoku restent donc vides.
+
+Avec `adjusted`, les barres de chaque résolution sont ajustées des dividendes et
+divisions (widgets.adjust, à partir de leurs propres colonnes d'événements) avant
+la construction de la pyramide : le graphique suit alors les mêmes prix que les
+indicateurs de la page.
+"""
+import numpy as np
+import pandas as pd
+from widgets import provider
+from widgets.adjust import adjust
+from widgets.asset_data import ASSET_TTL, fetch_history
+from widgets.metrics import instrumented_cache
+
+FACTOR = 4
+MIN_POINTS = 100    # Barres attendues en dessous desquelles on passe à la résolution plus fine
+MAX_POINTS = 1500   # Barres au plus par graphique
+INTRADAY_TTL = 300
+OHLCV = ("Open", "High", "Low", "Close", "Volume")
+DAY_NS = 86400 * 10**9
+WARMUP = 80         # Barres de chauffe des indicateurs (Ichimoku : 52 + 26)
+COVER_SLACK = 4 * DAY_NS  # Début de période tombant un week-end prolongé : la première séance suffit
+TECHNICAL_OVERLAYS = ("Bollinger Bands", "Ichimoku Cloud", "OBV")  # Calculés sur les barres affichées
+VOLUME_OVERLAYS = ("VWAP", "Volume Profile")                      # widgets.vwap, sur les barres d'origine
+
+# (intervalle, barres par jour calendaire, période téléchargée, jours disponibles chez le fournisseur)
+SOURCES = (
+    ("1m", 390 * 5 / 7, "7d", 7),
+    ("5m", 78 * 5 / 7, "60d", 60),
+    ("1h", 7 * 5 / 7, "730d", 730),
+    ("1d", 252 / 365, "max", None),
+)
+# Périodes proposées : libellé -> jours calendaires (None : tout l'historique)
+PERIODS = {"1D": 1, "5D": 5, "1M": 30, "6M": 182, "1Y": 365, "5Y": 5 * 365, "10Y": 10 * 365, "Max": None}
+DEFAULT_PERIOD = "1Y"
+
+class Pyramid:
+    """Niveaux d'agrégation immuables d'un historique ; `levels[0]` est la résolution d'origine.
+
+    Chaque niveau est un dict de tableaux en lecture seule : "time" (début de barre, int64 ns
+    en heure locale de la place) et les colonnes OHLCV.
+    """
+
+    __slots__ = ("interval", "levels")
+
+    def __init__(self, interval: str, levels: list):
+        self.interval = interval
+        self.levels = levels
+
+    @classmethod
+    def from_frame(cls, interval: str, df: pd.DataFrame, adjusted: bool = False) -> "Pyramid":
+        if adjusted:
+            df = adjust(df)
+        index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        level = {"time": index.as_unit("ns").asi8}
+        for name in OHLCV:
+            level[name] = df[name].to_numpy(np.float64) if name in df else np.zeros(len(df))
+        levels = [level]
+        while len(level["time"]) > MAX_POINTS:
+            level = aggregate(level, FACTOR)
+            levels.append(level)
+        for level in levels:
+            for values in level.values():
+                values.flags.writeable = False
+        return cls(interval, levels)
+
+    @property
+    def start(self) -> int:
+        return int(self.levels[0]["time"][0]) if len(self.levels[0]["time"]) else 0
+
+    @property
+    def end(self) -> int:
+        return int(self.levels[0]["time"][-1]) if len(self.levels[0]["time"]) else 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(v.nbytes for level in self.levels for v in level.values())
+
+    def window(self, start: int, end: int, warmup: int = 0) -> tuple:
+        """(niveau, DataFrame, barres de chauffe) : niveau le plus fin tenant en MAX_POINTS barres
+        sur [start, end], précédé d'au plus `warmup` barres pour les indicateurs à fenêtre."""
+        for depth, level in enumerate(self.levels):
+            lo = int(np.searchsorted(level["time"], start, side="left"))
+            hi = int(np.searchsorted(level["time"], end, side="right"))
+            if hi - lo <= MAX_POINTS:
+                break
+        first = max(0, lo - warmup)
+        index = pd.DatetimeIndex(level["time"][first:hi], name="Date")
+        frame = pd.DataFrame({name: level[name][first:hi] for name in OHLCV}, index=index, copy=False)
+        return depth, frame, lo - first
+
+def aggregate(level: dict, factor: int) -> dict:
+    """Regroupe les barres par paquets de `factor` (la dernière barre peut être partielle)."""
+    starts = np.arange(0, len(level["time"]), factor)
+    return {
+        "time": level["time"][starts],
+        "Open": level["Open"][starts],
+        "High": np.maximum.reduceat(level["High"], starts) if len(starts) else level["High"][:0],
+        "Low": np.minimum.reduceat(level["Low"], starts) if len(starts) else level["Low"][:0],
+        "Close": level["Close"][np.minimum(starts + factor, len(level["time"])) - 1],
+        "Volume": np.add.reduceat(level["Volume"], starts) if len(starts) else level["Volume"][:0],
+    }
+
+def _fetch(symbol: str, interval: str, period: str, adjusted: bool = False) -> Pyramid:
+    history = provider.history(symbol, period=period, interval=interval, auto_adjust=False)
+    if history is None or history.empty:
+        raise ValueError(f"No {interval} history for {symbol}")
+    return Pyramid.from_frame(interval, history, adjusted)
+
+@instrumented_cache("lod_daily", resource=True, ttl=ASSET_TTL, max_entries=256, show_spinner=False)
+def _daily_pyramid(symbol: str, adjusted: bool = False, recent: bool = False) -> Pyramid:
+    if recent:  # Historique 1 an de la page (widgets.asset_data), sans second téléchargement
+        return Pyramid.from_frame("1d", fetch_history(symbol), adjusted)
+    return _fetch(symbol, "1d", "max", adjusted)
+
+@instrumented_cache("lod_intraday", resource=True, ttl=INTRADAY_TTL, max_entries=64, show_spinner=False)
+def _intraday_pyramid(symbol: str, interval: str, period: str, adjusted: bool = False) -> Pyramid:
+    return _fetch(symbol, interval, period, adjusted)
+
+def get_pyramid(symbol: str, interval: str, adjusted: bool = False, recent: bool = False) -> Pyramid:
+    """Pyramide d'un symbole à une résolution du fournisseur, partagée entre sessions.
+
+    En journalier, `recent` se contente de la dernière année au lieu de tout l'historique.
+    """
+    period = next(p for i, _, p, _ in SOURCES if i == interval)
+    if interval == "1d":
+        return _daily_pyramid(symbol, adjusted, recent)
+    return _intraday_pyramid(symbol, interval, period, adjusted)
+
+def _covers(pyramid: Pyramid, start: int) -> bool:
+    """Vrai si la pyramide commence dès `start` (à COVER_SLACK près)."""
+    return pyramid.start <= start + COVER_SLACK
+
+def choose_interval(span_days: float, start: pd.Timestamp = None) -> str:
+    """Résolution la plus grossière qui remplit le graphique (MIN_POINTS barres attendues) et
+    que le fournisseur sert encore à la date `start` ; à défaut la plus fine disponible."""
+    now = pd.Timestamp.now()
+    available = [(interval, per_day) for interval, per_day, _, days in SOURCES
+                 if days is None or start is None or start >= now - pd.Timedelta(days=days)]
+    for interval, per_day in reversed(available):
+        if span_days * per_day >= MIN_POINTS:
+            return interval
+    return available[0][0]
+
+def load_view(symbol: str, period: str = DEFAULT_PERIOD, zoom: tuple = None, warmup: int = 0,
+              adjusted: bool = False) -> dict:
+    """Barres à afficher pour une période (ancrée sur la dernière barre) ou une plage zoomée.
+
+    `zoom` : (début, fin) en Timestamp sans fuseau. Renvoie {"frame", "interval", "level",
+    "bar", "start", "end", "warmup", "adjusted", "pyramid"} ; `bar` décrit la durée nominale
+    d'une barre affichée, `pyramid` la pyramide dont la vue est extraite.
+    """
+    if zoom is not None:
+        start, end = (pd.Timestamp(t) for t in zoom)
+        interval = choose_interval((end - start) / pd.Timedelta(days=1), start)
+        start, end = start.value, end.value
+        pyramid = get_pyramid(symbol, interval, adjusted, recent=interval == "1d")
+        if interval == "1d" and not _covers(pyramid, start):
+            pyramid = get_pyramid(symbol, "1d", adjusted)
+    else:
+        days = PERIODS[period]
+        if days is None:
+            interval, pyramid = "1d", get_pyramid(symbol, "1d", adjusted)
+            start, end = pyramid.start, pyramid.end
+        else:
+            interval = choose_interval(days)
+            pyramid = get_pyramid(symbol, interval, adjusted, recent=interval == "1d")
+            end = pyramid.end
+            start = (pd.Timestamp(end).normalize() - pd.Timedelta(days=days - 1)).value  # Jours entiers
+            if interval == "1d" and not _covers(pyramid, start):
+                pyramid = get_pyramid(symbol, "1d", adjusted)
+    level, frame, skipped = pyramid.window(start, end, warmup)
+    return {"frame": frame, "interval": interval, "level": level, "bar": bar_label(interval, FACTOR ** level),
+            "start": pd.Timestamp(start), "end": pd.Timestamp(end), "warmup": skipped, "adjusted": adjusted,
+            "pyramid": pyramid}
+
+def bar_label(interval: str, count: int) -> str:
+    """Durée nominale d'une barre agrégée : « 4 x 1d », « 1h »..."""
+    return interval if count == 1 else f"{count} x {interval}"
+
+def parse_range(values) -> tuple:
+    """Bornes d'une sélection Plotly sur un axe de dates (textes ou millisecondes) -> Timestamps."""
+    bounds = [pd.Timestamp(v, unit="ms") if isinstance(v, (int, float)) else pd.Timestamp(v) for v in values]
+    bounds = sorted(t.tz_localize(None) if t.tz is not None else t for t in bounds)
+    return bounds[0], bounds[-1]
+
+def show_price_chart(symbol: str, chart_type: str = "Candlestick", indicators: list = None, key: str = "price_chart",
+                     adjusted: bool = False):
+    """Sélecteur de période et graphique de prix multi-résolution (ajusté avec `adjusted`).
+
+    Une sélection horizontale sur le graphique zoome sur la plage choisie : la vue est
+    rechargée depuis la pyramide adaptée (résolution plus fine téléchargée si besoin).
+    La clé du graphique change à chaque zoom pour repartir d'une sélection vide.
+    """
+    import streamlit as st
+    from widgets.chart import build_price_chart
+    from widgets.indicators import calculate_technical
+    from widgets.vwap import overlay
+
+    state = st.session_state.setdefault(f"{key}_lod", {"symbol": symbol, "zoom": None, "version": 0})
+    if state["symbol"] != symbol:
+        state.update(symbol=symbol, zoom=None)
+
+    def reset():
+        state["zoom"] = None
+        state["version"] += 1
+
+    period = st.radio("Period", list(PERIODS), index=list(PERIODS).index(DEFAULT_PERIOD), horizontal=True,
+                      key=f"{key}_period", on_change=reset)
+    indicators = indicators or []
+    technical = any(i in TECHNICAL_OVERLAYS for i in indicators)
+    view = load_view(symbol, period, state["zoom"], WARMUP if technical else 0, adjusted)
+    frame = view["frame"]
+    if technical:
+        frame = calculate_technical(frame).iloc[view["warmup"]:]
+    profile = None
+    if any(i in VOLUME_OVERLAYS for i in indicators):
+        frame, profile = overlay(symbol, view, frame, indicators)
+    title = f"{'Adjusted ' if adjusted else ''}Price History ({'zoom' if state['zoom'] else period}, {view['bar']} bars)"
+    fig = build_price_chart(frame, chart_type, indicators, title=title, profile=profile)
+    fig.update_layout(dragmode="select", selectdirection="h")
+    event = st.plotly_chart(fig, use_container_width=True, key=f"{key}_{state['version']}",
+                            on_select="rerun", selection_mode="box")
+    boxes = (event or {}).get("selection", {}).get("box") or []
+    if boxes and boxes[0].get("x"):
+        state["zoom"] = parse_range(boxes[0]["x"])
+        state["version"] += 1
+        st.rerun()
+    if state["zoom"]:
+        st.button("Reset zoom", key=f"{key}_reset", on_click=reset)
+    st.caption(f"{len(frame):,} bars of {view['bar']} from {view['start']:%Y-%m-%d %H:%M} to "
+               f"{view['end']:%Y-%m-%d %H:%M}. Drag across the chart to zoom in.")
+    if profile is not None and profile.total > 0:
+        low, high = profile.value_area()
+        scope = "last session" if view["interval"] != "1d" else "visible range"
+        st.caption(f"Volume profile ({scope}): point of control {profile.poc:,.2f}, "
+                   f"value area {low:,.2f} - {high:,.2f} (70% of volume).")
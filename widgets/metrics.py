@@ -0,0 +1,232 @@
+"""Instrumentation légère : compteurs et histogrammes en mémoire, export Prometheus.
+
+Toutes les mesures sont des opérations O(1) sous un verrou (quelques microsecondes),
+négligeables devant le temps d'un rerun Streamlit.
+"""
+import os
+import time
+import pickle
+import bisect
+import hashlib
+import logging
+import threading
+import functools
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+logger = logging.getLogger("finlite")
+
+# Bornes (secondes) des histogrammes de latence
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_PORT_ENV = "FINLIT_METRICS_PORT"
+SEEN_KEYS = 4096  # Clés déjà calculées retenues par cache pour reconnaître une éviction
+
+HELP = {
+    "finlit_section_seconds": "Wall time spent rendering a widget or page section.",
+    "finlit_section_errors_total": "Exceptions raised by a widget or page section.",
+    "finlit_cache_hits_total": "Streamlit cache lookups served from cache.",
+    "finlit_cache_misses_total": "Streamlit cache lookups that ran the wrapped function.",
+    "finlit_cache_evictions_total": "Misses for a key that had already been computed (TTL expiry or eviction).",
+    "finlit_provider_seconds": "Latency of data provider calls.",
+    "finlit_provider_errors_total": "Data provider calls that raised.",
+    "finlit_data_quality_total": "Symbols in a provider response flagged by validation, by call and anomaly.",
+    "finlit_errors_total": "Errors reported by widgets.",
+    "finlit_api_requests_total": "JSON API responses by HTTP status.",
+    "finlit_api_seconds": "JSON API request handling time.",
+    "finlit_api_cache_hits_total": "JSON API requests served from the shared response cache.",
+    "finlit_api_cache_misses_total": "JSON API responses computed (one per key and refresh interval).",
+}
+
+_lock = threading.Lock()
+_counters = {}    # (nom, labels) -> valeur
+_histograms = {}  # (nom, labels) -> [comptes par bucket..., +Inf], somme, total
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def inc(name: str, amount: float = 1.0, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + amount
+
+def observe(name: str, value: float, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        hist[0][bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        hist[1] += value
+        hist[2] += 1
+
+def record_error(source: str, error: Exception):
+    """Journalise une erreur de widget et l'ajoute aux compteurs."""
+    logger.warning("%s: %s", source, error)
+    inc("finlit_errors_total", source=source, type=type(error).__name__)
+
+@contextmanager
+def timed(section: str):
+    """Mesure la durée d'une section (utilisable aussi comme décorateur)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("finlit_section_errors_total", section=section)
+        raise
+    finally:
+        observe("finlit_section_seconds", time.perf_counter() - start, section=section)
+
+class SectionTimer:
+    """Chronomètre par tours pour les scripts de page : chaque lap() clôt la section en cours."""
+
+    def __init__(self, page: str):
+        self.page = page
+        self._start = time.perf_counter()
+
+    def lap(self, section: str):
+        now = time.perf_counter()
+        observe("finlit_section_seconds", now - self._start, section=f"{self.page}.{section}")
+        self._start = now
+
+@contextmanager
+def observe_provider(call: str):
+    """Mesure la latence (et les erreurs) d'un appel au fournisseur de données."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("finlit_provider_errors_total", call=call)
+        raise
+    finally:
+        observe("finlit_provider_seconds", time.perf_counter() - start, call=call)
+
+def _digest(args: tuple, kwargs: dict) -> bytes:
+    """Empreinte des arguments d'un appel : le repr tronque les tableaux numpy et les DataFrames."""
+    try:
+        payload = pickle.dumps((args, sorted(kwargs.items())), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        payload = repr((args, sorted(kwargs.items()))).encode()
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+def instrumented_cache(name: str, resource: bool = False, **cache_kwargs):
+    """Équivalent de st.cache_data qui compte hits, misses et évictions sous le nom `name`.
+
+    Avec `resource=True`, st.cache_resource est utilisé : la valeur est partagée (non
+    copiée) entre sessions et doit donc être immuable.
+    """
+    def decorator(func):
+        computed_keys = OrderedDict()  # LRU borné à SEEN_KEYS : au-delà, un recalcul compte comme simple miss
+        local = threading.local()
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            local.missed = True
+            key = _digest(args, kwargs)
+            with _lock:
+                recomputed = key in computed_keys
+                computed_keys[key] = None
+                computed_keys.move_to_end(key)
+                if len(computed_keys) > SEEN_KEYS:
+                    computed_keys.popitem(last=False)
+            if recomputed:
+                inc("finlit_cache_evictions_total", cache=name)
+            return func(*args, **kwargs)
+
+        cached = (st.cache_resource if resource else st.cache_data)(**cache_kwargs)(compute)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            local.missed = False
+            result = cached(*args, **kwargs)
+            inc("finlit_cache_misses_total" if local.missed else "finlit_cache_hits_total", cache=name)
+            return result
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+def snapshot() -> dict:
+    """Copie cohérente de toutes les mesures : {"counters": {...}, "histograms": {...}}."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "histograms": {k: (list(v[0]), v[1], v[2]) for k, v in _histograms.items()},
+        }
+
+def quantile(buckets: list, q: float) -> float:
+    """Quantile approché depuis les comptes par bucket (borne supérieure du bucket atteint)."""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank, seen = q * total, 0
+    for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+        seen += count
+        if seen >= rank:
+            return bound
+    return float("inf")
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    escaped = (k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in items)
+    return "{" + ",".join(escaped) + "}"
+
+def render_prometheus() -> str:
+    """Export au format texte Prometheus (version 0.0.4)."""
+    data = snapshot()
+    lines, declared = [], set()
+
+    def declare(name, kind):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(data["counters"].items()):
+        declare(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), (buckets, total, count) in sorted(data["histograms"].items()):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Pas de log par scrape
+
+@st.cache_resource
+def start_metrics_server(port: int = None):
+    """Démarre (une fois par processus) l'endpoint /metrics si FINLIT_METRICS_PORT est défini."""
+    port = port or int(os.environ.get(METRICS_PORT_ENV, 0))
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    except OSError as error:
+        # Port déjà pris (p. ex. un second serveur Streamlit sur la même machine) : l'application tourne sans /metrics
+        logger.warning("Metrics endpoint disabled, cannot bind :%d (%s)", port, error)
+        return None
+    threading.Thread(target=server.serve_forever, name="finlit-metrics", daemon=True).start()
+    logger.info("Metrics endpoint listening on :%d/metrics", port)
+    return server
@@ -0,0 +1,175 @@
+"""Magasin d'historiques mappés en mémoire, partagé entre processus Streamlit.
+
+Chaque jeu de données est écrit une fois dans un fichier binaire brut (colonnes
+contiguës, alignées sur 8 octets) accompagné d'un manifeste JSON. Le manifeste est
+remplacé atomiquement (os.replace) après l'écriture du fichier de données : un
+lecteur voit toujours une version complète. Les processus mappent le fichier en
+lecture seule ; les colonnes sont des vues sans copie sur le cache de pages du
+système, dont le coût mémoire ne dépend donc pas du nombre de workers.
+"""
+import os
+import re
+import json
+import time
+import logging
+import functools
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from widgets.history_store import compact_array
+
+logger = logging.getLogger("finlit")
+
+STORE_FORMAT = 1
+STORE_PATH_ENV = "FINLIT_MMAP_PATH"
+DEFAULT_STORE_PATH = Path(".cache") / "mmap"
+_ALIGN = 8
+ORPHAN_GRACE = 60.0  # secondes : un fichier de données plus récent peut appartenir à une écriture en cours
+
+def store_root() -> Path:
+    return Path(os.environ.get(STORE_PATH_ENV, DEFAULT_STORE_PATH))
+
+def _safe(key) -> str:
+    text = "_".join(map(str, key)) if isinstance(key, tuple) else str(key)
+    return "".join(c if c.isalnum() or c in "-." else "_" for c in text) or "_"
+
+def _paths(dataset: str, key) -> tuple:
+    directory = store_root() / dataset
+    return directory, directory / f"{_safe(key)}.json"
+
+def _mappable(frame) -> bool:
+    return (isinstance(frame, pd.DataFrame) and not frame.empty
+            and isinstance(frame.index, pd.DatetimeIndex)
+            and all(dtype.kind in "fiub" for dtype in frame.dtypes))
+
+def _label(column):
+    return list(column) if isinstance(column, tuple) else column
+
+def write(dataset: str, key, value) -> bool:
+    """Écrit un DataFrame (ou un dict de DataFrames de même index) et bascule le manifeste atomiquement.
+
+    Renvoie False, sans rien écrire, si la valeur n'est pas mappable (vide, index
+    autre que des dates, colonnes non numériques).
+    """
+    keys = list(value) if isinstance(value, dict) else None
+    frame = pd.concat(value, axis=1) if keys else value
+    if not _mappable(frame):
+        return False
+    directory, manifest_path = _paths(dataset, key)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = f"{time.time_ns()}-{os.getpid()}"
+    data_path = directory / f"{_safe(key)}-{version}.bin"
+
+    arrays = [frame.index.as_unit("ns").asi8] + [compact_array(frame[c].to_numpy()) for c in frame.columns]
+    layout, offset = [], 0
+    with open(data_path, "wb") as f:
+        for values in arrays:
+            layout.append({"dtype": values.dtype.str, "offset": offset})
+            f.write(np.ascontiguousarray(values).tobytes())
+            offset += values.nbytes
+            padding = -offset % _ALIGN
+            f.write(b"\0" * padding)
+            offset += padding
+
+    columns = frame.columns
+    manifest = {
+        "format": STORE_FORMAT, "written": time.time(), "file": data_path.name, "rows": len(frame), "keys": keys,
+        "index": {"name": frame.index.name, "tz": str(frame.index.tz) if frame.index.tz else None, **layout[0]},
+        "column_names": list(columns.names) if isinstance(columns, pd.MultiIndex) else None,
+        "columns": [{"label": _label(c), **entry} for c, entry in zip(columns, layout[1:])],
+    }
+    previous = _read_manifest(manifest_path)
+    tmp = manifest_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest))
+    os.replace(tmp, manifest_path)
+    # Les processus qui ont encore l'ancienne version mappée la conservent (POSIX)
+    current = _read_manifest(manifest_path)
+    _collect(directory, _safe(key), current["file"] if current else data_path.name,
+             previous["file"] if previous else None)
+    return True
+
+def _collect(directory: Path, name: str, keep: str, superseded: str = None):
+    """Supprime les fichiers de données de `name` que le manifeste courant ne référence pas.
+
+    Deux écrivains concurrents remplacent chacun le manifeste : le fichier du perdant
+    n'est plus référencé par personne. La version remplacée part tout de suite, les
+    autres orphelins une fois passé ORPHAN_GRACE (une écriture concurrente peut avoir
+    écrit son fichier sans avoir encore publié son manifeste).
+    """
+    pattern = re.compile(re.escape(name) + r"-\d+-\d+\.bin")
+    now = time.time()
+    for path in directory.glob(f"{name}-*.bin"):
+        if path.name == keep or not pattern.fullmatch(path.name):
+            continue
+        try:
+            if path.name == superseded or now - path.stat().st_mtime >= ORPHAN_GRACE:
+                path.unlink()
+        except OSError:
+            pass
+
+def _read_manifest(path: Path):
+    try:
+        manifest = json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable store manifest %s: %s", path, e)
+        return None
+    return manifest if manifest.get("format") == STORE_FORMAT else None
+
+def read(dataset: str, key, max_age: float = None):
+    """Valeur en lecture seule mappée depuis le magasin, ou None (absente ou plus vieille que `max_age`)."""
+    directory, manifest_path = _paths(dataset, key)
+    for _ in range(2):  # Le fichier peut être remplacé entre la lecture du manifeste et son ouverture
+        manifest = _read_manifest(manifest_path)
+        if manifest is None or (max_age is not None and time.time() - manifest["written"] >= max_age):
+            return None
+        try:
+            buffer = np.memmap(directory / manifest["file"], dtype=np.uint8, mode="r")
+            break
+        except FileNotFoundError:
+            continue
+    else:
+        return None
+
+    rows = manifest["rows"]
+
+    def view(entry):
+        dtype = np.dtype(entry["dtype"])
+        return buffer[entry["offset"]:entry["offset"] + rows * dtype.itemsize].view(dtype)
+
+    index = pd.DatetimeIndex(view(manifest["index"]).view("M8[ns]"), name=manifest["index"]["name"])
+    if manifest["index"]["tz"]:
+        index = index.tz_localize("UTC").tz_convert(manifest["index"]["tz"])
+    labels = [tuple(c["label"]) if isinstance(c["label"], list) else c["label"] for c in manifest["columns"]]
+    frame = pd.DataFrame({i: view(c) for i, c in enumerate(manifest["columns"])}, index=index, copy=False)
+    if manifest["column_names"]:
+        frame.columns = pd.MultiIndex.from_tuples(labels, names=manifest["column_names"])
+    else:
+        frame.columns = labels
+    if manifest["keys"]:
+        return {k: frame[k] for k in manifest["keys"]}
+    return frame
+
+def mapped(dataset: str, ttl: float):
+    """Sert la fonction depuis le magasin mappé tant qu'il est frais ; sinon l'exécute et publie
+    le résultat. Un résultat non mappable est renvoyé tel quel, sans être publié."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            stored = read(dataset, args, max_age=ttl)
+            if stored is not None:
+                return stored
+            value = func(*args)
+            try:
+                if not write(dataset, args, value):
+                    return value
+            except OSError as e:
+                logger.warning("Could not publish %s%s to the mapped store: %s", dataset, args, e)
+                return value
+            stored = read(dataset, args)
+            return value if stored is None else stored
+        return wrapper
+    return decorator
@@ -0,0 +1,234 @@
+"""Simulation de Monte-Carlo des trajectoires de prix et cônes de probabilité.
+
+Deux modèles calibrés sur l'historique journalier : mouvement brownien géométrique
+(dérive et volatilité des rendements logarithmiques) et rééchantillonnage des
+rendements historiques (bootstrap). Les trajectoires sont tirées par paquets de
+taille fixe avec un générateur initialisé par une graine : la mémoire ne dépend pas
+du nombre de trajectoires et deux appels identiques donnent le même résultat.
+
+Pour le GBM, seules les dates évaluées sont tirées (somme exacte des accroissements
+gaussiens) et l'atteinte de l'objectif entre deux dates suit la loi du pont brownien.
+Les percentiles ne demandent pas de conserver les trajectoires : à chaque date
+évaluée, les log-prix, centrés sur la dérive et réduits par sigma * sqrt(t), sont
+cumulés dans un histogramme fixe dont on interpole ensuite les quantiles.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from widgets.metrics import instrumented_cache, timed
+
+MODELS = ("GBM", "Bootstrap")
+HORIZONS = {"1M": 21, "3M": 63, "6M": 126, "1Y": 252}
+PERCENTILES = (5, 25, 50, 75, 95)
+N_PATHS = 100_000
+CHUNK = 8192          # trajectoires par paquet : ~16 Mo de tirages journaliers pour un horizon d'un an
+MAX_STEPS = 64        # dates évaluées pour les cônes
+BINS = 4096
+Z_RANGE = 8.0         # histogramme sur +/- 8 écarts-types ; les queues extrêmes tombent dans les bornes
+MIN_RETURNS = 20
+
+class Simulation:
+    """Résultat d'une simulation (tableaux en lecture seule, mis en cache tel quel).
+
+    - steps : jours de bourse évalués (0 = dernier cours) ;
+    - quantiles : prix simulés, une ligne par percentile de PERCENTILES ;
+    - touch / above : probabilités d'atteindre l'objectif avant l'horizon / d'être
+      au-delà à l'horizon (None sans objectif).
+    """
+
+    __slots__ = ("model", "start", "steps", "quantiles", "target", "touch", "above", "n_paths", "mu", "sigma")
+
+    def __init__(self, model, start, steps, quantiles, target, touch, above, n_paths, mu, sigma):
+        self.model = model
+        self.start = start
+        self.steps = steps
+        self.quantiles = quantiles
+        self.target = target
+        self.touch = touch
+        self.above = above
+        self.n_paths = n_paths
+        self.mu = mu
+        self.sigma = sigma
+
+    def percentile(self, p: int) -> np.ndarray:
+        return self.quantiles[PERCENTILES.index(p)]
+
+def log_returns(close) -> np.ndarray:
+    """Rendements logarithmiques journaliers finis de la série de clôtures."""
+    close = np.asarray(close, dtype=np.float64)
+    close = close[np.isfinite(close) & (close > 0)]
+    return np.diff(np.log(close))
+
+def calibrate(returns: np.ndarray) -> tuple:
+    """(mu, sigma) journaliers des rendements logarithmiques."""
+    return float(returns.mean()), float(returns.std(ddof=1))
+
+def evaluation_steps(horizon: int, max_steps: int = MAX_STEPS) -> np.ndarray:
+    return np.unique(np.linspace(0, horizon, min(horizon, max_steps) + 1).round().astype(np.int64))
+
+def _gbm_chunk(rng, mu: float, sigma: float, t: np.ndarray, size: int, barrier: float) -> tuple:
+    """Log-prix aux dates `t` et probabilité de franchissement par trajectoire.
+
+    Les accroissements gaussiens s'additionnent exactement : on ne tire qu'une normale
+    par intervalle entre dates évaluées. Le franchissement entre deux dates suit la loi
+    du pont brownien, la barrière étant décalée de 0,5826 sigma (Broadie-Glasserman)
+    pour reproduire une observation journalière.
+    """
+    dt = np.diff(t, prepend=0).astype(np.float64)
+    sampled = rng.standard_normal((size, len(t)), dtype=np.float32)
+    sampled *= (sigma * np.sqrt(dt)).astype(np.float32)
+    sampled += (mu * dt).astype(np.float32)
+    np.cumsum(sampled, axis=1, out=sampled)
+    if barrier is None:
+        return sampled, None
+    sign = np.float32(1.0 if barrier >= 0 else -1.0)
+    b = np.float32(sign * barrier + 0.5826 * sigma)
+    gap = b - sign * sampled            # distance à la barrière à chaque date
+    previous = np.empty_like(gap)
+    previous[:, 0] = b                  # départ au dernier cours (log-prix nul)
+    previous[:, 1:] = gap[:, :-1]
+    crossed = (gap <= 0).any(axis=1)
+    gap *= previous
+    gap *= (-2.0 / (sigma * sigma * dt)).astype(np.float32)
+    np.minimum(gap, 0, out=gap)
+    survive = -np.expm1(gap, out=gap)   # 1 - P(franchir l'intervalle)
+    hit = 1.0 - survive.prod(axis=1, dtype=np.float64)
+    hit[crossed] = 1.0
+    return sampled, hit
+
+def _bootstrap_chunk(rng, returns: np.ndarray, t: np.ndarray, horizon: int, size: int, barrier: float) -> tuple:
+    """Rendements historiques tirés avec remise, jour par jour (pas de loi fermée de la somme)."""
+    paths = np.take(returns, rng.integers(0, len(returns), size=(size, horizon), dtype=np.int32))
+    np.cumsum(paths, axis=1, out=paths)
+    if barrier is None:
+        return paths[:, t - 1], None
+    extreme = paths.max(axis=1) >= barrier if barrier >= 0 else paths.min(axis=1) <= barrier
+    return paths[:, t - 1], extreme
+
+def _quantiles_from_histogram(counts: np.ndarray, total: int, edges: np.ndarray) -> np.ndarray:
+    """Quantiles (une ligne par percentile) interpolés linéairement dans l'histogramme de chaque date."""
+    cumulative = np.cumsum(counts, axis=1)
+    rows = np.arange(len(counts))
+    result = np.empty((len(PERCENTILES), len(counts)))
+    for i, p in enumerate(PERCENTILES):
+        rank = p / 100 * total
+        k = np.minimum((cumulative < rank).sum(axis=1), counts.shape[1] - 1)
+        below = np.where(k > 0, cumulative[rows, k - 1], 0)
+        inside = counts[rows, k]
+        frac = np.divide(rank - below, inside, out=np.full(len(k), 0.5), where=inside > 0)
+        result[i] = edges[k] + frac * (edges[k + 1] - edges[k])
+    return result
+
+def simulate(close, horizon: int, model: str = "GBM", n_paths: int = N_PATHS, target: float = None,
+             seed: int = 0, chunk: int = CHUNK) -> Simulation:
+    """Simule `n_paths` trajectoires de `horizon` séances à partir de la dernière clôture."""
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}; expected one of {MODELS}")
+    returns = log_returns(close)
+    if len(returns) < MIN_RETURNS:
+        raise ValueError(f"At least {MIN_RETURNS} daily returns are needed, got {len(returns)}.")
+    mu, sigma = calibrate(returns)
+    start = float(np.asarray(close, dtype=np.float64)[np.isfinite(close)][-1])
+    steps = evaluation_steps(horizon)
+    t = steps[1:]  # t = 0 : tous les chemins valent le dernier cours
+    center, scale = mu * t, max(sigma, 1e-12) * np.sqrt(t)
+    edges = np.linspace(-Z_RANGE, Z_RANGE, BINS + 1)
+    counts = np.zeros((len(t), BINS), dtype=np.int64)
+    offsets = (np.arange(len(t)) * BINS)[None, :]
+    bin_scale = BINS / (2 * Z_RANGE) / scale
+    barrier = np.log(target / start) if target else None
+    touched, above = 0.0, 0
+
+    returns32 = returns.astype(np.float32)  # précision suffisante, moitié moins de mémoire à parcourir
+    rng = np.random.default_rng(seed)
+    for begin in range(0, n_paths, chunk):
+        size = min(chunk, n_paths - begin)
+        if model == "GBM":
+            sampled, hit = _gbm_chunk(rng, mu, sigma, t, size, barrier)
+        else:
+            sampled, hit = _bootstrap_chunk(rng, returns32, t, horizon, size, barrier)
+        # log(prix / dernier cours) réduit, puis numéro de case de l'histogramme
+        bins = ((sampled - center) * bin_scale + BINS / 2).astype(np.int64)
+        np.clip(bins, 0, BINS - 1, out=bins)
+        bins += offsets
+        counts += np.bincount(bins.ravel(), minlength=len(t) * BINS).reshape(len(t), BINS)
+        if barrier is not None:
+            touched += float(hit.sum())
+            final = sampled[:, -1]
+            above += int(np.count_nonzero(final >= barrier if barrier >= 0 else final <= barrier))
+
+    z_quantiles = _quantiles_from_histogram(counts, n_paths, edges)
+    quantiles = np.empty((len(PERCENTILES), len(steps)))
+    quantiles[:, 0] = start
+    quantiles[:, 1:] = start * np.exp(center + z_quantiles * scale)
+    quantiles.flags.writeable = False
+    return Simulation(model, start, steps, quantiles, target,
+                      touched / n_paths if barrier is not None else None,
+                      above / n_paths if barrier is not None else None, n_paths, mu, sigma)
+
+@instrumented_cache("montecarlo", ttl=3600)
+def cached_simulation(close: np.ndarray, horizon: int, model: str, target: float = None) -> Simulation:
+    """Simulation partagée entre sessions (graine fixe : même symbole, même résultat)."""
+    return simulate(close, horizon, model, target=target)
+
+def build_cone_chart(history: pd.DataFrame, sim: Simulation, symbol: str, lookback: int = 126):
+    """Cônes 5-95 % et 25-75 %, médiane, fin de l'historique et objectif des analystes."""
+    from widgets.chart import COLORS, dates, new_figure
+    import plotly.graph_objects as go
+
+    last = pd.Timestamp(history.index[-1])
+    if last.tz is not None:
+        last = last.tz_localize(None)
+    future = dates(pd.bdate_range(last, periods=int(sim.steps[-1]) + 1)[sim.steps])
+    recent = history["Close"].iloc[-lookback:]
+    past = dates(recent.index)
+    traces = [go.Scatter(x=past, y=recent.to_numpy(), mode="lines", name="Close", line=dict(color=COLORS["neutral"]))]
+    for low, high, opacity in ((5, 95, 0.15), (25, 75, 0.3)):
+        traces.append(go.Scatter(x=future, y=sim.percentile(high), mode="lines", line=dict(width=0),
+                                 name=f"P{high}", showlegend=False))
+        traces.append(go.Scatter(x=future, y=sim.percentile(low), mode="lines", line=dict(width=0),
+                                 fill="tonexty", fillcolor=f"rgba(31, 119, 180, {opacity})", name=f"P{low}-P{high}"))
+    traces.append(go.Scatter(x=future, y=sim.percentile(50), mode="lines", name="Median", line=dict(color="#1f77b4")))
+    if sim.target:  # Trace plutôt que add_hline, bien plus coûteux à construire
+        traces.append(go.Scatter(x=[past[0], future[-1]], y=[sim.target, sim.target], mode="lines",
+                                 name=f"1y target {sim.target:,.2f}$",
+                                 line=dict(color=COLORS["positive"], dash="dash")))
+    fig = new_figure(f"{symbol} - {sim.model} simulation ({sim.n_paths:,} paths)", height=450,
+                     hovermode="x unified")
+    fig.add_traces(traces)
+    return fig
+
+@timed("show_simulation")
+def show_simulation(symbol: str, history: pd.DataFrame, target: float = None):
+    """Point d'entrée du widget : choix du modèle et de l'horizon, cônes et probabilités."""
+    col1, col2 = st.columns(2)
+    with col1:
+        model = st.radio("Model", MODELS, horizontal=True, key="mc_model",
+                         help="GBM: normal log returns with the historical drift and volatility. "
+                              "Bootstrap: historical daily returns resampled with replacement.")
+    with col2:
+        horizon = st.radio("Horizon", list(HORIZONS), index=3, horizontal=True, key="mc_horizon")
+
+    close = history["Close"].to_numpy(dtype=np.float64)
+    target = float(target) if isinstance(target, (int, float)) and target > 0 else None
+    try:
+        sim = cached_simulation(close, HORIZONS[horizon], model, target)
+    except ValueError as e:
+        st.warning(str(e))
+        return
+
+    st.plotly_chart(build_cone_chart(history, sim, symbol), use_container_width=True, key="mc_chart")
+    cols = st.columns(4)
+    cols[0].metric(f"Median in {horizon}", f"{sim.percentile(50)[-1]:,.2f}$",
+                   f"{(sim.percentile(50)[-1] / sim.start - 1) * 100:+.1f}%")
+    cols[1].metric("5%-95% range", f"{sim.percentile(5)[-1]:,.0f}$ - {sim.percentile(95)[-1]:,.0f}$")
+    if sim.target is not None:
+        side = "above" if sim.target >= sim.start else "below"
+        cols[2].metric("P(reach 1y target)", f"{sim.touch * 100:.1f}%",
+                       help=f"Share of paths that touch {sim.target:,.2f}$ within {horizon}")
+        cols[3].metric(f"P({side} target at {horizon})", f"{sim.above * 100:.1f}%")
+    else:
+        cols[2].metric("P(reach 1y target)", "N/A", help="No analyst target price available")
+    st.caption(f"Calibrated on {len(close) - 1} daily returns: drift {sim.mu * 252 * 100:+.1f}%/yr, "
+               f"volatility {sim.sigma * np.sqrt(252) * 100:.1f}%/yr. Fixed seed, reproducible.")
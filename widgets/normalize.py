@@ -0,0 +1,229 @@
+"""Validation et normalisation des réponses du fournisseur, en une seule passe.
+
+Toute réponse de widgets.provider (historique d'un symbole ou téléchargement
+multi-symboles aux colonnes (champ, symbole)) traverse normalize() une fois,
+avant toute mise en cache. Sur le tableau dates x symboles de chaque champ, sans
+boucle par symbole :
+
+- index trié, horodatages dupliqués retirés (la dernière révision est gardée),
+  colonnes numériques en float64, événements (dividendes, splits) manquants à 0 ;
+- cours non positifs ou infinis retirés, plus haut / plus bas rendus cohérents
+  avec l'ouverture et la clôture, lignes sans aucune clôture supprimées ;
+- trous intérieurs (entre la première et la dernière cotation d'un symbole)
+  comptés, et comblés sur au plus `fill_limit` barres : barre plate à la clôture
+  précédente, volume nul ; la fin de série n'est jamais prolongée ;
+- sauts d'une barre à l'autre évoquant un split non ajusté (x1,8 ou plus) signalés
+  quand aucun split n'est déclaré à cette date.
+
+Le rapport de qualité par symbole est conservé par processus (quality()) et
+compté dans les métriques ; il n'est pas attaché au résultat, pandas recopiant
+`attrs` à chaque opération dérivée. Les lecteurs
+n'ont plus à refaire ce travail à chaque rendu : last_two_valid() donne en un
+appel les deux dernières clôtures connues de tous les symboles.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from widgets.metrics import inc
+
+PRICE_FIELDS = ("Open", "High", "Low", "Close", "Adj Close")
+VOLUME_FIELD = "Volume"
+EVENT_FIELDS = ("Dividends", "Stock Splits", "Capital Gains")
+SPLIT_FIELD = "Stock Splits"
+JUMP_RATIO = 1.8  # Variation minimale (hausse ou baisse) d'un saut « de type split »
+
+_reports = {}     # symbole -> dernier rapport de qualité
+_reports_lock = threading.Lock()
+
+def _forward_index(valid: np.ndarray) -> np.ndarray:
+    """Pour chaque ligne, indice de la dernière ligne valide jusqu'à elle incluse (-1 sinon)."""
+    rows = np.where(valid, np.arange(len(valid))[:, None], -1)
+    return np.maximum.accumulate(rows, axis=0)
+
+def _runs(mask: np.ndarray) -> tuple:
+    """(colonne, longueur) de chaque suite de True, colonne par colonne."""
+    padded = np.zeros((mask.shape[1], mask.shape[0] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask.T
+    edges = np.diff(padded, axis=1)
+    start_cols, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return start_cols, ends - starts
+
+def last_two_valid(values) -> tuple:
+    """(dernière, avant-dernière) positions valides de chaque colonne d'un tableau ou DataFrame
+    dates x symboles ; -1 quand elles n'existent pas."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    valid = ~np.isnan(values)
+    count = len(values)
+    flipped = valid[::-1]
+    last = np.where(flipped.any(axis=0), count - 1 - flipped.argmax(axis=0), -1)
+    valid[last[last >= 0], np.flatnonzero(last >= 0)] = False
+    flipped = valid[::-1]
+    prev = np.where(flipped.any(axis=0), count - 1 - flipped.argmax(axis=0), -1)
+    return last, prev
+
+def _layout(frame: pd.DataFrame, symbol: str) -> tuple:
+    """(symboles, champ -> positions des colonnes par symbole, -1 si absent)."""
+    columns = frame.columns
+    if isinstance(columns, pd.MultiIndex):
+        fields, tickers = columns.get_level_values(0), columns.get_level_values(1)
+        symbols = list(dict.fromkeys(tickers[fields == "Close"]))
+        lookup = {key: i for i, key in enumerate(zip(fields, tickers))}
+        positions = {field: np.array([lookup.get((field, s), -1) for s in symbols])
+                     for field in dict.fromkeys(fields)}
+        return symbols, positions
+    return [symbol], {name: np.array([i]) for i, name in enumerate(columns)}
+
+def normalize(frame: pd.DataFrame, symbol: str = None, fill_limit: int = 0, call: str = "history") -> pd.DataFrame:
+    """Renvoie `frame` nettoyé ; le rapport de qualité de chaque symbole est lisible par quality()."""
+    if frame is None or not isinstance(frame, pd.DataFrame) or frame.empty:
+        return frame
+    duplicates, unsorted = 0, False
+    index = frame.index
+    if not isinstance(index, pd.DatetimeIndex):
+        frame = frame.set_axis(pd.DatetimeIndex(pd.to_datetime(index, errors="coerce")), axis=0)
+        frame = frame[frame.index.notna()]
+    if not frame.index.is_monotonic_increasing:
+        unsorted = True
+        frame = frame.sort_index(kind="stable")
+    duplicated = frame.index.duplicated(keep="last")
+    if duplicated.any():
+        duplicates = int(duplicated.sum())
+        frame = frame[~duplicated]
+
+    symbols, positions = _layout(frame, symbol)
+    if "Close" not in positions or not symbols:
+        return frame
+    numeric = frame if all(pd.api.types.is_numeric_dtype(t) for t in frame.dtypes) else \
+        frame.apply(pd.to_numeric, errors="coerce")
+    data = numeric.to_numpy(dtype=np.float64, copy=True)
+
+    def field(name):
+        cols = positions.get(name)
+        if cols is None or (cols < 0).all():
+            return None, None
+        return cols, np.where(cols >= 0, cols, 0)
+
+    count = len(symbols)
+    bad_prices, repaired = np.zeros(count, dtype=np.int64), np.zeros(count, dtype=np.int64)
+    prices = {}
+    for name in PRICE_FIELDS:
+        cols, safe = field(name)
+        if cols is None:
+            continue
+        block = data[:, safe]
+        block[:, cols < 0] = np.nan
+        invalid = ~np.isnan(block) & ~(np.isfinite(block) & (block > 0))
+        bad_prices += invalid.sum(axis=0)
+        block[invalid] = np.nan
+        prices[name] = block
+    for name in EVENT_FIELDS:
+        cols, safe = field(name)
+        if cols is not None:
+            data[:, safe[cols >= 0]] = np.nan_to_num(data[:, safe[cols >= 0]], nan=0.0, posinf=0.0, neginf=0.0)
+
+    if "High" in prices and "Low" in prices:
+        # Le plus haut couvre ouverture et clôture, le plus bas aussi
+        bodies = [prices[n] for n in ("Open", "Close") if n in prices]
+        high = np.fmax.reduce(np.stack([prices["High"]] + bodies), axis=0)
+        low = np.fmin.reduce(np.stack([prices["Low"]] + bodies), axis=0)
+        with np.errstate(invalid="ignore"):
+            repaired += ((prices["High"] < high) | (prices["Low"] > low)).sum(axis=0)
+        prices["High"] = np.where(np.isnan(prices["High"]), np.nan, high)
+        prices["Low"] = np.where(np.isnan(prices["Low"]), np.nan, low)
+
+    close = prices["Close"]
+    valid = ~np.isnan(close)
+    rows = len(close)
+
+    # Trous intérieurs : après la première cotation du symbole et avant sa dernière
+    last_seen = _forward_index(valid)
+    next_seen = _forward_index(valid[::-1])[::-1]
+    interior = ~valid & (last_seen >= 0) & (next_seen >= 0)
+    gap_cols, gap_lengths = _runs(interior)
+    max_gap = np.zeros(count, dtype=np.int64)
+    np.maximum.at(max_gap, gap_cols, gap_lengths)
+
+    # Sauts de type split entre deux cotations successives
+    previous = np.vstack([np.full((1, count), -1), last_seen[:-1]])
+    prev_close = np.take_along_axis(close, np.maximum(previous, 0), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jumps = valid & (previous >= 0) & (np.abs(np.log(close / prev_close)) >= np.log(JUMP_RATIO))
+    split_cols, split_safe = field(SPLIT_FIELD)
+    if split_cols is not None:
+        declared = data[:, split_safe] > 0
+        declared[:, split_cols < 0] = False
+        jumps &= ~declared
+    last_jump = np.where(jumps.any(axis=0), rows - 1 - jumps[::-1].argmax(axis=0), -1)
+
+    # Comblement : barre plate à la dernière clôture connue, volume et événements nuls
+    to_fill = interior & (np.arange(rows)[:, None] - last_seen <= fill_limit)
+    filled = to_fill.sum(axis=0)
+    if filled.any():
+        source = np.maximum(last_seen, 0)
+        flat = np.take_along_axis(close, source, axis=0)
+        for name, block in prices.items():
+            reference = np.take_along_axis(block, source, axis=0) if name == "Adj Close" else flat
+            block[to_fill] = reference[to_fill]
+        for name in (VOLUME_FIELD,) + EVENT_FIELDS:
+            cols, safe = field(name)
+            if cols is not None:
+                present = cols >= 0
+                block = data[:, safe]
+                block[to_fill & present] = 0.0
+                data[:, safe[present]] = block[:, present]
+    for name, block in prices.items():
+        cols, safe = field(name)
+        data[:, safe[cols >= 0]] = block[:, cols >= 0]
+
+    index = frame.index
+    reports = {}
+    for i, name in enumerate(symbols):
+        report = {
+            "rows": int(valid[:, i].sum() + filled[i]),
+            "first": index[int(np.argmax(valid[:, i]))].isoformat() if valid[:, i].any() else None,
+            "last": index[int(last_seen[-1, i])].isoformat() if last_seen[-1, i] >= 0 else None,
+            "missing": int(interior[:, i].sum()),
+            "max_gap": int(max_gap[i]),
+            "filled": int(filled[i]),
+            "jumps": int(jumps[:, i].sum()),
+            "last_jump": index[int(last_jump[i])].isoformat() if last_jump[i] >= 0 else None,
+            "bad_prices": int(bad_prices[i]),
+            "repaired": int(repaired[i]),
+            "duplicates": duplicates,
+            "unsorted": unsorted,
+        }
+        report["flags"] = flags(report)
+        reports[name] = report
+
+    keep = ~np.isnan(prices["Close"]).all(axis=1)  # Lignes restées sans aucune clôture
+    result = pd.DataFrame(data[keep] if not keep.all() else data, index=index[keep] if not keep.all() else index,
+                          columns=frame.columns)
+    _record(reports, call)
+    return result
+
+def flags(report: dict) -> list:
+    """Noms des anomalies d'un rapport (liste vide si la série est propre)."""
+    checks = (("empty", report["rows"] == 0), ("gaps", report["missing"] > 0), ("filled", report["filled"] > 0),
+              ("split_like_jump", report["jumps"] > 0), ("bad_prices", report["bad_prices"] > 0),
+              ("repaired_ohlc", report["repaired"] > 0), ("duplicates", report["duplicates"] > 0),
+              ("unsorted", report["unsorted"]))
+    return [name for name, raised in checks if raised]
+
+def _record(reports: dict, call: str):
+    with _reports_lock:
+        for symbol, report in reports.items():
+            if symbol is not None:
+                _reports[symbol] = report
+    for report in reports.values():
+        for flag in report["flags"]:
+            inc("finlit_data_quality_total", call=call, flag=flag)
+
+def quality(symbol: str = None):
+    """Dernier rapport de qualité d'un symbole (None s'il n'a pas encore été chargé), ou tous."""
+    with _reports_lock:
+        return dict(_reports) if symbol is None else _reports.get(symbol)
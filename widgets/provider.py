@@ -0,0 +1,40 @@
+"""Point d'accès unique au fournisseur de données (yfinance), instrumenté.
+
+yfinance (et tout ce qu'il importe) n'est chargé qu'au premier appel réseau :
+un rerun servi entièrement depuis le cache ne le paie jamais. Les historiques
+et téléchargements sortent normalisés (widgets.normalize), avant toute mise en cache.
+"""
+from widgets.metrics import observe_provider
+from widgets.normalize import normalize
+
+HISTORY_FILL_LIMIT = 3  # Barres manquantes comblées au plus dans l'historique d'un symbole
+
+yf = None  # Module yfinance, chargé à la demande par _yf()
+
+def _yf():
+    global yf
+    if yf is None:
+        import yfinance
+        yf = yfinance
+    return yf
+
+def download(symbols, fill_limit: int = 0, **kwargs):
+    """yf.download instrumenté et normalisé (trous laissés tels quels par défaut)."""
+    with observe_provider("download"):
+        data = _yf().download(symbols, **kwargs)
+    return normalize(data, symbols if isinstance(symbols, str) else None, fill_limit, call="download")
+
+def ticker(symbol: str):
+    return _yf().Ticker(symbol)
+
+def history(symbol_or_ticker, fill_limit: int = HISTORY_FILL_LIMIT, **kwargs):
+    """Historique normalisé d'un symbole (ou d'un Ticker déjà créé)."""
+    asset = ticker(symbol_or_ticker) if isinstance(symbol_or_ticker, str) else symbol_or_ticker
+    with observe_provider("history"):
+        data = asset.history(**kwargs)
+    return normalize(data, getattr(asset, "ticker", None), fill_limit, call="history")
+
+def field(asset, name: str):
+    """Lit un attribut paresseux d'un Ticker (info, financials, ...) en mesurant l'appel réseau."""
+    with observe_provider(name):
+        return getattr(asset, name)
@@ -1,13 +1,48 @@
 import streamlit as st
+from widgets.symbol_index import search, is_known, is_comprehensive, normalize
 
-def show_search():
-    """Display a search module for assets."""
-    st.markdown("### Search for an Asset")
-    search_query = st.text_input("Enter a symbol or company name (e.g., AAPL, Google):", "")
-    if search_query:
-        st.query_params["symbol"] = search_query.upper()
+def _goto(symbol):
+    if st.query_params.get("symbol") != symbol:
+        st.query_params["symbol"] = symbol
         st.rerun()
 
+def show_search(key="asset_search"):
+    """Display a search module for assets, backed by the local symbol index."""
+    st.markdown("### Search for an Asset")
+    search_query = st.text_input("Enter a symbol or company name (e.g., AAPL, Google):", "", key=key)
+    if not search_query:
+        return
+    matches = search(search_query)
+    if not matches:
+        st.warning(f"No listed asset matches '{search_query}'.")
+        return
+    if matches[0]["symbol"] == normalize(search_query):
+        _goto(matches[0]["symbol"])
+        return
+    for match in matches:
+        label = f"{match['symbol']} — {match['name']}" + (f" ({match['exchange']})" if match["exchange"] else "")
+        if st.button(label, key=f"{key}_{match['symbol']}", use_container_width=True):
+            _goto(match["symbol"])
+
+def require_known_symbol(symbol):
+    """Stop the page (with suggestions) before any data request for an unknown symbol.
+
+    With a partial master file, an unlisted symbol is only flagged and the page goes on.
+    """
+    if is_known(symbol):
+        return
+    strict = is_comprehensive()
+    if strict:
+        st.error(f"Unknown symbol '{symbol}'.")
+    else:
+        st.warning(f"'{symbol}' is not in the local symbol list; loading it from the data provider.")
+    suggestions = search(symbol, limit=5)
+    if suggestions:
+        st.markdown("Did you mean: " + ", ".join(
+            f"[{s['symbol']}](/asset?symbol={s['symbol']}) ({s['name']})" for s in suggestions))
+    if strict:
+        st.stop()
+
 if __name__ == "__main__":
     st.set_page_config(layout="wide")
-    show_search()
\ No newline at end of file
+    show_search()
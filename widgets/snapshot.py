@@ -0,0 +1,209 @@
+"""Persistance des données chaudes sur disque et démarrage à chaud.
+
+Les fetchers décorés par @persisted enregistrent leurs résultats dans un magasin
+de processus, sauvegardé périodiquement (et à l'arrêt) dans un snapshot versionné.
+Au démarrage, le snapshot est rechargé : tant qu'une entrée est plus jeune que le
+TTL de son cache, le fetcher la renvoie sans appel réseau.
+
+Le magasin est borné : au plus MAX_ENTRIES entrées hors jeu chaud (les moins
+récemment servies sont évincées), les entrées expirées sont écartées au chargement et à la
+sauvegarde, et seul le jeu chaud (hot_datasets()) est écrit sur disque. Un
+`?symbol=` quelconque ne fait donc grossir ni la mémoire ni le snapshot.
+"""
+import os
+import time
+import atexit
+import pickle
+import logging
+import threading
+import functools
+from collections import OrderedDict
+from pathlib import Path
+
+import streamlit as st
+
+logger = logging.getLogger("finlit")
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PATH_ENV = "FINLIT_SNAPSHOT_PATH"
+DEFAULT_SNAPSHOT_PATH = Path(".cache") / "finlit_snapshot.pkl"
+AUTOSAVE_INTERVAL = 300  # secondes
+MAX_ENTRIES = int(os.environ.get("FINLIT_SNAPSHOT_MAX_ENTRIES", 128))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # (nom, args, kwargs) -> (horodatage, valeur), du moins au plus récemment servi
+_ttls = {}  # nom -> TTL déclaré par @persisted
+_hot = None  # Clés de hot_datasets(), calculées au premier besoin
+_dirty = False
+
+def snapshot_path() -> Path:
+    return Path(os.environ.get(SNAPSHOT_PATH_ENV, DEFAULT_SNAPSHOT_PATH))
+
+def _fresh(key: tuple, entry: tuple, now: float) -> bool:
+    ttl = _ttls.get(key[0])
+    return ttl is not None and now - entry[0] < ttl
+
+def _evict(hot: set):
+    """Retire les entrées hors jeu chaud les moins récemment servies au-delà de MAX_ENTRIES (verrou tenu)."""
+    cold = [k for k in _entries if k not in hot]
+    for key in cold[:max(0, len(cold) - MAX_ENTRIES)]:
+        del _entries[key]
+
+def remember(key: tuple, value):
+    global _dirty
+    hot = _hot_keys()
+    with _lock:
+        _entries[key] = (time.time(), value)
+        _entries.move_to_end(key)
+        _evict(hot)
+        _dirty = True
+
+def restore(key: tuple, ttl: float):
+    """Valeur restaurée si elle a moins de `ttl` secondes, sinon None."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] >= ttl:
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+    return entry[1]
+
+def clear():
+    """Oublie toutes les entrées en mémoire (le fichier sur disque n'est pas touché)."""
+    global _dirty
+    with _lock:
+        _entries.clear()
+        _dirty = False
+
+def _is_empty(value) -> bool:
+    if value is None:
+        return True
+    empty = getattr(value, "empty", None)
+    if isinstance(empty, bool):
+        return empty
+    return isinstance(value, (dict, list)) and not value
+
+def persisted(name: str, ttl: float):
+    """Sert la fonction depuis le snapshot tant qu'il est frais ; enregistre chaque résultat non vide."""
+    _ttls[name] = ttl
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            value = restore(key, ttl)
+            if value is not None:
+                return value
+            value = func(*args, **kwargs)
+            if not _is_empty(value):
+                remember(key, value)
+            return value
+        wrapper.persisted_name = name  # Recopié par functools.wraps dans les décorateurs extérieurs
+        return wrapper
+    return decorator
+
+def _hot_keys() -> set:
+    """Clés du magasin correspondant aux appels de hot_datasets() (jamais évincées, seules sauvegardées)."""
+    global _hot
+    if _hot is None:
+        _hot = {(func.persisted_name, args, ()) for _, func, args in hot_datasets()
+                if getattr(func, "persisted_name", None)}
+    return _hot
+
+def save(path: Path = None) -> bool:
+    """Écrit le snapshot de façon atomique ; ne fait rien si rien n'a changé."""
+    global _dirty
+    path = path or snapshot_path()
+    hot, now = _hot_keys(), time.time()
+    with _lock:
+        if not _dirty:
+            return False
+        for key in [k for k, entry in _entries.items() if not _fresh(k, entry, now)]:
+            del _entries[key]
+        entries = {k: entry for k, entry in _entries.items() if k in hot}
+        payload = {"version": SNAPSHOT_VERSION, "created": now, "entries": entries}
+        _dirty = False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return True
+
+def load(path: Path = None) -> int:
+    """Charge le snapshot (si présent et de la bonne version) ; renvoie le nombre d'entrées restaurées."""
+    path = path or snapshot_path()
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.warning("Ignoring unreadable snapshot %s: %s", path, e)
+        return 0
+    if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_VERSION:
+        logger.warning("Ignoring snapshot %s with incompatible version", path)
+        return 0
+    hot, restored, now = _hot_keys(), 0, time.time()  # Importe les fetchers chauds : leurs TTL sont connus
+    with _lock:
+        for key, entry in payload["entries"].items():
+            if _fresh(key, entry, now) and (key not in _entries or _entries[key][0] < entry[0]):
+                _entries[key] = entry
+                restored += 1
+        _evict(hot)
+    return restored
+
+def _background_loop(interval: float):
+    """Complète les données manquantes ou expirées, puis sauvegarde périodiquement."""
+    try:
+        warm_up(prefetch=True, reload=False)
+    except Exception as e:
+        logger.warning("Background warm-up failed: %s", e)
+    while True:
+        time.sleep(interval)
+        try:
+            save()
+        except Exception as e:
+            logger.warning("Snapshot autosave failed: %s", e)
+
+def hot_datasets() -> list:
+    """Appels (libellé, fonction, args) qui alimentent la page d'accueil et les actifs populaires."""
+    from widgets.indices import MARCHES, get_indices_data
+    from widgets.trending import MARKETS, fetch_market_data
+    from widgets.fear import get_market_data, INDEX_SYMBOL, VIX_SYMBOL
+    from widgets.asset_data import get_asset_data, fetch_history, POPULAR_SYMBOLS
+
+    calls = [(f"indices:{m}", get_indices_data, (m,)) for m in MARCHES]
+    calls += [(f"trending:{m}", fetch_market_data, (m,)) for m in MARKETS]
+    calls += [("fear:index", get_market_data, (INDEX_SYMBOL, "1y", "1d")),
+              ("fear:vix", get_market_data, (VIX_SYMBOL, "50d", "1d"))]
+    calls += [(f"asset:{s}", get_asset_data, (s,)) for s in POPULAR_SYMBOLS]
+    calls += [(f"history:{s}", fetch_history, (s,)) for s in POPULAR_SYMBOLS]
+    return calls
+
+def warm_up(prefetch: bool = True, reload: bool = True) -> dict:
+    """Restaure le snapshot puis (optionnellement) récupère ce qui manque ou a expiré."""
+    restored = load() if reload else 0
+    fetched, failed = [], []
+    if prefetch:
+        for label, func, args in hot_datasets():
+            try:
+                func(*args)  # Servi depuis le snapshot si frais, sinon récupéré et mémorisé
+                fetched.append(label)
+            except Exception as e:
+                logger.warning("Warm-up of %s failed: %s", label, e)
+                failed.append(label)
+        save()
+    return {"restored": restored, "warmed": fetched, "failed": failed}
+
+@st.cache_resource(show_spinner=False)
+def start(interval: float = AUTOSAVE_INTERVAL):
+    """Une fois par processus : restaure le snapshot (synchrone, avant le premier rendu),
+    puis complète les données en arrière-plan et sauvegarde périodiquement et à l'arrêt."""
+    restored = load()
+    threading.Thread(target=_background_loop, args=(interval,), name="finlit-snapshot", daemon=True).start()
+    atexit.register(save)
+    logger.info("Restored %d cached entries from %s", restored, snapshot_path())
+    return restored
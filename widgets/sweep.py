@@ -0,0 +1,207 @@
+"""Balayage parallèle des paramètres d'indicateurs sur un univers de symboles.
+
+Les séries OHLCV sont copiées une seule fois dans un segment de mémoire partagée ;
+chaque worker s'y attache à son démarrage au lieu de recevoir les données picklées
+à chaque tâche. Seules les combinaisons de paramètres et les scores transitent.
+"""
+import os
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from widgets.indicators import calculate_technical, resolve_params
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+TRADING_DAYS = 252
+
+# Données attachées dans chaque worker (remplies par _init_worker)
+_WORKER_STATE = {}
+
+def build_grid(space: dict) -> list:
+    """Produit cartésien d'un espace {paramètre: [valeurs]} en liste de dicts."""
+    resolve_params({name: None for name in space})  # Valide les noms
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+class SharedOHLCV:
+    """Historiques OHLCV de plusieurs symboles empilés dans deux segments partagés."""
+
+    def __init__(self, histories: dict):
+        self.symbols = [s for s, df in histories.items() if df is not None and not df.empty]
+        lengths = [len(histories[s]) for s in self.symbols]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        total = int(self.offsets[-1])
+        if total == 0:
+            raise ValueError("No price history to share.")
+
+        segments = []
+        try:
+            self._values = shared_memory.SharedMemory(create=True, size=total * len(OHLCV_COLUMNS) * 8)
+            segments.append(self._values)
+            self._index = shared_memory.SharedMemory(create=True, size=total * 8)
+            segments.append(self._index)
+            values = np.ndarray((total, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=self._values.buf)
+            index = np.ndarray((total,), dtype=np.int64, buffer=self._index.buf)
+            for symbol, start, end in zip(self.symbols, self.offsets[:-1], self.offsets[1:]):
+                df = histories[symbol]
+                values[start:end] = df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+                index[start:end] = pd.DatetimeIndex(df.index).tz_localize(None).as_unit("ns").asi8
+            del values, index  # Ne pas garder de vue exportée sur le buffer avant close()
+        except BaseException:
+            # Segments déjà créés : sans unlink, ils survivraient au processus
+            values = index = None
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+            raise
+
+    @property
+    def spec(self) -> dict:
+        """Description picklable permettant à un worker de s'attacher aux segments."""
+        return {
+            "values": self._values.name,
+            "index": self._index.name,
+            "symbols": self.symbols,
+            "offsets": self.offsets.tolist(),
+        }
+
+    def close(self):
+        for shm in (self._values, self._index):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(spec: dict):
+    """S'attache aux segments partagés et renvoie (handles, {symbole: DataFrame en vue})."""
+    values_shm = shared_memory.SharedMemory(name=spec["values"])
+    index_shm = shared_memory.SharedMemory(name=spec["index"])
+    offsets = spec["offsets"]
+    total = offsets[-1]
+    values = np.ndarray((total, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=values_shm.buf)
+    index = np.ndarray((total,), dtype=np.int64, buffer=index_shm.buf)
+    frames = {}
+    for symbol, start, end in zip(spec["symbols"], offsets[:-1], offsets[1:]):
+        frames[symbol] = pd.DataFrame(
+            values[start:end], columns=OHLCV_COLUMNS,
+            index=pd.DatetimeIndex(index[start:end].view("datetime64[ns]")), copy=False
+        )
+    return (values_shm, index_shm), frames
+
+def score_strategy(df: pd.DataFrame) -> dict:
+    """Score par défaut : long quand MACD > signal et RSI sous 70, sorti sur BB_Upper."""
+    close = df["Close"].to_numpy()
+    signal = (df["MACD"] > df["MACD_Signal"]) & (df["RSI"] < 70) & (df["Close"] < df["BB_Upper"])
+    position = np.roll(signal.to_numpy(dtype=float), 1)
+    position[0] = 0.0
+    returns = np.zeros_like(close)
+    returns[1:] = close[1:] / close[:-1] - 1
+    strat = np.nan_to_num(position * returns)
+
+    equity = np.cumprod(1 + strat)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    std = strat.std()
+    return {
+        "total_return": equity[-1] - 1 if len(equity) else 0.0,
+        "sharpe": strat.mean() / std * np.sqrt(TRADING_DAYS) if std > 0 else 0.0,
+        "max_drawdown": drawdown.min() if len(drawdown) else 0.0,
+        "trades": int(np.count_nonzero(np.diff(position) > 0)),
+    }
+
+def _init_worker(spec: dict, scorer):
+    handles, frames = attach(spec)
+    _WORKER_STATE.update(handles=handles, frames=frames, scorer=scorer)
+
+def _evaluate_chunk(chunk: list) -> list:
+    """Évalue une tranche de combinaisons sur tous les symboles partagés."""
+    frames, scorer = _WORKER_STATE["frames"], _WORKER_STATE["scorer"]
+    rows = []
+    for combo_id, params in chunk:
+        for symbol, df in frames.items():
+            try:
+                metrics = scorer(calculate_technical(df, params))
+            except Exception as e:
+                metrics = {"error": str(e)}
+            rows.append({"combo": combo_id, "symbol": symbol, **params, **metrics})
+    return rows
+
+def run_sweep(histories: dict, grid, scorer=score_strategy, workers: int = None,
+              chunk_size: int = None, progress=None, cancel: threading.Event = None) -> pd.DataFrame:
+    """Évalue chaque combinaison de `grid` sur chaque symbole de `histories`, sur tous les cœurs.
+
+    `grid` est une liste de dicts de paramètres (ou un espace passé à build_grid).
+    `progress(done, total)` est appelé après chaque tranche terminée ; si `cancel` est
+    positionné, les tranches en attente sont abandonnées et les résultats partiels renvoyés.
+    """
+    if isinstance(grid, dict):
+        grid = build_grid(grid)
+    for params in grid:
+        resolve_params(params)
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # Quelques tranches par worker : équilibrage de charge sans trop de transferts
+        chunk_size = max(1, len(grid) // (workers * 4))
+    items = list(enumerate(grid))
+    tasks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    rows, done = [], 0
+    with SharedOHLCV(histories) as shared, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(shared.spec, scorer)
+    ) as pool:
+        pending, queue = {}, iter(tasks)
+        max_in_flight = workers * 2  # Borne les tâches soumises pour une annulation rapide
+        while True:
+            while len(pending) < max_in_flight and not (cancel and cancel.is_set()):
+                chunk = next(queue, None)
+                if chunk is None:
+                    break
+                pending[pool.submit(_evaluate_chunk, chunk)] = len(chunk)
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done += pending.pop(future)
+                rows.extend(future.result())
+            if progress:
+                progress(done, len(grid))
+            if cancel and cancel.is_set():
+                for future in pending:
+                    future.cancel()
+                break
+
+    return pd.DataFrame(rows)
+
+def summarize(results: pd.DataFrame, metric: str = "sharpe") -> pd.DataFrame:
+    """Agrège les résultats par combinaison (moyenne sur l'univers), meilleure en premier."""
+    if results.empty:
+        return results
+    param_cols = [c for c in results.columns if c in resolve_params()]
+    summary = results.groupby("combo").agg({**{c: "first" for c in param_cols}, metric: ["mean", "median", "min"]})
+    summary.columns = param_cols + [f"{metric}_mean", f"{metric}_median", f"{metric}_min"]
+    return summary.sort_values(f"{metric}_mean", ascending=False)
+
+if __name__ == "__main__":
+    import sys
+    import yfinance as yf
+
+    symbols = sys.argv[1:] or ["AAPL", "MSFT", "NVDA", "AMZN"]
+    histories = {s: yf.Ticker(s).history(period="5y", interval="1d") for s in symbols}
+    space = {
+        "rsi_window": [7, 14, 21],
+        "macd_fast": [8, 12, 16],
+        "macd_slow": [21, 26, 35],
+        "macd_signal": [5, 9, 12],
+        "bb_window": [10, 20, 30],
+        "bb_std": [1.5, 2.0, 2.5],
+    }
+    results = run_sweep(histories, space, progress=lambda done, total: print(f"\r{done}/{total}", end=""))
+    print()
+    print(summarize(results).head(10).to_string())
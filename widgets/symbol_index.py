@@ -0,0 +1,204 @@
+"""Index de recherche des symboles, construit une fois par processus.
+
+Le fichier maître (symbol,name,exchange,sector) est chargé dans des tableaux
+compacts :
+- clés de symboles triées (octets majuscules) : recherche par préfixe en O(log n)
+  par np.searchsorted, l'équivalent à plat d'un trie ;
+- mots des noms triés avec leur ligne : préfixe sur chaque mot (« gold sach ») ;
+- trigrammes en CSR (clés triées, offsets, lignes) : correspondance approchée
+  pour les fautes de frappe (« nvidai », « gogle »).
+Une requête ne fait que quelques recherches dichotomiques et un bincount ; aucune
+structure Python n'est parcourue ligne à ligne.
+"""
+import os
+import re
+import csv
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import streamlit as st
+
+SYMBOLS_PATH_ENV = "FINLIT_SYMBOLS_PATH"
+DEFAULT_SYMBOLS_PATH = Path(__file__).resolve().parent.parent / "data" / "symbols.csv"
+FUZZY_THRESHOLD = 0.45  # Part minimale des trigrammes de la requête retrouvés dans la ligne
+# En dessous, le fichier maître n'est qu'un échantillon (fichier livré, tools.build_symbols pas encore
+# lancé) : un symbole absent n'est pas refusé, seulement signalé
+COMPREHENSIVE_ROWS = 5000
+
+_WORD = re.compile(r"[A-Z0-9]+")
+
+def normalize(text: str) -> str:
+    """Majuscules ASCII sans accents (« Moët » -> « MOET »)."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return text.upper().strip()
+
+def _trigrams(text: str) -> np.ndarray:
+    """Trigrammes (entiers 24 bits) du texte normalisé, bordé d'espaces."""
+    data = np.frombuffer(f"  {text} ".encode("ascii"), dtype=np.uint8).astype(np.int32)
+    return np.unique((data[:-2] << 16) | (data[1:-1] << 8) | data[2:])
+
+def _trigram_postings(texts: list) -> tuple:
+    """CSR (clés, offsets, lignes) des trigrammes distincts de chaque texte, calculé en bloc."""
+    padded = [f"  {t} ".encode("ascii") for t in texts]
+    lengths = np.array([len(b) for b in padded], dtype=np.int64)
+    data = np.frombuffer(b"".join(padded), dtype=np.uint8).astype(np.int64)
+    grams = (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)[:-2]
+    # Un trigramme ne doit pas chevaucher deux textes
+    ends = np.cumsum(lengths)
+    straddling = np.concatenate([ends - 2, ends - 1])
+    valid = np.ones(len(grams), dtype=bool)
+    valid[straddling[straddling < len(grams)]] = False
+    pairs = np.sort((grams[valid] << 32) | rows[valid])
+    pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]  # Paires (trigramme, ligne) distinctes
+    grams, rows = (pairs >> 32).astype(np.int32), (pairs & 0xFFFFFFFF).astype(np.int32)
+    starts = np.flatnonzero(np.concatenate([[True], grams[1:] != grams[:-1]]))
+    keys = grams[starts]
+    counts = np.bincount(rows, minlength=len(texts)).astype(np.int16)
+    return keys, np.append(starts, len(grams)).astype(np.int64), rows, counts
+
+def _prefix_range(keys: np.ndarray, prefix: bytes) -> tuple:
+    """Bornes [lo, hi) des clés triées commençant par `prefix`.
+
+    Les aiguilles sont converties au dtype des clés : comparer à un scalaire plus
+    long ferait convertir tout le tableau par NumPy à chaque appel.
+    """
+    size = keys.dtype.itemsize
+    if len(prefix) > size:
+        return 0, 0
+    needles = np.array([prefix, prefix + b"\xff" if len(prefix) < size else prefix], dtype=keys.dtype)
+    lo, hi = np.searchsorted(keys, needles, side="left")
+    if len(prefix) == size:
+        hi = np.searchsorted(keys, needles[1], side="right")
+    return int(lo), int(hi)
+
+class SymbolIndex:
+    """Symboles triés et index de recherche ; les lignes sont repérées par leur rang."""
+
+    def __init__(self, rows: list):
+        rows = sorted({normalize(r["symbol"]): r for r in rows if r.get("symbol")}.items())
+        self.symbols = [r["symbol"].strip().upper() for _, r in rows]
+        self.names = [(r.get("name") or "").strip() for _, r in rows]
+        self.exchanges = [(r.get("exchange") or "").strip() for _, r in rows]
+        self.sectors = [(r.get("sector") or "").strip() for _, r in rows]
+        keys = [key for key, _ in rows]
+        self.keys = np.array([k.encode() for k in keys], dtype=bytes)
+        self.key_lengths = np.array([len(k) for k in keys], dtype=np.int16)
+
+        normalized_names = [normalize(n) for n in self.names]
+        name_lengths = np.array([len(n) for n in normalized_names], dtype=np.int16)
+        # Rang = ordre des noms les plus courts (les plus spécifiques) : les lignes d'un mot
+        # sont stockées par rang, le premier rang retenu est donc le meilleur candidat
+        self.rank_rows = np.argsort(name_lengths, kind="stable").astype(np.int32)
+        row_ranks = np.empty(len(keys), dtype=np.int32)
+        row_ranks[self.rank_rows] = np.arange(len(keys), dtype=np.int32)
+        words, word_ranks = [], []
+        for i, name in enumerate(normalized_names):
+            for word in set(_WORD.findall(name)):
+                words.append(word.encode())
+                word_ranks.append(row_ranks[i])
+        words = np.array(words, dtype=bytes) if words else np.empty(0, dtype="S1")
+        order = np.argsort(words, kind="stable")
+        self.words = words[order]
+        self.word_ranks = np.array(word_ranks, dtype=np.int32)[order]
+
+        (self.gram_keys, self.gram_offsets,
+         self.gram_rows, self.gram_counts) = _trigram_postings([f"{k} {n}" for k, n in zip(keys, normalized_names)])
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "SymbolIndex":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def find(self, symbol: str):
+        """Rang du symbole exact, ou None."""
+        key = normalize(symbol).encode()
+        lo, hi = _prefix_range(self.keys, key)
+        return lo if hi > lo and self.keys[lo] == key else None
+
+    def _word_matches(self, tokens: list, limit: int) -> np.ndarray:
+        """Lignes dont le nom contient, pour chaque jeton, un mot qui commence par ce jeton
+        (noms les plus courts d'abord)."""
+        matches = np.ones(len(self.symbols), dtype=bool)
+        for token in tokens:
+            lo, hi = _prefix_range(self.words, token.encode())
+            found = np.zeros(len(self.symbols), dtype=bool)
+            found[self.word_ranks[lo:hi]] = True
+            matches &= found
+        return self.rank_rows[np.flatnonzero(matches)[:limit]]
+
+    def _fuzzy(self, query: str, exclude: set, limit: int) -> list:
+        grams = _trigrams(query)
+        positions = np.searchsorted(self.gram_keys, grams)
+        found = positions < len(self.gram_keys)
+        found[found] = self.gram_keys[positions[found]] == grams[found]
+        positions = positions[found]
+        if not len(positions):
+            return []
+        rows = np.concatenate([self.gram_rows[self.gram_offsets[p]:self.gram_offsets[p + 1]] for p in positions])
+        shared = np.bincount(rows, minlength=len(self.symbols))
+        candidates = np.flatnonzero(shared >= FUZZY_THRESHOLD * len(grams))
+        # Meilleure couverture de la requête d'abord, puis les libellés les plus courts
+        score = shared[candidates].astype(np.int64) * 1024 - np.minimum(self.gram_counts[candidates], 1023)
+        k = min(len(candidates), limit + len(exclude))
+        if not k:
+            return []
+        top = np.argpartition(-score, k - 1)[:k]
+        top = candidates[top[np.argsort(-score[top], kind="stable")]]
+        return [int(i) for i in top if int(i) not in exclude][:limit]
+
+    def search(self, query: str, limit: int = 8) -> list:
+        """Meilleures correspondances : symbole exact, préfixe de symbole, mots du nom, puis approché."""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        ranked, seen = [], set()
+
+        def take(rows):
+            for i in rows:
+                i = int(i)
+                if i not in seen and len(ranked) < limit:
+                    seen.add(i)
+                    ranked.append(i)
+
+        exact = self.find(query)
+        if exact is not None:
+            take([exact])
+        lo, hi = _prefix_range(self.keys, query.encode())
+        if hi > lo:
+            take(lo + np.argsort(self.key_lengths[lo:hi], kind="stable")[:limit + 1])
+        tokens = _WORD.findall(query)
+        if tokens and len(ranked) < limit:
+            take(self._word_matches(tokens, limit))
+        if len(ranked) < limit:
+            take(self._fuzzy(query, seen, limit - len(ranked)))
+        return [self.entry(i) for i in ranked]
+
+    def entry(self, i: int) -> dict:
+        return {"symbol": self.symbols[i], "name": self.names[i],
+                "exchange": self.exchanges[i], "sector": self.sectors[i]}
+
+def symbols_path() -> Path:
+    return Path(os.environ.get(SYMBOLS_PATH_ENV, DEFAULT_SYMBOLS_PATH))
+
+@st.cache_resource(show_spinner=False)
+def load_index() -> SymbolIndex:
+    """Index partagé par toutes les sessions ; vide si le fichier maître est absent."""
+    path = symbols_path()
+    return SymbolIndex.from_csv(path) if path.exists() else SymbolIndex([])
+
+def search(query: str, limit: int = 8) -> list:
+    return load_index().search(query, limit)
+
+def is_comprehensive() -> bool:
+    """Vrai si le fichier maître est assez complet pour refuser un symbole qui n'y figure pas."""
+    return len(load_index()) >= COMPREHENSIVE_ROWS
+
+def is_known(symbol: str) -> bool:
+    """Vrai si le symbole figure dans le fichier maître (ou si aucun fichier n'est installé)."""
+    index = load_index()
+    return not len(index) or index.find(symbol) is not None
@@ -1,6 +1,10 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
+from widgets import provider
+from widgets.metrics import instrumented_cache, timed
+from widgets.mmap_store import mapped
+from widgets.indices import prefetch, select_market
+from widgets.normalize import last_two_valid
 
 # Liste statique de symboles par marché avec noms et secteurs
 MARKETS = {
@@ -40,15 +44,23 @@ MARKETS = {
     ]
 }
 
-@st.cache_data(ttl=1800)
+@instrumented_cache("trending", resource=True, ttl=1800)
 def fetch_market_data(market: str):
+    """Données d'un marché, avec les cotations de chaque symbole calculées une fois ("quotes")."""
+    data = download_market_data(market)
+    if isinstance(data, dict) and data:
+        data = {**data, "quotes": latest_quotes(data)}
+    return data
+
+@mapped("trending", ttl=1800)
+def download_market_data(market: str):
     """Récupère les données (Close et Volume) pour tous les symboles d’un marché."""
     assets = MARKETS.get(market, [])
     if not assets:
         return pd.DataFrame()
     symbols = [asset["symbol"] for asset in assets]
     try:
-        data = yf.download(symbols, period="7d", interval="1d", progress=False)
+        data = provider.download(symbols, period="7d", interval="1d", progress=False)
         if data.empty or data["Close"].isna().all().all():
             st.warning(f"No data returned for {market}.")
             return pd.DataFrame()
@@ -57,135 +69,126 @@ def fetch_market_data(market: str):
         st.error(f"Erreur récupération données {market}: {str(e)}")
         return pd.DataFrame()
 
-def calculate_performance(market_data, symbol):
-    """Calcule la performance journalière pour un symbole."""
+def latest_quotes(market_data) -> dict:
+    """Symbole -> (dernière clôture, précédente, volume de la dernière séance), en une passe sur le tableau.
+
+    Les données de fetch_market_data les portent déjà (calculées une fois par rafraîchissement).
+    """
+    if "quotes" in market_data:
+        return market_data["quotes"]
     close_data = market_data.get("Close", pd.DataFrame())
     volume_data = market_data.get("Volume", pd.DataFrame())
-    if symbol not in close_data.columns or len(close_data[symbol].dropna()) < 2:
-        return None, None, None, None
-    yesterday = close_data[symbol].iloc[-2]
-    today = close_data[symbol].iloc[-1]
-    volume = volume_data[symbol].iloc[-1] if symbol in volume_data.columns else None
-    if pd.isna(yesterday) or pd.isna(today):
+    if not len(close_data.columns):
+        return {}
+    closes = close_data.to_numpy(dtype=float)
+    last, prev = last_two_valid(closes)
+    volumes = volume_data.reindex(columns=close_data.columns).to_numpy(dtype=float)
+    quotes = {}
+    for i, symbol in enumerate(close_data.columns):
+        if prev[i] >= 0:
+            quotes[symbol] = (closes[last[i], i], closes[prev[i], i],
+                              volumes[last[i], i] if symbol in volume_data.columns else None)
+    return quotes
+
+def calculate_performance(market_data, symbol):
+    """Calcule la performance journalière pour un symbole."""
+    quotes = latest_quotes(market_data)
+    if symbol not in quotes:
         return None, None, None, None
+    today, yesterday, volume = quotes[symbol]
     change_percent = ((today - yesterday) / yesterday) * 100
     amount_change = today - yesterday
     return change_percent, amount_change, today, volume
 
-def show_trending():
-    """Affiche les top gainers et losers par marché avec des cartes cliquables."""
-    st.subheader("Trending Stocks")
-
-    # Onglets pour chaque marché
-    tab_names = list(MARKETS.keys())
-    tabs = st.tabs(tab_names)
-
-    # Couleurs par défaut de Streamlit
-    positive_color = "#34C759"  # Vert
-    negative_color = "#FF4B4B"  # Rouge (primaryColor)
+def rank_performances(market_data, assets):
+    """Calcule les performances d'une liste d'actifs et les trie de la meilleure à la pire."""
+    market_data = {**market_data, "quotes": latest_quotes(market_data)}  # Une passe, pas une par actif
+    performances = []
+    for asset in assets:
+        change, amount, price, volume = calculate_performance(market_data, asset["symbol"])
+        if change is not None:
+            performances.append({
+                "symbol": asset["symbol"],
+                "name": asset["name"],
+                "sector": asset["sector"],
+                "change": change,
+                "amount_change": amount,
+                "price": price,
+                "volume": volume
+            })
+    return sorted(performances, key=lambda x: x["change"], reverse=True)
 
-    for i, tab in enumerate(tabs):
-        with tab:
-            market = tab_names[i]
-            market_data = fetch_market_data(market)
-            
-            if not isinstance(market_data, dict) or not market_data:
-                st.write(f"No data available for {market}")
-                continue
+# Couleurs par défaut de Streamlit
+POSITIVE_COLOR = "#34C759"  # Vert
+NEGATIVE_COLOR = "#FF4B4B"  # Rouge (primaryColor)
 
-            # Calcul des performances
-            performances = []
-            for asset in MARKETS[market]:
-                change, amount, price, volume = calculate_performance(market_data, asset["symbol"])
-                if change is not None:
-                    performances.append({
-                        "symbol": asset["symbol"],
-                        "name": asset["name"],
-                        "sector": asset["sector"],
-                        "change": change,
-                        "amount_change": amount,
-                        "price": price,
-                        "volume": volume
-                    })
+def asset_card_html(asset: dict) -> str:
+    """Carte cliquable d'un actif classé (variation, montant, volume, secteur)."""
+    background_color = POSITIVE_COLOR if asset['change'] >= 0 else NEGATIVE_COLOR
+    return f"""
+        <a href='/asset?symbol={asset['symbol']}' style='text-decoration: none; color: inherit;'>
+            <div class='asset-card' style='border-radius: 10px; background: #FFFFFF; cursor: pointer;'>
+                <div style='background-color: {background_color}; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
+                    {asset['symbol']}
+                </div>
+                <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
+                    <div style='font-size: 0.9rem; font-weight: 500;'>{asset['name']}</div>
+                    <div style='display: flex; justify-content: space-between; align-items: center;'>
+                        <div>
+                            <div style='color: {background_color}; font-size: 0.9rem;'>
+                                {'▲' if asset['change'] >= 0 else '▼'} {abs(asset['change']):.2f}%
+                            </div>
+                            <div style='color: #898fa3; font-size: 0.8rem;'>{asset['amount_change']:+.2f}$</div>
+                            <div style='color: #898fa3; font-size: 0.8rem;'>({asset['volume']:,} vol)</div>
+                        </div>
+                        <div style='font-size: 1rem; font-weight: bold;'>{asset['price']:,.2f}$</div>
+                    </div>
+                    <div style='background-color: #e6e6e6; color: #666; padding: 0.2rem 0.5rem; border-radius: 5px; font-size: 0.8rem; text-align: center; margin-top: 0.2rem;'>
+                        {asset['sector']}
+                    </div>
+                </div>
+            </div>
+        </a>
+        """
 
-            if not performances:
-                st.write("No performance data available")
-                continue
+def trending_cards(market: str, market_data) -> tuple:
+    """(cartes des 2 meilleurs, cartes des 2 pires, None), ou ((), (), message) faute de données."""
+    if not isinstance(market_data, dict) or not market_data:
+        return (), (), f"No data available for {market}"
+    sorted_perf = rank_performances(market_data, MARKETS[market])
+    if not sorted_perf:
+        return (), (), "No performance data available"
+    gainers = tuple(asset_card_html(asset) for asset in sorted_perf[:2])
+    losers = tuple(asset_card_html(asset) for asset in sorted_perf[-2:][::-1])
+    return gainers, losers, None
 
-            # Tri pour top gainers et losers
-            sorted_perf = sorted(performances, key=lambda x: x["change"], reverse=True)
-            top_gainers = sorted_perf[:2]
-            top_losers = sorted_perf[-2:][::-1]
+def render_trending(gainers: tuple, losers: tuple, message: str = None):
+    if message:
+        st.write(message)
+        return
+    # Affichage dans un container
+    with st.container():
+        for title, cards in (("**Top Gainers**", gainers), ("**Top Losers**", losers)):
+            st.write(title)
+            cols = st.columns(2)
+            for idx, card in enumerate(cards):
+                with cols[idx]:
+                    st.markdown(card, unsafe_allow_html=True)
 
-            # Affichage dans un container
-            with st.container():
-                st.write("**Top Gainers**")
-                cols = st.columns(2)
-                for idx, asset in enumerate(top_gainers):
-                    with cols[idx]:
-                        background_color = positive_color if asset['change'] >= 0 else negative_color
-                        st.markdown(
-                            f"""
-                            <a href='/asset?symbol={asset['symbol']}' style='text-decoration: none; color: inherit;'>
-                                <div class='asset-card' style='border-radius: 10px; background: #FFFFFF; cursor: pointer;'>
-                                    <div style='background-color: {background_color}; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
-                                        {asset['symbol']}
-                                    </div>
-                                    <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
-                                        <div style='font-size: 0.9rem; font-weight: 500;'>{asset['name']}</div>
-                                        <div style='display: flex; justify-content: space-between; align-items: center;'>
-                                            <div>
-                                                <div style='color: {positive_color if asset['change'] >= 0 else negative_color}; font-size: 0.9rem;'>
-                                                    {'▲' if asset['change'] >= 0 else '▼'} {abs(asset['change']):.2f}%
-                                                </div>
-                                                <div style='color: #898fa3; font-size: 0.8rem;'>{asset['amount_change']:+.2f}$</div>
-                                                <div style='color: #898fa3; font-size: 0.8rem;'>({asset['volume']:,} vol)</div>
-                                            </div>
-                                            <div style='font-size: 1rem; font-weight: bold;'>{asset['price']:,.2f}$</div>
-                                        </div>
-                                        <div style='background-color: #e6e6e6; color: #666; padding: 0.2rem 0.5rem; border-radius: 5px; font-size: 0.8rem; text-align: center; margin-top: 0.2rem;'>
-                                            {asset['sector']}
-                                        </div>
-                                    </div>
-                                </div>
-                            </a>
-                            """,
-                            unsafe_allow_html=True
-                        )
+@timed("show_trending")
+def show_trending(dashboard=None):
+    """Affiche les top gainers et losers du marché sélectionné avec des cartes cliquables ;
+    avec `dashboard`, depuis l'instantané matérialisé (widgets.dashboard)."""
+    st.subheader("Trending Stocks")
 
-                st.write("**Top Losers**")
-                cols = st.columns(2)
-                for idx, asset in enumerate(top_losers):
-                    with cols[idx]:
-                        background_color = positive_color if asset['change'] >= 0 else negative_color
-                        st.markdown(
-                            f"""
-                            <a href='/asset?symbol={asset['symbol']}' style='text-decoration: none; color: inherit;'>
-                                <div class='asset-card' style='border-radius: 10px; background: #FFFFFF; cursor: pointer;'>
-                                    <div style='background-color: {background_color}; color: white; padding: 0.5rem; text-align: center; font-weight: 600; font-size: 1.1rem; border-radius: 10px 10px 0 0;'>
-                                        {asset['symbol']}
-                                    </div>
-                                    <div style='padding: 0.5rem; display: flex; flex-direction: column; gap: 0.2rem;'>
-                                        <div style='font-size: 0.9rem; font-weight: 500;'>{asset['name']}</div>
-                                        <div style='display: flex; justify-content: space-between; align-items: center;'>
-                                            <div>
-                                                <div style='color: {positive_color if asset['change'] >= 0 else negative_color}; font-size: 0.9rem;'>
-                                                    {'▲' if asset['change'] >= 0 else '▼'} {abs(asset['change']):.2f}%
-                                                </div>
-                                                <div style='color: #898fa3; font-size: 0.8rem;'>{asset['amount_change']:+.2f}$</div>
-                                                <div style='color: #898fa3; font-size: 0.8rem;'>({asset['volume']:,} vol)</div>
-                                            </div>
-                                            <div style='font-size: 1rem; font-weight: bold;'>{asset['price']:,.2f}$</div>
-                                        </div>
-                                        <div style='background-color: #e6e6e6; color: #666; padding: 0.2rem 0.5rem; border-radius: 5px; font-size: 0.8rem; text-align: center; margin-top: 0.2rem;'>
-                                            {asset['sector']}
-                                        </div>
-                                    </div>
-                                </div>
-                            </a>
-                            """,
-                            unsafe_allow_html=True
-                        )
+    # Sélecteur de marché : seul le marché affiché est rendu
+    markets = list(MARKETS.keys())
+    market = select_market(markets, "trending_market")
+    if dashboard is not None:
+        render_trending(*dashboard.trending[market])
+    else:
+        prefetch(fetch_market_data, [m for m in markets if m != market])
+        render_trending(*trending_cards(market, fetch_market_data(market)))
 
 if __name__ == "__main__":
     st.set_page_config(layout="wide")
@@ -0,0 +1,311 @@
+"""VWAP de séance, VWAP ancré et profil de volume à partir des barres intrajournalières.
+
+Les sommes cumulées de chaque séance (volume, prix x volume, prix² x volume, prix
+centrés sur le premier cours de la séance pour limiter les pertes de précision)
+donnent le VWAP et son écart-type pondéré barre par barre, en un seul `cumsum`
+par séance. Le profil de volume (volume échangé par tranche de prix, point de
+contrôle, zone de valeur) est un histogramme rempli par un seul `bincount` par
+séance.
+
+Le moteur est incrémental : les nouvelles barres prolongent les sommes et
+l'histogramme de la séance en cours, et la dernière barre, encore en formation
+chez le fournisseur, est remplacée plutôt que comptée deux fois. Un moteur par
+symbole et par résolution est partagé entre toutes les sessions ; il est rattrapé
+à chaque rechargement de la pyramide (widgets.lod) avec les seules barres nouvelles.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from widgets.lod import DAY_NS, get_pyramid
+from widgets.metrics import instrumented_cache
+
+VALUE_AREA = 0.70            # part du volume de la zone de valeur
+BAND_STDS = (1.0, 2.0)       # bandes du VWAP de séance, en écarts-types pondérés par le volume
+PROFILE_RESOLUTION = 0.0005  # largeur visée d'une tranche de prix, en fraction du cours
+
+def typical_price(high, low, close) -> np.ndarray:
+    return (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64)
+            + np.asarray(close, dtype=np.float64)) / 3
+
+def price_step(price: float, resolution: float = PROFILE_RESOLUTION) -> float:
+    """Pas « rond » (1, 2 ou 5 x 10^k) proche de `price * resolution`."""
+    raw = abs(price) * resolution
+    if not np.isfinite(raw) or raw <= 0:
+        return 0.01
+    scale = 10.0 ** np.floor(np.log10(raw))
+    return float(next(m * scale for m in (1, 2, 5, 10) if m * scale >= raw))
+
+class Profile:
+    """Volume par tranche de prix ; la plage de tranches s'étend au fil des barres."""
+
+    __slots__ = ("step", "base", "volume")
+
+    def __init__(self, step: float, base: int = 0, volume: np.ndarray = None):
+        self.step = step
+        self.base = base
+        self.volume = np.zeros(0) if volume is None else volume
+
+    def copy(self) -> "Profile":
+        return Profile(self.step, self.base, self.volume.copy())
+
+    def add(self, price, volume):
+        """Ajoute (ou retire, volumes négatifs) des barres en un seul `bincount`."""
+        price, volume = np.asarray(price, dtype=np.float64), np.asarray(volume, dtype=np.float64)
+        valid = np.isfinite(price) & np.isfinite(volume)
+        if not valid.all():
+            price, volume = price[valid], volume[valid]
+        if not len(price):
+            return self
+        index = np.floor(price / self.step).astype(np.int64)
+        lo, hi = int(index.min()), int(index.max())
+        if not len(self.volume):
+            self.base, self.volume = lo, np.zeros(hi - lo + 1)
+        elif lo < self.base or hi >= self.base + len(self.volume):
+            base = min(lo, self.base)
+            grown = np.zeros(max(hi + 1, self.base + len(self.volume)) - base)
+            grown[self.base - base:self.base - base + len(self.volume)] = self.volume
+            self.base, self.volume = base, grown
+        self.volume += np.bincount(index - self.base, weights=volume, minlength=len(self.volume))
+        return self
+
+    @property
+    def prices(self) -> np.ndarray:
+        """Centre de chaque tranche."""
+        return (self.base + np.arange(len(self.volume)) + 0.5) * self.step
+
+    @property
+    def total(self) -> float:
+        return float(self.volume.sum())
+
+    @property
+    def poc(self) -> float:
+        """Point de contrôle : centre de la tranche la plus échangée."""
+        return float((self.base + int(np.argmax(self.volume)) + 0.5) * self.step) if self.total > 0 else np.nan
+
+    def value_area(self, share: float = VALUE_AREA) -> tuple:
+        """(bas, haut) des tranches les plus échangées qui cumulent `share` du volume."""
+        if self.total <= 0:
+            return np.nan, np.nan
+        order = np.argsort(-self.volume, kind="stable")
+        count = int(np.searchsorted(np.cumsum(self.volume[order]), share * self.total)) + 1
+        chosen = order[:count]
+        return (float((self.base + chosen.min()) * self.step),
+                float((self.base + chosen.max() + 1) * self.step))
+
+def volume_profile(price, volume, step: float = None) -> Profile:
+    """Profil de volume d'un ensemble de barres (un seul `bincount`)."""
+    price = np.asarray(price, dtype=np.float64)
+    finite = price[np.isfinite(price)]
+    step = step or price_step(finite[-1] if len(finite) else 0.0)
+    return Profile(step).add(price, volume)
+
+def anchored_vwap(price, volume, anchor: int = 0) -> np.ndarray:
+    """VWAP cumulé depuis la barre `anchor` (NaN avant l'ancre et tant que le volume est nul)."""
+    price, volume = np.asarray(price, dtype=np.float64), np.nan_to_num(np.asarray(volume, dtype=np.float64))
+    result = np.full(len(price), np.nan)
+    if anchor >= len(price):
+        return result
+    ref = price[anchor]
+    weights = np.cumsum(volume[anchor:])
+    moments = np.cumsum(np.nan_to_num(price[anchor:] - ref) * volume[anchor:])
+    np.divide(moments, weights, out=result[anchor:], where=weights > 0)
+    result[anchor:][weights <= 0] = np.nan
+    result[anchor:] += ref
+    return result
+
+COLUMNS = {"time": np.int64, "price": np.float64, "volume": np.float64, "vwap": np.float64, "std": np.float64}
+
+def _column(name: str):
+    return property(lambda self: self._columns[name][self._lo:self._hi])
+
+class SessionEngine:
+    """VWAP de séance, écart-type pondéré et profils de volume, mis à jour par blocs de barres.
+
+    Les séances sont les jours calendaires de l'heure locale de la place (temps en int64 ns,
+    comme les pyramides de widgets.lod). Les colonnes sont des tampons à capacité doublée :
+    ajouter une barre coûte O(1) amorti et les vues déjà remises aux lecteurs restent valides.
+    """
+
+    time, price, volume, vwap, std = (_column(name) for name in COLUMNS)
+
+    def __init__(self, step: float = None, with_profiles: bool = True):
+        self.with_profiles = with_profiles
+        self.lock = threading.Lock()
+        self.clear(step)
+
+    def clear(self, step: float = None):
+        """Oublie toutes les barres intégrées (le verrou est conservé)."""
+        self.step = step
+        self.source = None        # pyramide dont les barres ont été intégrées en dernier
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._lo = self._hi = 0   # barres conservées : [_lo, _hi) des tampons
+        self.profiles = {}        # jour (int, jours depuis l'epoch) -> Profile
+        self._day = None
+        self._ref = 0.0
+        self._sums = np.zeros(3)  # volume, écart x volume, écart² x volume de la séance en cours
+        self._undo = None         # état avant la dernière barre, pour la remplacer
+
+    def __len__(self) -> int:
+        return self._hi - self._lo
+
+    def _rollback_last(self):
+        self._day, self._ref, self._sums = self._undo
+        if self.with_profiles:
+            self.profiles[self._day].add(self.price[-1:], -self.volume[-1:])
+        self._hi -= 1
+        self._undo = None
+
+    def _append(self, **values):
+        count = len(values["time"])
+        if self._hi + count > len(self._columns["time"]):
+            # Nouveaux tampons (les anciens restent à leurs lecteurs), barres oubliées retirées
+            kept = self._hi - self._lo
+            capacity = max(2 * (kept + count), 1024)
+            for name, dtype in COLUMNS.items():
+                grown = np.empty(capacity, dtype=dtype)
+                grown[:kept] = self._columns[name][self._lo:self._hi]
+                self._columns[name] = grown
+            self._lo, self._hi = 0, kept
+        for name, column in values.items():
+            self._columns[name][self._hi:self._hi + count] = column
+        self._hi += count
+
+    def update(self, time, high, low, close, volume) -> int:
+        """Intègre des barres triées ; celles antérieures à la dernière connue sont ignorées et
+        celle qui porte le même horodatage la remplace. Renvoie le nombre de barres ajoutées."""
+        time = np.asarray(time, dtype=np.int64)
+        price = typical_price(high, low, close)
+        volume = np.nan_to_num(np.asarray(volume, dtype=np.float64))
+        if len(self.time) and len(time):
+            if self._undo is not None and np.any(time == self.time[-1]):
+                self._rollback_last()
+            if len(self.time):
+                keep = time > self.time[-1]
+                time, price, volume = time[keep], price[keep], volume[keep]
+        if not len(time):
+            return 0
+        if self.step is None:
+            self.step = price_step(price[np.isfinite(price)][-1]) if np.isfinite(price).any() else 0.01
+
+        days = time // DAY_NS
+        vwap, std = np.empty(len(time)), np.empty(len(time))
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(days)) + 1, [len(time)]])
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            day = int(days[lo])
+            if day != self._day:  # Nouvelle séance
+                self._day, self._ref, self._sums = day, float(price[lo]), np.zeros(3)
+                if self.with_profiles:
+                    self.profiles[day] = Profile(self.step)
+            deviation = np.nan_to_num(price[lo:hi] - self._ref)
+            v = volume[lo:hi]
+            sums = np.cumsum(np.stack([v, deviation * v, deviation * deviation * v]), axis=1)
+            sums += self._sums[:, None]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = sums[1] / sums[0]
+                variance = sums[2] / sums[0] - mean * mean
+            vwap[lo:hi] = self._ref + mean
+            std[lo:hi] = np.sqrt(np.maximum(variance, 0.0))
+            self._sums = sums[:, -1].copy()
+            if self.with_profiles:
+                self.profiles[day].add(price[lo:hi], v)
+
+        last = deviation[-1]
+        self._undo = (self._day, self._ref, self._sums - volume[-1] * np.array([1.0, last, last * last]))
+        self._append(time=time, price=price, volume=volume, vwap=vwap, std=std)
+        return len(time)
+
+    def trim(self, start: int):
+        """Oublie les barres antérieures à `start` et les profils des séances révolues."""
+        self._lo += int(np.searchsorted(self.time, start, side="left"))
+        first_day = start // DAY_NS
+        for day in [d for d in self.profiles if d < first_day]:
+            del self.profiles[day]
+
+    def snapshot(self) -> dict:
+        """Vues pour un lecteur ; le profil de la séance en cours est copié, les autres ne
+        changent plus. Seule la dernière barre peut encore être remplacée par sa version définitive."""
+        profiles = dict(self.profiles)
+        if self._day in profiles:
+            profiles[self._day] = profiles[self._day].copy()
+        return {"time": self.time, "price": self.price, "volume": self.volume, "vwap": self.vwap,
+                "std": self.std, "profiles": profiles}
+
+def session_vwap(time, high, low, close, volume) -> tuple:
+    """(VWAP, écart-type pondéré) de séance pour un historique complet."""
+    engine = SessionEngine(with_profiles=False)
+    engine.update(time, high, low, close, volume)
+    return engine.vwap, engine.std
+
+@instrumented_cache("vwap_engine", resource=True, max_entries=64, show_spinner=False)
+def _engine(symbol: str, interval: str, adjusted: bool = False) -> SessionEngine:
+    return SessionEngine()
+
+def session_analytics(symbol: str, interval: str, adjusted: bool = False) -> dict:
+    """Moteur partagé rattrapé sur la pyramide courante ; renvoie son instantané.
+
+    Sur barres ajustées, un nouveau dividende réécrit tout l'historique antérieur : le moteur
+    repart alors de zéro (quelques milliers de barres intrajournalières au plus).
+    """
+    pyramid = get_pyramid(symbol, interval, adjusted)
+    bars = pyramid.levels[0]
+    engine = _engine(symbol, interval, adjusted)
+    with engine.lock:
+        if engine.source is pyramid:  # Rien de nouveau depuis le dernier rattrapage
+            return engine.snapshot()
+        if adjusted and engine.source is not None:
+            engine.clear()
+        last = engine.time[-1] if len(engine) else None
+        start = 0 if last is None else int(np.searchsorted(bars["time"], last, side="left"))
+        engine.update(*(bars[name][start:] for name in ("time", "High", "Low", "Close", "Volume")))
+        engine.trim(pyramid.start)
+        engine.source = pyramid
+        return engine.snapshot()
+
+def _at_bar_end(raw_time: np.ndarray, frame_time: np.ndarray, end: int) -> np.ndarray:
+    """Indice de la dernière barre d'origine de chaque barre affichée (éventuellement agrégée)."""
+    ends = np.append(frame_time[1:], end + 1)
+    return np.searchsorted(raw_time, ends, side="left") - 1
+
+def overlay(symbol: str, view: dict, frame: pd.DataFrame, indicators: list) -> tuple:
+    """Colonnes VWAP à superposer au graphique de prix et profil de volume à afficher.
+
+    En intrajournalier : VWAP de séance et bandes, VWAP ancré au début de la vue, profil
+    de la dernière séance visible. En journalier : VWAP ancré et profil de toute la vue.
+    """
+    frame_time = frame.index.as_unit("ns").asi8
+    if not len(frame_time):
+        return frame, None
+    end = view["end"].value
+    columns, profile = {}, None
+    if view["interval"] == "1d":
+        bars = view["pyramid"].levels[0]  # Celle de la vue : dernière année ou tout l'historique
+        lo = int(np.searchsorted(bars["time"], frame_time[0], side="left"))
+        hi = int(np.searchsorted(bars["time"], end, side="right"))
+        price = typical_price(bars["High"][lo:hi], bars["Low"][lo:hi], bars["Close"][lo:hi])
+        volume = bars["Volume"][lo:hi]
+        at = _at_bar_end(bars["time"][lo:hi], frame_time, end)
+        if "VWAP" in indicators:
+            columns["AVWAP"] = anchored_vwap(price, volume)[at]
+        if "Volume Profile" in indicators:
+            profile = volume_profile(price, volume)
+    else:
+        data = session_analytics(symbol, view["interval"], view.get("adjusted", False))
+        lo = int(np.searchsorted(data["time"], frame_time[0], side="left"))
+        hi = int(np.searchsorted(data["time"], end, side="right"))
+        at = _at_bar_end(data["time"][lo:hi], frame_time, end)
+        if "VWAP" in indicators and hi > lo:
+            vwap, std = data["vwap"][lo:hi][at], data["std"][lo:hi][at]
+            columns["VWAP"] = vwap
+            for k in BAND_STDS:
+                columns[f"VWAP_Upper{k:g}"] = vwap + k * std
+                columns[f"VWAP_Lower{k:g}"] = vwap - k * std
+            columns["AVWAP"] = anchored_vwap(data["price"][lo:hi], data["volume"][lo:hi])[at]
+        if "Volume Profile" in indicators and hi > lo:
+            profile = data["profiles"].get(int(data["time"][hi - 1] // DAY_NS))
+    for values in columns.values():
+        values[at < 0] = np.nan  # Barres affichées antérieures aux données
+    if columns:
+        frame = frame.assign(**columns)
+    return frame, profile